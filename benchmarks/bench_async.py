@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Benchmark: serial NegotiatorBot turns vs AsyncNegotiatorBot.generate_responses
+Runs one turn for each of N negotiations against a local fake LLM backend
+
+Usage: python benchmarks/bench_async.py [--negotiations 32] [--concurrency 8]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import AsyncNegotiatorBot, NegotiatorBot
+from benchmarks.bench_pipeline import RECRUITER_MESSAGE, USER_PROFILE
+from llm_backend import FakeLLMBackend, FixedLatency
+
+
+def create_contexts(bot, count):
+    return [bot.create_negotiation_context(
+        company_name=f"Company {i}",
+        position="Software Engineer II",
+        user_profile=USER_PROFILE,
+        target_salary=120000
+    ) for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--negotiations", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--base-ms", type=float, default=150.0)
+    args = parser.parse_args()
+    messages = [RECRUITER_MESSAGE] * args.negotiations
+
+    bot = NegotiatorBot("sk-benchmark-key-000000", backend=FakeLLMBackend(latency=FixedLatency(args.base_ms)))
+    context_ids = create_contexts(bot, args.negotiations)
+    start = time.perf_counter()
+    for context_id, message in zip(context_ids, messages):
+        bot.generate_response(context_id, message, {"salary": 85000})
+    serial = time.perf_counter() - start
+
+    async_bot = AsyncNegotiatorBot("sk-benchmark-key-000000", max_concurrency=args.concurrency,
+                                   backend=FakeLLMBackend(latency=FixedLatency(args.base_ms)))
+    context_ids = create_contexts(async_bot, args.negotiations)
+    start = time.perf_counter()
+    asyncio.run(async_bot.generate_responses(context_ids, messages, [{"salary": 85000}] * args.negotiations))
+    concurrent = time.perf_counter() - start
+
+    print(f"serial:     {serial:.2f} s ({args.negotiations / serial:.1f} turns/s)")
+    print(f"concurrent: {concurrent:.2f} s ({args.negotiations / concurrent:.1f} turns/s, "
+          f"max_concurrency={args.concurrency})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Benchmark: local tactic classifier latency
+Times TacticClassifier.classify over the seeded recruiter lines
+
+Usage: python benchmarks/bench_classifier.py [--iterations 2000]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tactic_classifier import TRAINING_DATA, get_tactic_classifier
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    classifier = get_tactic_classifier()
+    print(f"training: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    messages = [text for text, _ in TRAINING_DATA]
+    timings = []
+    for i in range(args.iterations):
+        message = messages[i % len(messages)]
+        start = time.perf_counter()
+        classifier.classify(message)
+        timings.append((time.perf_counter() - start) * 1_000_000)
+
+    timings.sort()
+    print(f"classify p50: {statistics.median(timings):.1f} us")
+    print(f"classify p99: {timings[int(len(timings) * 0.99) - 1]:.1f} us")
+
+    correct = sum(classifier.classify(text)["tactic"] in labels for text, labels in TRAINING_DATA)
+    print(f"training-set accuracy: {correct}/{len(TRAINING_DATA)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark: new OpenAI client per request vs the pooled ClientRegistry
+Sends chat completions to a local OpenAI-compatible server and counts TCP connections
+
+Usage: python benchmarks/bench_clients.py [--requests 200]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import httpx
+from openai import OpenAI
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_clients import ClientRegistry
+from benchmarks.fake_openai_server import FakeOpenAIServer
+
+API_KEY = "sk-benchmark-key-000000"
+MESSAGES = [{"role": "user", "content": "Candidate says: I would like to discuss the salary."}]
+
+
+def run(get_client, requests: int, server: FakeOpenAIServer) -> dict:
+    connections_before = server.connections
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        client = get_client()
+        client.chat.completions.create(model="gpt-3.5-turbo", messages=MESSAGES, max_tokens=50)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {
+        "connections": server.connections - connections_before,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+        "mean_ms": statistics.mean(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer().start()
+
+    # Mirrors the old behaviour: a fresh client (and connection pool) for every request
+    def fresh_client():
+        return OpenAI(api_key=API_KEY, base_url=server.base_url, http_client=httpx.Client())
+
+    registry = ClientRegistry(base_url=server.base_url)
+
+    print(f"{'strategy':<14}{'connections':>12}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}")
+    for name, factory in (("per-request", fresh_client), ("pooled", lambda: registry.get(API_KEY))):
+        r = run(factory, args.requests, server)
+        print(f"{name:<14}{r['connections']:>12}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['mean_ms']:>10.2f}")
+    print(f"registry: {registry.stats()}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
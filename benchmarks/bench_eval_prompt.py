@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark: prefix-cache reuse of the evaluate_negotiation prompt
+Sends evaluation prompts for random offers to FakeLLMBackend, which models provider-side
+prefix caching, in the old layout (offer details interpolated at the top of the system
+prompt) and the static-prefix layout, and compares cache hit rates and latency
+
+Usage: python benchmarks/bench_eval_prompt.py [--calls 200] [--prefill-ms 0.2] [--llm-ms 300]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import EVALUATION_SYSTEM_PROMPT, _evaluation_request, generate_initial_offer
+from llm_backend import FakeLLMBackend, FixedLatency
+
+CANDIDATE_MESSAGES = [
+    "I have 6 years of experience leading backend teams, and market research for this role shows a higher range.",
+    "Thank you for the offer! I'm excited about the role. Would you be open to discussing the base salary?",
+    "I led the migration to microservices at my last company and hold two AWS certifications.",
+    "I have a competing offer at a similar company; is there flexibility on the signing bonus?",
+]
+
+
+def legacy_messages(offer, message, negotiation_count):
+    """The layout before the static prefix: the offer sits at the top of the system prompt"""
+    request = _evaluation_request(message, offer, negotiation_count)
+    details, candidate = request.rsplit("\n\nCandidate says: ", 1)
+    rules = EVALUATION_SYSTEM_PROMPT.split("\n\n", 1)[1]
+    header = (f"You are a professional recruiter for {offer['company']['name']}. "
+              f"You have made a firm initial offer for a {offer['title']} position.")
+    return [
+        {"role": "system", "content": f"{header}\n\n{details}\n\n{rules}"},
+        {"role": "user", "content": f"Candidate says: {candidate}"}
+    ]
+
+
+def static_prefix_messages(offer, message, negotiation_count):
+    return [
+        {"role": "system", "content": EVALUATION_SYSTEM_PROMPT},
+        {"role": "user", "content": _evaluation_request(message, offer, negotiation_count)}
+    ]
+
+
+def run(build, calls, prefill_ms, llm_ms, seed):
+    rng = random.Random(seed)
+    random.seed(seed)  # generate_initial_offer draws from the global generator
+    backend = FakeLLMBackend(latency=FixedLatency(llm_ms), prefill_ms_per_token=prefill_ms, seed=seed)
+    latencies = []
+    for _ in range(calls):
+        offer, _level = generate_initial_offer()
+        messages = build(offer, rng.choice(CANDIDATE_MESSAGES), rng.randrange(3))
+        start = time.perf_counter()
+        backend.complete(messages, stage="evaluation")
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies, backend.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--prefill-ms", type=float, default=0.2, help="fake prefill time per uncached prompt token")
+    parser.add_argument("--llm-ms", type=float, default=300.0, help="fixed fake latency per call")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for name, build in (("offer-first", legacy_messages), ("static prefix", static_prefix_messages)):
+        latencies, stats = run(build, args.calls, args.prefill_ms, args.llm_ms, args.seed)
+        print(f"{name:<14} prefix hit rate {stats['prefix_hit_rate']:6.1%}   "
+              f"cached tokens {stats['cached_token_fraction']:6.1%} of {stats['prompt_tokens'] / args.calls:6.0f}/call   "
+              f"mean {statistics.mean(latencies):7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
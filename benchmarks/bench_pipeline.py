@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark: fused single-call pipeline vs the two-call pipeline
+Compares per-turn latency and token usage of NegotiatorBot.generate_response
+against a local fake LLM backend
+
+Usage: python benchmarks/bench_pipeline.py [--turns 20] [--base-ms 150]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import NegotiatorBot, PipelineMode
+from llm_backend import FakeLLMBackend, FixedLatency
+
+RECRUITER_MESSAGE = ("We understand your concerns, but this is our standard rate for this level. "
+                     "We have many qualified candidates interested in this position.")
+
+USER_PROFILE = {
+    "years_experience": 5,
+    "industry": "technology",
+    "primary_skill": "software development",
+    "key_achievement": "led team that increased productivity by 40%",
+    "education_level": "Bachelors",
+    "leadership_experience": True,
+    "certifications": [],
+}
+
+
+def run(mode: PipelineMode, turns: int, fake: FakeLLMBackend) -> dict:
+    bot = NegotiatorBot("sk-benchmark-key-000000", pipeline_mode=mode, backend=fake)
+    context_id = bot.create_negotiation_context(
+        company_name="Tech Company",
+        position="Software Engineer II",
+        user_profile=USER_PROFILE,
+        target_salary=120000
+    )
+
+    latencies = []
+    for turn in range(turns):
+        start = time.perf_counter()
+        bot.generate_response(context_id, RECRUITER_MESSAGE, {"salary": 85000 + turn * 1000})
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "mode": mode.value,
+        "calls_per_turn": len(fake.calls) / turns,
+        "p50_ms": statistics.median(latencies),
+        "mean_ms": statistics.mean(latencies),
+        "max_ms": max(latencies),
+        "prompt_tokens_per_turn": sum(c["prompt_tokens"] for c in fake.calls) / turns,
+        "completion_tokens_per_turn": sum(c["completion_tokens"] for c in fake.calls) / turns,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--base-ms", type=float, default=150.0, help="fixed per-call latency")
+    parser.add_argument("--decode-ms", type=float, default=1.0, help="latency per completion token")
+    args = parser.parse_args()
+
+    print(f"{'mode':<10}{'calls/turn':>12}{'p50 ms':>10}{'mean ms':>10}{'max ms':>10}"
+          f"{'prompt tok':>12}{'compl tok':>11}")
+    for mode in (PipelineMode.TWO_CALL, PipelineMode.FUSED):
+        fake = FakeLLMBackend(latency=FixedLatency(args.base_ms), prefill_ms_per_token=0.05,
+                              decode_ms_per_token=args.decode_ms)
+        r = run(mode, args.turns, fake)
+        print(f"{r['mode']:<10}{r['calls_per_turn']:>12.1f}{r['p50_ms']:>10.1f}{r['mean_ms']:>10.1f}"
+              f"{r['max_ms']:>10.1f}{r['prompt_tokens_per_turn']:>12.0f}{r['completion_tokens_per_turn']:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
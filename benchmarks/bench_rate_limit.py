@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-key rate limiting against a provider that returns 429s under load
+Fires a burst of concurrent calls through ResilientBackend at a fake provider that rejects
+requests beyond its concurrency capacity, with and without the AIMD rate limiter, and
+compares failed calls, 429s received and where the time went (queue wait vs LLM)
+
+Usage: python benchmarks/bench_rate_limit.py [--callers 32] [--calls 4] [--capacity 6] [--llm-ms 100]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_backend import (CallPolicy, FakeLLMBackend, FixedLatency, LLMBackend, LLMRateLimitError,
+                         RateLimitedBackend, ResilientBackend)
+from rate_limiter import AdaptiveRateLimiter
+
+MESSAGES = [{"role": "user", "content": "We need to discuss the compensation package."}]
+
+
+class CappedProvider(LLMBackend):
+    """Fake provider that answers 429 after ``reject_ms`` once ``capacity`` requests are in flight"""
+
+    name = "capped"
+
+    def __init__(self, inner: LLMBackend, capacity: int, reject_ms: float):
+        self.inner = inner
+        self.capacity = capacity
+        self.reject_ms = reject_ms
+        self.in_flight = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def complete(self, messages, model="gpt-3.5-turbo", stage="default", **params):
+        with self._lock:
+            over = self.in_flight >= self.capacity
+            self.rejected += over
+            self.in_flight += not over
+        if over:
+            time.sleep(self.reject_ms / 1000)
+            raise LLMRateLimitError("Fake provider over capacity (429)")
+        try:
+            return self.inner.complete(messages, model=model, stage=stage, **params)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def stream(self, messages, model="gpt-3.5-turbo", stage="default", **params):
+        yield self.complete(messages, model, stage, **params).text
+
+    async def acomplete(self, messages, model="gpt-3.5-turbo", stage="default", **params):
+        return self.complete(messages, model, stage, **params)
+
+
+def run(args, limited: bool):
+    provider = CappedProvider(FakeLLMBackend(latency=FixedLatency(args.llm_ms)), args.capacity, args.reject_ms)
+    limiter = AdaptiveRateLimiter(rate=args.rate, burst=args.callers, max_concurrency=args.callers)
+    inner = RateLimitedBackend(provider, limiter, queue_timeout=30.0) if limited else provider
+    backend = ResilientBackend(inner, policies={}, default_policy=CallPolicy(max_retries=2, backoff_base=0.05))
+
+    def caller(_):
+        ok = 0
+        for _ in range(args.calls):
+            try:
+                backend.complete(MESSAGES, stage="analysis")
+                ok += 1
+            except Exception:
+                pass
+        return ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.callers) as pool:
+        succeeded = sum(pool.map(caller, range(args.callers)))
+    elapsed = time.perf_counter() - start
+    return succeeded, provider.rejected, elapsed, limiter.snapshot() if limited else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--callers", type=int, default=32, help="concurrent callers in the burst")
+    parser.add_argument("--calls", type=int, default=4, help="calls per caller")
+    parser.add_argument("--capacity", type=int, default=6, help="requests the provider serves at once")
+    parser.add_argument("--llm-ms", type=float, default=100.0, help="fixed fake latency per served call")
+    parser.add_argument("--reject-ms", type=float, default=30.0, help="round trip of a 429 response")
+    parser.add_argument("--rate", type=float, default=200.0, help="token bucket refill per second")
+    args = parser.parse_args()
+
+    total = args.callers * args.calls
+    for name, limited in (("no limiter", False), ("AIMD limiter", True)):
+        succeeded, rejected, elapsed, snapshot = run(args, limited)
+        line = (f"{name:<12} failed {total - succeeded:>4}/{total}   429s {rejected:>4}   "
+                f"wall {elapsed:5.2f} s")
+        if snapshot:
+            line += (f"   queue wait p50/p95 {snapshot['queue_wait_ms']['p50']:.0f}/"
+                     f"{snapshot['queue_wait_ms']['p95']:.0f} ms   llm p50 {snapshot['llm_ms']['p50']:.0f} ms   "
+                     f"final limit {snapshot['concurrency_limit']}")
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
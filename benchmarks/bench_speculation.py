@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark: speculative negotiator turns in a 10-round battle
+Replays the Streamlit battle loop (recruiter pause, negotiator pause, LLM call) against
+FakeLLMBackend, with and without drafting the next negotiator turn in the background
+
+Usage: python benchmarks/bench_speculation.py [--llm-ms 800] [--recruiter-delay 1.5] [--negotiator-delay 2.0]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import NegotiatorBot
+from llm_backend import FakeLLMBackend, LognormalLatency
+from speculation import TurnSpeculator
+from benchmarks.bench_pipeline import USER_PROFILE
+
+ROUNDS = 10
+NEGOTIATOR_PROMPT = "We need to discuss the compensation package."
+
+
+def recruiter_turn(round_num):
+    """Stand-in for streamlit_app.RecruiterBot.respond: deterministic message and salary per round"""
+    salary = 85000 + [0, 0, 0, 1000, 1500, 2500][min(round_num, 5)]
+    return f"Round {round_num}: our offer is ${salary:,}.", salary
+
+
+def battle(bot, speculator, recruiter_delay, negotiator_delay) -> float:
+    """Run one battle and return the seconds spent waiting on the negotiator's LLM calls"""
+    context_id = bot.create_negotiation_context("Tech Company", "Software Engineer II", USER_PROFILE, 102000)
+    waited = 0.0
+    message, salary = recruiter_turn(0)
+    if speculator:
+        speculator.prepare(bot, context_id, NEGOTIATOR_PROMPT, {"salary": salary}, key=(message, salary))
+
+    for round_count in range(1, ROUNDS):
+        if round_count % 2 == 1:
+            time.sleep(negotiator_delay)
+            start = time.perf_counter()
+            draft = speculator.take((message, salary)) if speculator else None
+            if draft is not None:
+                bot.commit_draft(draft)
+            else:
+                bot.generate_response(context_id, NEGOTIATOR_PROMPT, {"salary": salary})
+            waited += time.perf_counter() - start
+            if speculator and round_count + 2 < ROUNDS:
+                predicted = recruiter_turn((round_count + 1) // 2)
+                speculator.prepare(bot, context_id, NEGOTIATOR_PROMPT, {"salary": predicted[1]}, key=predicted)
+        else:
+            time.sleep(recruiter_delay)
+            message, salary = recruiter_turn(round_count // 2)
+            if speculator and round_count + 1 < ROUNDS:
+                speculator.prepare(bot, context_id, NEGOTIATOR_PROMPT, {"salary": salary}, key=(message, salary))
+    return waited
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--llm-ms", type=float, default=800.0, help="median fake LLM latency per call")
+    parser.add_argument("--recruiter-delay", type=float, default=1.5)
+    parser.add_argument("--negotiator-delay", type=float, default=2.0)
+    args = parser.parse_args()
+
+    for name, speculator in (("sequential", None), ("speculative", TurnSpeculator())):
+        bot = NegotiatorBot("sk-benchmark-key-000000",
+                            backend=FakeLLMBackend(latency=LognormalLatency(args.llm_ms, 0.3)))
+        start = time.perf_counter()
+        waited = battle(bot, speculator, args.recruiter_delay, args.negotiator_delay)
+        total = time.perf_counter() - start
+        extra = f"   {speculator.stats}" if speculator else ""
+        print(f"{name:<12} battle {total:6.2f} s   waiting on LLM {waited:6.2f} s{extra}")
+
+
+if __name__ == "__main__":
+    main()
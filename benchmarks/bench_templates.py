@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark: template selection and formatting per turn
+Compares the compiled template registry with a linear scan plus str.format
+
+Usage: python benchmarks/bench_templates.py [--iterations 20000]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import NegotiationStrategy, NegotiatorBot
+
+STRATEGIES = [
+    NegotiationStrategy.PROFESSIONAL_PASSIVE_AGGRESSIVE,
+    NegotiationStrategy.CONFIDENT_ASSERTIVE,
+    NegotiationStrategy.COLLABORATIVE_PROBLEM_SOLVER,
+]
+
+
+def scan_and_format(bot: NegotiatorBot, context) -> str:
+    """Per-turn work as it was before the registry: filter, score and parse every time"""
+    candidates = [t for t in bot.response_templates if t.strategy == context.strategy]
+    best, best_score = None, -1.0
+    for template in candidates:
+        score = template.effectiveness_score
+        salary = context.current_offer.get("salary", 0)
+        if isinstance(salary, str):
+            salary = int(''.join(filter(str.isdigit, salary)))
+        if "salary" in template.template_id and salary < (context.target_salary or 0):
+            score += 0.1
+        if score > best_score:
+            best, best_score = template, score
+    return best.template_text.format(**bot._resolve_template_variables(best, context))
+
+
+def compiled(bot: NegotiatorBot, context) -> str:
+    return bot._format_template(bot._select_template({}, context), context)
+
+
+def time_turns(fn, bot, contexts, iterations):
+    timings = []
+    for i in range(iterations):
+        context = contexts[i % len(contexts)]
+        start = time.perf_counter()
+        fn(bot, context)
+        timings.append((time.perf_counter() - start) * 1_000_000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    bot = NegotiatorBot("sk-bench")
+    contexts = []
+    for strategy in STRATEGIES:
+        context_id = bot.create_negotiation_context(
+            "Acme", "Engineer", {"years_experience": 6, "industry": "fintech"}, target_salary=120000
+        )
+        bot.update_strategy(context_id, strategy)
+        bot.negotiation_contexts.update_context(context_id, current_offer={"salary": "$95,000"})
+        contexts.append(bot.negotiation_contexts[context_id])
+
+    for context in contexts:
+        assert scan_and_format(bot, context) == compiled(bot, context)
+
+    for name, fn in (("scan + str.format", scan_and_format), ("compiled registry", compiled)):
+        p50, p99 = time_turns(fn, bot, contexts, args.iterations)
+        print(f"{name:18s} p50: {p50:6.1f} us   p99: {p99:6.1f} us")
+
+
+if __name__ == "__main__":
+    main()
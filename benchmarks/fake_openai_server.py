@@ -0,0 +1,71 @@
+"""
+Minimal OpenAI-compatible HTTP server for benchmarks
+Serves /v1/chat/completions with HTTP/1.1 keep-alive and counts new connections
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_backend import FAKE_REPLY
+from prompt_budget import count_tokens
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.stats_lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        prompt = "\n".join(m.get("content", "") for m in body.get("messages", []))
+        time.sleep(self.server.latency)
+        payload = json.dumps({
+            "id": "chatcmpl-local",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-3.5-turbo"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": FAKE_REPLY},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": count_tokens(prompt),
+                "completion_tokens": count_tokens(FAKE_REPLY),
+                "total_tokens": count_tokens(prompt) + count_tokens(FAKE_REPLY)
+            }
+        }).encode("utf-8")
+        with self.server.stats_lock:
+            self.server.requests += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.0, port: int = 0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency = latency
+        self.connections = 0
+        self.requests = 0
+        self.stats_lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
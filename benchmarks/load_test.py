@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Load test: throughput and latency percentiles for every Flask route
+Drives each route over real HTTP at one or more concurrency levels and writes JSON results;
+the compare command flags regressions between two result files
+
+Usage: python benchmarks/load_test.py run [--concurrency 1,8,32] [--requests 200] [--output results.json]
+       python benchmarks/load_test.py compare baseline.json candidate.json [--threshold 0.10]
+
+Without --url the app is served in-process with LLM_BACKEND=fake, so only the
+server's own overhead (plus the configured fake latency) is measured.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+API_KEY = "sk-loadtest-key-0000000000000000"
+RESUME_TEXT = (b"Jane Doe\njane@example.com\nSenior Software Engineer at Acme\n"
+               b"8 years of experience in Python, AWS and React.\n")
+RECRUITER_MESSAGE = ("We understand your concerns, but this is our standard rate for this level. "
+                     "We have many qualified candidates interested in this position.")
+CANDIDATE_MESSAGE = ("I have 6 years of experience leading backend teams, and market research for "
+                     "this role shows a higher range. Is there flexibility on the base salary?")
+
+# (method, path, httpx request kwargs); each route builds one from the fixtures and a request number
+Request = Tuple[str, str, Dict]
+
+
+def _create_context(client: httpx.Client, i: int) -> str:
+    response = client.post("/create_negotiation_context", json={
+        "api_key": API_KEY,
+        "company_name": f"Load Co {i}",
+        "position": "Software Engineer II",
+        "user_profile": {"years_experience": 6, "industry": "technology"},
+        "target_salary": 120000
+    })
+    response.raise_for_status()
+    return response.json()["context_id"]
+
+
+class Fixtures:
+    """State the routes need: an offer from /start_conversation and a pool of negotiator contexts"""
+
+    def __init__(self, client: httpx.Client, contexts: int):
+        started = client.post("/start_conversation", json={"api_key": API_KEY})
+        started.raise_for_status()
+        self.offer = started.json()["offer"]
+        self.offer_level = started.json()["offer_level"]
+        # Turns on one context are serialized, so spread them over many contexts
+        self.context_ids = [_create_context(client, i) for i in range(contexts)]
+
+
+ROUTES: Dict[str, Callable[[Fixtures, int], Request]] = {
+    "/start_conversation": lambda f, i: ("POST", "/start_conversation", {"json": {"api_key": API_KEY}}),
+    "/negotiate": lambda f, i: ("POST", "/negotiate", {"json": {
+        "api_key": API_KEY, "message": CANDIDATE_MESSAGE, "current_offer": f.offer,
+        "offer_level": f.offer_level, "history": []}}),
+    "/download_pdf": lambda f, i: ("POST", "/download_pdf", {"json": {"offer": f.offer}}),
+    "/get_random_offer": lambda f, i: ("GET", "/get_random_offer", {}),
+    "/get_multiple_offers": lambda f, i: ("GET", "/get_multiple_offers", {"params": {"count": 5}}),
+    # A distinct file name per request, since the route saves uploads under their own name
+    "/upload_resume": lambda f, i: ("POST", "/upload_resume", {
+        "files": {"file": (f"resume_{threading.get_ident()}_{i}.txt", RESUME_TEXT, "text/plain")}}),
+    "/create_negotiation_context": lambda f, i: ("POST", "/create_negotiation_context", {"json": {
+        "api_key": API_KEY, "company_name": f"Load Co {i}", "position": "Software Engineer II",
+        "user_profile": {"years_experience": 6}, "target_salary": 120000}}),
+    "/generate_negotiation_response": lambda f, i: ("POST", "/generate_negotiation_response", {"json": {
+        "context_id": f.context_ids[i % len(f.context_ids)], "message": RECRUITER_MESSAGE,
+        "offer_details": {"salary": 85000 + i % 10 * 1000}}}),
+    "/get_negotiation_status": lambda f, i: ("POST", "/get_negotiation_status", {"json": {
+        "context_id": f.context_ids[i % len(f.context_ids)]}}),
+}
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(fraction * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies_ms: List[float], errors: int, elapsed: float) -> Dict:
+    latencies_ms = sorted(latencies_ms)
+    total = len(latencies_ms)
+    return {
+        "requests": total,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(statistics.mean(latencies_ms), 2) if total else 0.0,
+        "p50_ms": round(percentile(latencies_ms, 0.50), 2),
+        "p95_ms": round(percentile(latencies_ms, 0.95), 2),
+        "p99_ms": round(percentile(latencies_ms, 0.99), 2),
+        "max_ms": round(latencies_ms[-1], 2) if total else 0.0
+    }
+
+
+def run_route(base_url: str, builder, fixtures: Fixtures, requests: int, concurrency: int) -> Dict:
+    """Send ``requests`` requests to one route from ``concurrency`` keep-alive clients"""
+    counter = itertools.count()
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def worker():
+        nonlocal errors
+        with httpx.Client(base_url=base_url, timeout=120.0) as client:
+            while True:
+                i = next(counter)
+                if i >= requests:
+                    return
+                method, path, kwargs = builder(fixtures, i)
+                start = time.perf_counter()
+                try:
+                    response = client.request(method, path, **kwargs)
+                    response.read()
+                    failed = response.status_code >= 400
+                except httpx.HTTPError:
+                    failed = True
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                with lock:
+                    latencies.append(elapsed_ms)
+                    errors += failed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def serve_in_process(llm_latency: str) -> Tuple[str, Callable[[], None]]:
+    """Start the app on a free local port with the fake LLM backend"""
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["FAKE_LLM_LATENCY"] = llm_latency
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    from main import app
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server.shutdown
+
+
+def command_run(args) -> int:
+    routes = args.routes.split(",") if args.routes else list(ROUTES)
+    unknown = [route for route in routes if route not in ROUTES]
+    if unknown:
+        print(f"Unknown routes: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    shutdown = None
+    base_url = args.url
+    if not base_url:
+        base_url, shutdown = serve_in_process(args.llm_latency)
+
+    try:
+        with httpx.Client(base_url=base_url, timeout=120.0) as client:
+            fixtures = Fixtures(client, contexts=max(levels) * 2)
+
+        results = {
+            "meta": {
+                "base_url": base_url,
+                "in_process": shutdown is not None,
+                "llm_latency": args.llm_latency if shutdown else None,
+                "requests_per_level": args.requests,
+                "concurrency": levels,
+                "started_at": time.strftime("%Y-%m-%dT%H:%M:%S")
+            },
+            "routes": {}
+        }
+        for route in routes:
+            results["routes"][route] = {}
+            for level in levels:
+                stats = run_route(base_url, ROUTES[route], fixtures, args.requests, level)
+                results["routes"][route][str(level)] = stats
+                print(f"{route:<32} c={level:<4} {stats['throughput_rps']:>9.1f} req/s   "
+                      f"p50 {stats['p50_ms']:>8.1f}   p95 {stats['p95_ms']:>8.1f}   "
+                      f"p99 {stats['p99_ms']:>8.1f} ms   errors {stats['errors']}", file=sys.stderr)
+    finally:
+        if shutdown:
+            shutdown()
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+def compare(baseline: Dict, candidate: Dict, threshold: float, min_delta_ms: float) -> List[Dict]:
+    """Per route and concurrency level, how the candidate run differs from the baseline"""
+    findings = []
+    for route, levels in candidate.get("routes", {}).items():
+        for level, new in levels.items():
+            old = baseline.get("routes", {}).get(route, {}).get(level)
+            if old is None:
+                continue
+            regressions = []
+            for metric in ("p50_ms", "p95_ms", "p99_ms"):
+                delta = new[metric] - old[metric]
+                if delta > min_delta_ms and delta > old[metric] * threshold:
+                    regressions.append(f"{metric} {old[metric]:.1f} -> {new[metric]:.1f}")
+            if new["throughput_rps"] < old["throughput_rps"] * (1 - threshold):
+                regressions.append(f"throughput {old['throughput_rps']:.1f} -> {new['throughput_rps']:.1f} req/s")
+            if new["error_rate"] > old["error_rate"] + 0.01:
+                regressions.append(f"error_rate {old['error_rate']:.2%} -> {new['error_rate']:.2%}")
+            findings.append({
+                "route": route,
+                "concurrency": int(level),
+                "p95_change": round(new["p95_ms"] / old["p95_ms"] - 1, 4) if old["p95_ms"] else None,
+                "throughput_change": (round(new["throughput_rps"] / old["throughput_rps"] - 1, 4)
+                                      if old["throughput_rps"] else None),
+                "regressions": regressions
+            })
+    return findings
+
+
+def command_compare(args) -> int:
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    findings = compare(baseline, candidate, args.threshold, args.min_delta_ms)
+    regressed = [finding for finding in findings if finding["regressions"]]
+    for finding in findings:
+        status = "REGRESSION" if finding["regressions"] else "ok"
+        print(f"{finding['route']:<32} c={finding['concurrency']:<4} {status:<10} "
+              f"{'; '.join(finding['regressions'])}", file=sys.stderr)
+    print(json.dumps({"threshold": args.threshold, "regressions": len(regressed), "results": findings}, indent=2))
+    return 1 if regressed else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="load the routes and write JSON results")
+    run.add_argument("--url", help="server to test; default serves the app in-process")
+    run.add_argument("--routes", help="comma-separated routes (default: all)")
+    run.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    run.add_argument("--requests", type=int, default=200, help="requests per route and level")
+    run.add_argument("--llm-latency", default="fixed:0", help="FAKE_LLM_LATENCY for the in-process server")
+    run.add_argument("--output", help="write results here instead of stdout")
+
+    diff = commands.add_parser("compare", help="flag regressions between two result files")
+    diff.add_argument("baseline")
+    diff.add_argument("candidate")
+    diff.add_argument("--threshold", type=float, default=0.10, help="relative change counted as a regression")
+    diff.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore smaller latency changes")
+
+    args = parser.parse_args(argv)
+    return command_run(args) if args.command == "run" else command_compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""
+Multi-tenant Negotiation Context Registry
+Maps context IDs to the bot (and API key) that owns them, safely across threads
+"""
+
+import threading
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from llm_clients import hash_api_key
+
+
+@dataclass
+class RegisteredContext:
+    """A negotiation context together with the tenant bot that serves it"""
+    context_id: str
+    bot: Any  # NegotiatorBot; typed loosely to avoid importing main
+    tenant: str  # hash of the API key the context was created with
+    # Serializes turns on this context while other contexts proceed in parallel
+    lock: threading.RLock = field(default_factory=threading.RLock)
+
+
+class _Shard:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries: Dict[str, RegisteredContext] = {}
+
+
+class ContextRegistry:
+    """Sharded, thread-safe map of context_id -> RegisteredContext"""
+
+    def __init__(self, shard_count: int = 16):
+        self._shards: List[_Shard] = [_Shard() for _ in range(shard_count)]
+
+    def _shard(self, context_id: str) -> _Shard:
+        return self._shards[zlib.crc32(context_id.encode("utf-8")) % len(self._shards)]
+
+    def register(self, context_id: str, bot: Any) -> RegisteredContext:
+        entry = RegisteredContext(context_id=context_id, bot=bot, tenant=hash_api_key(bot.api_key))
+        shard = self._shard(context_id)
+        with shard.lock:
+            shard.entries[context_id] = entry
+        return entry
+
+    def get(self, context_id: str) -> Optional[RegisteredContext]:
+        shard = self._shard(context_id)
+        with shard.lock:
+            return shard.entries.get(context_id)
+
+    def remove(self, context_id: str) -> Optional[RegisteredContext]:
+        shard = self._shard(context_id)
+        with shard.lock:
+            return shard.entries.pop(context_id, None)
+
+    def __len__(self) -> int:
+        total = 0
+        for shard in self._shards:
+            with shard.lock:
+                total += len(shard.entries)
+        return total
@@ -0,0 +1,239 @@
+"""
+Negotiation Context Storage
+Pluggable storage for negotiation contexts; the default keeps them in memory with
+idle-TTL, count and byte-budget LRU eviction
+"""
+
+import json
+import threading
+import time
+from abc import abstractmethod
+from collections import OrderedDict
+from dataclasses import asdict, is_dataclass
+from typing import Any, Callable, Dict, Iterator, List, MutableMapping, Optional, Tuple
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate resident size of a context or history entry, in bytes of JSON"""
+    if is_dataclass(value):
+        value = asdict(value)
+    return len(json.dumps(value, default=str))
+
+
+class ContextExpiredError(KeyError):
+    """Raised when a context existed but has been evicted"""
+
+
+class ContextStorage(MutableMapping):
+    """Storage backend for NegotiationContext objects and their history
+
+    Contexts are read with ``storage[context_id]`` and created with
+    ``storage[context_id] = context``. Changes after creation must go through
+    ``append_history``, ``update_context`` or ``modify_context`` so that backends
+    which do not keep live objects (e.g. SQLite) persist them.
+    """
+
+    def __init__(self):
+        self._listeners: List[Callable[[str, str], None]] = []
+
+    @abstractmethod
+    def append_history(self, context_id: str, entry: Dict):
+        """Append one entry to the context's negotiation history"""
+
+    @abstractmethod
+    def update_context(self, context_id: str, **fields):
+        """Replace top-level context fields such as current_offer or strategy"""
+
+    @abstractmethod
+    def modify_context(self, context_id: str, update: Callable[[Any], Dict]) -> Dict:
+        """Call ``update(context)`` and apply the fields it returns, as one atomic step
+
+        Use it for read-check-write changes that must not interleave with another writer,
+        including one in another process; ``update`` may raise to leave the context unchanged.
+        """
+
+    @abstractmethod
+    def set_owner(self, context_id: str, tenant: str, options: Dict):
+        """Record which tenant (API-key hash) and bot options a context belongs to"""
+
+    @abstractmethod
+    def get_owner(self, context_id: str) -> Optional[Tuple[str, Dict]]:
+        """Return (tenant, options) for a context, or None"""
+
+    def was_evicted(self, context_id: str) -> bool:
+        return False
+
+    def stats(self) -> Dict:
+        return {"contexts": len(self)}
+
+    def add_eviction_listener(self, listener: Callable[[str, str], None]):
+        """Call ``listener(context_id, reason)`` whenever a context is evicted"""
+        self._listeners.append(listener)
+
+    def _notify_eviction(self, context_id: str, reason: str):
+        for listener in self._listeners:
+            try:
+                listener(context_id, reason)
+            except Exception as e:
+                print(f"Error in context eviction listener: {e}")
+
+
+class BoundedContextStore(ContextStorage):
+    """Dict-like context store that evicts the least recently used contexts
+
+    A context is evicted when it has been idle for longer than ``ttl_seconds``, when
+    more than ``max_contexts`` are resident, or when the approximate resident size
+    exceeds ``max_bytes``. Evicted IDs are remembered so callers can tell an expired
+    context apart from one that never existed.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = 3600.0, max_contexts: Optional[int] = 1000,
+                 max_bytes: Optional[int] = 64 * 1024 * 1024, remembered_evictions: int = 10000):
+        super().__init__()
+        self.ttl_seconds = ttl_seconds
+        self.max_contexts = max_contexts
+        self.max_bytes = max_bytes
+        self.remembered_evictions = remembered_evictions
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._last_access: Dict[str, float] = {}
+        self._evicted: "OrderedDict[str, str]" = OrderedDict()
+        self._owners: Dict[str, Tuple[str, Dict]] = {}
+        self._lock = threading.RLock()
+        self.resident_bytes = 0
+        self.evictions = {"ttl": 0, "count": 0, "bytes": 0}
+
+    def __getitem__(self, context_id: str):
+        with self._lock:
+            self._expire_idle(time.monotonic())
+            if context_id not in self._entries:
+                if context_id in self._evicted:
+                    raise ContextExpiredError(context_id)
+                raise KeyError(context_id)
+            self._touch(context_id)
+            return self._entries[context_id]
+
+    def __setitem__(self, context_id: str, context):
+        with self._lock:
+            if context_id in self._entries:
+                self._drop(context_id)
+            self._evicted.pop(context_id, None)
+            self._entries[context_id] = context
+            self._sizes[context_id] = estimate_size(context)
+            self.resident_bytes += self._sizes[context_id]
+            self._touch(context_id)
+            self._enforce_limits(protect=context_id)
+
+    def __delitem__(self, context_id: str):
+        with self._lock:
+            if context_id not in self._entries:
+                raise KeyError(context_id)
+            self._drop(context_id)
+
+    def __contains__(self, context_id) -> bool:
+        with self._lock:
+            self._expire_idle(time.monotonic())
+            return context_id in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._entries))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def append_history(self, context_id: str, entry: Dict):
+        """Append a history entry and account for the memory it adds"""
+        with self._lock:
+            context = self[context_id]
+            context.negotiation_history.append(entry)
+            size = estimate_size(entry)
+            self._sizes[context_id] += size
+            self.resident_bytes += size
+            self._enforce_limits(protect=context_id)
+
+    def update_context(self, context_id: str, **fields):
+        """Replace fields and account for the memory they add or free"""
+        with self._lock:
+            context = self[context_id]
+            size = 0
+            for name, value in fields.items():
+                size += estimate_size(value) - estimate_size(getattr(context, name))
+                setattr(context, name, value)
+            self._sizes[context_id] += size
+            self.resident_bytes += size
+            self._enforce_limits(protect=context_id)
+
+    def modify_context(self, context_id: str, update: Callable[[Any], Dict]) -> Dict:
+        with self._lock:
+            fields = update(self[context_id])
+            if fields:
+                self.update_context(context_id, **fields)
+            return fields
+
+    def set_owner(self, context_id: str, tenant: str, options: Dict):
+        with self._lock:
+            self._owners[context_id] = (tenant, dict(options))
+
+    def get_owner(self, context_id: str) -> Optional[Tuple[str, Dict]]:
+        with self._lock:
+            if context_id not in self._entries:
+                return None
+            return self._owners.get(context_id)
+
+    def was_evicted(self, context_id: str) -> bool:
+        with self._lock:
+            self._expire_idle(time.monotonic())
+            return context_id in self._evicted
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._expire_idle(time.monotonic())
+            return {
+                "contexts": len(self._entries),
+                "resident_bytes": self.resident_bytes,
+                "max_contexts": self.max_contexts,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "evictions": dict(self.evictions)
+            }
+
+    def _touch(self, context_id: str):
+        self._last_access[context_id] = time.monotonic()
+        self._entries.move_to_end(context_id)
+
+    def _drop(self, context_id: str):
+        del self._entries[context_id]
+        del self._last_access[context_id]
+        self._owners.pop(context_id, None)
+        self.resident_bytes -= self._sizes.pop(context_id)
+
+    def _evict(self, context_id: str, reason: str):
+        self._drop(context_id)
+        self.evictions[reason] += 1
+        self._evicted[context_id] = reason
+        while len(self._evicted) > self.remembered_evictions:
+            self._evicted.popitem(last=False)
+        self._notify_eviction(context_id, reason)
+
+    def _expire_idle(self, now: float):
+        if self.ttl_seconds is None:
+            return
+        # Entries are kept in access order, so idle ones are at the front
+        while self._entries:
+            oldest = next(iter(self._entries))
+            if now - self._last_access[oldest] < self.ttl_seconds:
+                break
+            self._evict(oldest, "ttl")
+
+    def _enforce_limits(self, protect: str = None):
+        self._expire_idle(time.monotonic())
+        while self.max_contexts is not None and len(self._entries) > self.max_contexts:
+            self._evict(next(iter(self._entries)), "count")
+        while self.max_bytes is not None and self.resident_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            # Never evict the context that is being written to; it is the most recent anyway
+            if oldest == protect:
+                break
+            self._evict(oldest, "bytes")
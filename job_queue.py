@@ -0,0 +1,159 @@
+"""
+Background Job Queue for Recruiter Bot
+Runs slow request handlers on a bounded worker pool so clients can poll or subscribe for the result
+"""
+
+import contextvars
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+import metrics
+
+
+class QueueFullError(Exception):
+    """Raised by submit when max_pending jobs are already waiting"""
+
+
+@dataclass
+class Job:
+    """One queued call and, once it has run, its result or error"""
+    job_id: str
+    submitted_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Any = None
+    error: Optional[str] = None
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def status(self) -> str:
+        if self.finished_at is not None:
+            return "failed" if self.error is not None else "done"
+        return "running" if self.started_at is not None else "queued"
+
+    def to_dict(self) -> Dict:
+        now = time.monotonic()
+        wait_end = self.started_at if self.started_at is not None else now
+        payload = {
+            "job_id": self.job_id,
+            "status": self.status,
+            "wait_ms": round((wait_end - self.submitted_at) * 1000, 1),
+            "run_ms": (round(((self.finished_at or now) - self.started_at) * 1000, 1)
+                       if self.started_at is not None else None)
+        }
+        if self.status == "done":
+            payload["result"] = self.result
+        elif self.status == "failed":
+            payload["error"] = self.error
+        return payload
+
+
+def _percentile(values, fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 1)
+
+
+class JobQueue:
+    """Bounded worker pool with job IDs
+
+    At most ``max_workers`` jobs run at once and at most ``max_pending`` wait for a
+    worker; finished jobs are kept for ``retention_seconds`` so clients can fetch them.
+    Jobs live in this process only, and are exported on /metrics labelled with ``name``.
+    """
+
+    def __init__(self, max_workers: int = 4, max_pending: int = 100, retention_seconds: float = 600.0,
+                 window: int = 1000, name: str = "default"):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._wait_ms = deque(maxlen=window)
+        self._run_ms = deque(maxlen=window)
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        metrics.JOBS_QUEUED.set(0, queue=name)
+        metrics.JOBS_RUNNING.set(0, queue=name)
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Job:
+        """Queue ``fn(*args, **kwargs)``; raises QueueFullError when the queue is full"""
+        with self._lock:
+            self._purge_finished()
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise QueueFullError(f"{self._pending} jobs already waiting")
+            job = Job(job_id=uuid.uuid4().hex, submitted_at=time.monotonic())
+            self._jobs[job.job_id] = job
+            self._pending += 1
+            self.submitted += 1
+        metrics.JOBS_QUEUED.inc(queue=self.name)
+        # Run in a copy of the caller's context so request-scoped labels follow the job
+        self._executor.submit(contextvars.copy_context().run, self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job: Job, fn: Callable, args, kwargs):
+        with self._lock:
+            job.started_at = time.monotonic()
+            self._pending -= 1
+            self._running += 1
+            self._wait_ms.append((job.started_at - job.submitted_at) * 1000)
+        metrics.JOBS_QUEUED.dec(queue=self.name)
+        metrics.JOBS_RUNNING.inc(queue=self.name)
+        metrics.JOB_WAIT.observe(job.started_at - job.submitted_at, queue=self.name)
+        try:
+            job.result = fn(*args, **kwargs)
+        except Exception as e:
+            print(f"Error in background job {job.job_id}: {e}")
+            job.error = str(e)
+        with self._lock:
+            job.finished_at = time.monotonic()
+            self._running -= 1
+            self._run_ms.append((job.finished_at - job.started_at) * 1000)
+            if job.error is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+        metrics.JOBS_RUNNING.dec(queue=self.name)
+        metrics.JOB_RUN.observe(job.finished_at - job.started_at, queue=self.name, status=job.status)
+        job.done.set()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _purge_finished(self):
+        # Jobs are kept in submission order, so the oldest finished ones are at the front
+        cutoff = time.monotonic() - self.retention_seconds
+        while self._jobs:
+            job = next(iter(self._jobs.values()))
+            if job.finished_at is None or job.finished_at > cutoff:
+                break
+            del self._jobs[job.job_id]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "queue_depth": self._pending,
+                "running": self._running,
+                "max_pending": self.max_pending,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "wait_ms": {"p50": _percentile(self._wait_ms, 0.50), "p95": _percentile(self._wait_ms, 0.95)},
+                "run_ms": {"p50": _percentile(self._run_ms, 0.50), "p95": _percentile(self._run_ms, 0.95)}
+            }
@@ -0,0 +1,1141 @@
+"""
+LLM Backends for Recruiter Bot and Negotiator Bot
+One chat-completion interface for every LLM call site, with an OpenAI backend and an offline fake
+"""
+
+import asyncio
+import contextvars
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures import wait
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import openai
+
+import metrics
+from llm_clients import client_registry
+from prompt_budget import count_tokens
+from rate_limiter import AdaptiveRateLimiter
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+
+
+@dataclass
+class Usage:
+    prompt_tokens: int
+    completion_tokens: int
+    cached_tokens: int = 0  # prompt tokens served from the provider's prefix cache
+
+
+@dataclass
+class Completion:
+    """Text of one chat completion and the tokens it used"""
+    text: str
+    model: str
+    usage: Optional[Usage] = None
+
+
+class LLMError(Exception):
+    """A completion failed; ``retryable`` tells callers whether trying again can help"""
+    retryable = False
+
+
+class LLMTimeoutError(LLMError):
+    retryable = True
+
+
+class LLMRateLimitError(LLMError):
+    retryable = True
+
+
+class LLMServerError(LLMError):
+    retryable = True
+
+
+class CircuitOpenError(LLMError):
+    """Raised without calling the backend while the circuit breaker is open"""
+
+
+class LLMQueueTimeoutError(LLMError):
+    """Raised when a request waited past its deadline for the API key's rate limiter"""
+
+
+class LLMBackend(ABC):
+    """Chat-completion backend used by NegotiatorBot and evaluate_negotiation
+
+    ``stage`` names the pipeline step making the call (analysis, enhancement, fused,
+    evaluation) so backends can apply per-stage policies.
+    """
+
+    name = "llm"
+
+    @abstractmethod
+    def complete(self, messages: List[Dict], model: str = DEFAULT_MODEL,
+                 stage: str = "default", **params) -> Completion:
+        """Run one chat completion and return its text"""
+
+    def stream(self, messages: List[Dict], model: str = DEFAULT_MODEL,
+               stage: str = "default", **params) -> Iterator[str]:
+        """Yield the completion in pieces; backends without streaming yield it whole"""
+        yield self.complete(messages, model=model, stage=stage, **params).text
+
+    async def acomplete(self, messages: List[Dict], model: str = DEFAULT_MODEL,
+                        stage: str = "default", **params) -> Completion:
+        """Async counterpart of complete; runs it in a worker thread unless overridden"""
+        return await asyncio.to_thread(self.complete, messages, model=model, stage=stage, **params)
+
+    def available(self) -> bool:
+        """False while calls are known to fail fast, so callers can skip straight to a fallback"""
+        return True
+
+
+@contextmanager
+def _translated_openai_errors():
+    """Re-raise the OpenAI errors worth retrying as LLMError subclasses"""
+    try:
+        yield
+    except openai.APITimeoutError as e:
+        raise LLMTimeoutError(str(e)) from e
+    except openai.RateLimitError as e:
+        raise LLMRateLimitError(str(e)) from e
+    except (openai.InternalServerError, openai.APIConnectionError) as e:
+        raise LLMServerError(str(e)) from e
+
+
+class OpenAIBackend(LLMBackend):
+    """Calls the OpenAI API with the pooled client for one API key"""
+
+    name = "openai"
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+    @staticmethod
+    def _completion(response, model: str) -> Completion:
+        usage = getattr(response, "usage", None)
+        # Newer API versions report prompt caching under prompt_tokens_details
+        cached = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None)
+        return Completion(
+            text=response.choices[0].message.content or "",
+            model=getattr(response, "model", None) or model,
+            usage=Usage(usage.prompt_tokens, usage.completion_tokens, cached or 0) if usage else None
+        )
+
+    def complete(self, messages: List[Dict], model: str = DEFAULT_MODEL,
+                 stage: str = "default", **params) -> Completion:
+        with _translated_openai_errors(), client_registry.lease(self.api_key) as client:
+            response = client.chat.completions.create(model=model, messages=messages, **params)
+        return self._completion(response, model)
+
+    def stream(self, messages: List[Dict], model: str = DEFAULT_MODEL,
+               stage: str = "default", **params) -> Iterator[str]:
+        # The lease keeps the client open until the stream is finished or abandoned
+        with _translated_openai_errors(), client_registry.lease(self.api_key) as client:
+            for chunk in client.chat.completions.create(model=model, messages=messages, stream=True, **params):
+                token = chunk.choices[0].delta.content if chunk.choices else None
+                if token:
+                    yield token
+
+    async def acomplete(self, messages: List[Dict], model: str = DEFAULT_MODEL,
+                        stage: str = "default", **params) -> Completion:
+        with _translated_openai_errors(), client_registry.lease_async(self.api_key) as client:
+            response = await client.chat.completions.create(model=model, messages=messages, **params)
+        return self._completion(response, model)
+
+
+# Latency models for the fake backend; each returns seconds for one call
+
+class FixedLatency:
+    def __init__(self, ms: float = 0.0):
+        self.ms = ms
+
+    def sample(self, rng: random.Random) -> float:
+        return self.ms / 1000.0
+
+
+class LognormalLatency:
+    """Long-tailed latency around a median, as real completions have"""
+
+    def __init__(self, median_ms: float = 300.0, sigma: float = 0.5):
+        self.median_ms = median_ms
+        self.sigma = sigma
+
+    def sample(self, rng: random.Random) -> float:
+        return rng.lognormvariate(math.log(self.median_ms), self.sigma) / 1000.0
+
+
+class ReplayLatency:
+    """Cycles through recorded latencies (milliseconds), e.g. from production logs"""
+
+    def __init__(self, samples_ms: Sequence[float]):
+        if not samples_ms:
+            raise ValueError("ReplayLatency needs at least one sample")
+        self.samples_ms = list(samples_ms)
+        self._index = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: str) -> "ReplayLatency":
+        """Read a JSON list or one number per line"""
+        with open(path) as f:
+            text = f.read().strip()
+        if text.startswith("["):
+            return cls([float(v) for v in json.loads(text)])
+        return cls([float(line) for line in text.splitlines() if line.strip()])
+
+    def sample(self, rng: random.Random) -> float:
+        with self._lock:
+            value = self.samples_ms[self._index % len(self.samples_ms)]
+            self._index += 1
+        return value / 1000.0
+
+
+def parse_latency_spec(spec: str):
+    """Build a latency model from "fixed:50", "lognormal:300,0.5" or "replay:path/to/samples.json" """
+    kind, _, args = spec.partition(":")
+    kind = kind.strip().lower()
+    if kind == "fixed":
+        return FixedLatency(float(args or 0))
+    if kind == "lognormal":
+        values = [float(v) for v in args.split(",") if v.strip()]
+        return LognormalLatency(*values)
+    if kind == "replay":
+        return ReplayLatency.from_file(args)
+    raise ValueError(f"Unknown latency model: {spec}")
+
+
+FAKE_REPLY = (
+    "Thank you for the offer - I'm genuinely excited about this role and the team. "
+    "That said, my research on market rates for this position, together with my "
+    "experience leading delivery on high-impact projects, puts the competitive range "
+    "meaningfully above the current figure. I'm in late-stage conversations elsewhere "
+    "and would love to prioritise this opportunity, so I'd like to understand what "
+    "flexibility exists on base salary, equity or a signing bonus. I'm confident we "
+    "can land on a package that works for both of us, and I'd welcome a quick call "
+    "this week to close the gap."
+)
+
+FAKE_ANALYSIS = {
+    "tactic": "budget_constraint",
+    "pressure_points": ["fixed_budget", "competing_candidates"],
+    "information_sought": "willingness to accept current offer",
+    "response_strategy": "anchor on market data and propose creative alternatives"
+}
+
+_HOSTILE_WORDS = re.compile(r"\b(insulting|ridiculous|pathetic|cheap|wasting my time)\b", re.IGNORECASE)
+_EVIDENCE_WORDS = re.compile(r"\b(years|experience|led|certifi\w*|market|research|offers?|expertise)\b",
+                             re.IGNORECASE)
+
+
+def _fake_evaluation(candidate_message: str) -> Dict:
+    """Recruiter decision in the evaluate_negotiation format, decided by simple keyword rules"""
+    if _HOSTILE_WORDS.search(candidate_message):
+        return {"response": "We have decided to withdraw the offer.", "action": "withdraw",
+                "new_offer_level": None, "reasoning": "Unprofessional tone"}
+    if len(_EVIDENCE_WORDS.findall(candidate_message)) >= 2:
+        return {"response": "Thank you for laying that out. We can improve the offer.", "action": "improve",
+                "new_offer_level": "mid", "reasoning": "Specific evidence of value",
+                "improvements": "Moved to the mid-level package"}
+    return {"response": "Thank you, but our offer remains as it stands.", "action": "maintain",
+            "new_offer_level": None, "reasoning": "No new evidence of value"}
+
+
+class FakeLLMBackend(LLMBackend):
+    """Offline, deterministic stand-in for the OpenAI API
+
+    Answers evaluation, fused and analysis prompts with valid JSON and enhancement
+    prompts with a realistic reply. Each call waits for a sample from ``latency`` plus
+    per-token prefill/decode time, and fails with probability ``error_rate`` using one
+    of ``error_kinds`` (timeout, rate_limit, server_error, or malformed, which returns
+    text that is not JSON). Recent calls are kept in ``calls``.
+
+    Like provider-side prompt caching, prompts are cached in blocks of
+    ``prefix_block_chars``: the leading blocks that match an earlier prompt byte for
+    byte are reported as ``cached_tokens`` and skip the prefill time.
+    """
+
+    name = "fake"
+
+    def __init__(self, latency=None, prefill_ms_per_token: float = 0.0, decode_ms_per_token: float = 0.0,
+                 error_rate: float = 0.0, error_kinds: Sequence[str] = ("timeout", "rate_limit", "server_error"),
+                 seed: Optional[int] = 0, max_recorded_calls: int = 10000,
+                 prefix_block_chars: int = 512, prefix_cache_size: int = 4096):
+        self.latency = latency or FixedLatency(0.0)
+        self.prefill_ms_per_token = prefill_ms_per_token
+        self.decode_ms_per_token = decode_ms_per_token
+        self.error_rate = error_rate
+        self.error_kinds = tuple(error_kinds)
+        self.calls = deque(maxlen=max_recorded_calls)
+        self.call_count = 0
+        self.error_count = 0
+        self.prefix_block_chars = prefix_block_chars
+        self.prefix_cache_size = prefix_cache_size
+        self._prefix_cache = OrderedDict()  # digest of each cached prefix, least recently used first
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.prefix_hits = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _respond(self, messages: List[Dict]) -> str:
+        prompt = "\n".join(m.get("content", "") for m in messages)
+        if '"action"' in prompt:
+            # The candidate's words follow the offer details in the last message
+            candidate = messages[-1].get("content", "").rsplit("Candidate says:", 1)[-1]
+            return json.dumps(_fake_evaluation(candidate))
+        if '"analysis"' in prompt and '"response"' in prompt:
+            return json.dumps({"analysis": FAKE_ANALYSIS, "response": FAKE_REPLY})
+        if "JSON" in prompt:
+            return json.dumps(FAKE_ANALYSIS)
+        return FAKE_REPLY
+
+    def _prefix_digests(self, messages: List[Dict]) -> List[bytes]:
+        """Digest of the prompt up to the end of each whole block"""
+        prompt = "".join(f"{m.get('role', '')}\n{m.get('content', '')}\n" for m in messages).encode()
+        running = hashlib.blake2b(digest_size=16)
+        digests = []
+        for end in range(self.prefix_block_chars, len(prompt) + 1, self.prefix_block_chars):
+            running.update(prompt[end - self.prefix_block_chars:end])
+            digests.append(running.copy().digest())
+        return digests
+
+    def _cached_chars(self, digests: List[bytes]) -> int:
+        """Length of the longest cached prefix, then cache every prefix of this prompt"""
+        hit = 0
+        for digest in digests:
+            if digest not in self._prefix_cache:
+                break
+            hit += 1
+        for digest in digests:
+            self._prefix_cache[digest] = True
+            self._prefix_cache.move_to_end(digest)
+        while len(self._prefix_cache) > self.prefix_cache_size:
+            self._prefix_cache.popitem(last=False)
+        return hit * self.prefix_block_chars
+
+    def _plan(self, messages: List[Dict], model: str, stage: str, timeout: Optional[float] = None):
+        """Decide the reply, latency and injected error (if any) for one call"""
+        text = self._respond(messages)
+        prompt = "\n".join(m.get("content", "") for m in messages)
+        prompt_tokens = count_tokens(prompt)
+        completion_tokens = count_tokens(text)
+        digests = self._prefix_digests(messages) if self.prefix_cache_size else []
+        with self._lock:
+            # Block boundaries are counted in the role-tagged prompt; close enough for token counts
+            cached_tokens = min(prompt_tokens, count_tokens(prompt[:self._cached_chars(digests)])) if digests else 0
+            self.prompt_tokens += prompt_tokens
+            self.cached_tokens += cached_tokens
+            self.prefix_hits += cached_tokens > 0
+            latency = (self.latency.sample(self._rng)
+                       + ((prompt_tokens - cached_tokens) * self.prefill_ms_per_token
+                          + completion_tokens * self.decode_ms_per_token) / 1000.0)
+            error = None
+            if self.error_kinds and self._rng.random() < self.error_rate:
+                error = self._rng.choice(self.error_kinds)
+            if timeout is not None and latency > timeout:
+                # Like the real client, give up once the request timeout has passed
+                error, latency = "timeout", timeout
+            self.call_count += 1
+            if error:
+                self.error_count += 1
+        self.calls.append({
+            "model": model,
+            "stage": stage,
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "completion_tokens": completion_tokens,
+            "latency": latency,
+            "error": error
+        })
+        return Completion(text, model, Usage(prompt_tokens, completion_tokens, cached_tokens)), latency, error
+
+    @staticmethod
+    def _raise(error: str, completion: Completion) -> Completion:
+        if error == "malformed":
+            return Completion("Sorry, I can't help with that.", completion.model, completion.usage)
+        if error == "timeout":
+            raise LLMTimeoutError("Fake LLM request timed out")
+        if error == "rate_limit":
+            raise LLMRateLimitError("Fake LLM rate limit exceeded (429)")
+        raise LLMServerError("Fake LLM server error (500)")
+
+    def complete(self, messages: List[Dict], model: str = DEFAULT_MODEL,
+                 stage: str = "default", **params) -> Completion:
+        completion, latency, error = self._plan(messages, model, stage, params.get("timeout"))
+        time.sleep(latency)
+        return self._raise(error, completion) if error else completion
+
+    def stream(self, messages: List[Dict], model: str = DEFAULT_MODEL,
+               stage: str = "default", **params) -> Iterator[str]:
+        completion, latency, error = self._plan(messages, model, stage, params.get("timeout"))
+        if error:
+            if error != "malformed":
+                time.sleep(latency)
+            completion = self._raise(error, completion)
+        words = completion.text.split(" ")
+        for i, word in enumerate(words):
+            # Spread the latency across the chunks the way a streamed completion arrives
+            time.sleep(latency / len(words))
+            yield word if i == 0 else " " + word
+
+    async def acomplete(self, messages: List[Dict], model: str = DEFAULT_MODEL,
+                        stage: str = "default", **params) -> Completion:
+        completion, latency, error = self._plan(messages, model, stage, params.get("timeout"))
+        await asyncio.sleep(latency)
+        return self._raise(error, completion) if error else completion
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "backend": self.name,
+                "calls": self.call_count,
+                "errors": self.error_count,
+                "prompt_tokens": self.prompt_tokens,
+                "cached_tokens": self.cached_tokens,
+                "prefix_hit_rate": round(self.prefix_hits / self.call_count, 3) if self.call_count else None,
+                "cached_token_fraction": (round(self.cached_tokens / self.prompt_tokens, 3)
+                                          if self.prompt_tokens else None)
+            }
+
+
+@dataclass(frozen=True)
+class CallPolicy:
+    """Timeout, retry and hedging settings for one pipeline stage
+
+    A hedge is a duplicate request sent when the first one has been running for
+    ``hedge_after`` seconds, or longer than the ``hedge_percentile`` of recent
+    latencies for the stage; whichever finishes first is used.
+    """
+    timeout: float = 30.0
+    max_retries: int = 2
+    backoff_base: float = 0.25
+    backoff_max: float = 4.0
+    hedge_after: Optional[float] = None
+    hedge_percentile: Optional[float] = None
+
+
+STAGE_POLICIES: Dict[str, CallPolicy] = {
+    "analysis": CallPolicy(timeout=15.0),
+    "enhancement": CallPolicy(timeout=30.0),
+    "fused": CallPolicy(timeout=40.0),
+    "evaluation": CallPolicy(timeout=30.0),
+}
+
+
+def _percentile(values: Sequence[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class _StageStats:
+    def __init__(self, window: int):
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.latencies = deque(maxlen=window)
+        # What each call would have taken without a hedge (the first request's latency)
+        self.unhedged_latencies = deque(maxlen=window)
+
+
+class CallStats:
+    """Rolling per-stage latency, retry and hedge statistics shared by ResilientBackends"""
+
+    min_samples_for_hedging = 20
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._stages: Dict[str, _StageStats] = {}
+        self._lock = threading.Lock()
+
+    def _stage(self, stage: str) -> _StageStats:
+        if stage not in self._stages:
+            self._stages[stage] = _StageStats(self.window)
+        return self._stages[stage]
+
+    def record(self, stage: str, event: str, latency: Optional[float] = None):
+        with self._lock:
+            stats = self._stage(stage)
+            if event == "success":
+                stats.calls += 1
+                stats.latencies.append(latency)
+            elif event == "unhedged":
+                stats.unhedged_latencies.append(latency)
+            elif event == "failure":
+                stats.calls += 1
+                stats.failures += 1
+            elif event == "hedge_win":
+                stats.hedge_wins += 1
+            else:
+                setattr(stats, event, getattr(stats, event) + 1)
+
+    def latency_percentile(self, stage: str, fraction: float) -> Optional[float]:
+        """Recent latency percentile for a stage, or None until enough calls have been seen"""
+        with self._lock:
+            # First-request latencies, since hedged calls would drag the threshold down
+            latencies = list(self._stage(stage).unhedged_latencies)
+        if len(latencies) < self.min_samples_for_hedging:
+            return None
+        return _percentile(latencies, fraction)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            stages = {name: (s.calls, s.failures, s.retries, s.timeouts, s.hedges, s.hedge_wins,
+                             list(s.latencies), list(s.unhedged_latencies))
+                      for name, s in self._stages.items()}
+        report = {}
+        for name, (calls, failures, retries, timeouts, hedges, wins, latencies, unhedged) in stages.items():
+            entry = {
+                "calls": calls,
+                "failures": failures,
+                "retries": retries,
+                "timeouts": timeouts,
+                "hedges": hedges,
+                "hedge_win_rate": round(wins / hedges, 3) if hedges else None
+            }
+            for label, fraction in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+                delivered = _percentile(latencies, fraction)
+                entry[f"{label}_ms"] = round(delivered * 1000, 1) if delivered is not None else None
+                if hedges:
+                    # Tail latency the callers would have seen without hedging
+                    baseline = _percentile(unhedged, fraction)
+                    entry[f"{label}_unhedged_ms"] = round(baseline * 1000, 1) if baseline is not None else None
+            report[name] = entry
+        return report
+
+
+# Worker threads for hedged requests, shared by every ResilientBackend
+_hedge_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-hedge")
+
+
+class ResilientBackend(LLMBackend):
+    """Wraps a backend with per-stage timeouts, jittered retries and optional hedging
+
+    Only errors marked ``retryable`` (timeouts, rate limits, server errors) are retried,
+    with full-jitter exponential backoff. A streamed completion is only retried if it
+    fails before the first token arrives.
+    """
+
+    def __init__(self, inner: LLMBackend, policies: Dict[str, CallPolicy] = None,
+                 default_policy: CallPolicy = CallPolicy(), stats: CallStats = None,
+                 rng: random.Random = None):
+        self.inner = inner
+        self.name = inner.name
+        self.policies = policies if policies is not None else STAGE_POLICIES
+        self.default_policy = default_policy
+        self.stats = stats or CallStats()
+        self._rng = rng or random.Random()
+
+    def policy(self, stage: str) -> CallPolicy:
+        return self.policies.get(stage, self.default_policy)
+
+    def available(self) -> bool:
+        return self.inner.available()
+
+    def _backoff(self, policy: CallPolicy, attempt: int) -> float:
+        return self._rng.uniform(0, min(policy.backoff_max, policy.backoff_base * 2 ** attempt))
+
+    def _hedge_delay(self, stage: str, policy: CallPolicy) -> Optional[float]:
+        if policy.hedge_after is not None:
+            return policy.hedge_after
+        if policy.hedge_percentile is not None:
+            return self.stats.latency_percentile(stage, policy.hedge_percentile)
+        return None
+
+    def _should_retry(self, stage: str, policy: CallPolicy, attempt: int, error: Exception) -> bool:
+        self.stats.record(stage, "failure")
+        if isinstance(error, LLMTimeoutError):
+            self.stats.record(stage, "timeouts")
+        if attempt >= policy.max_retries or not getattr(error, "retryable", False):
+            return False
+        self.stats.record(stage, "retries")
+        return True
+
+    def complete(self, messages: List[Dict], model: str = DEFAULT_MODEL,
+                 stage: str = "default", **params) -> Completion:
+        policy = self.policy(stage)
+        params.setdefault("timeout", policy.timeout)
+        attempt = 0
+        while True:
+            try:
+                return self._attempt(messages, model, stage, policy, params)
+            except Exception as e:
+                if not self._should_retry(stage, policy, attempt, e):
+                    raise
+                attempt += 1
+                time.sleep(self._backoff(policy, attempt))
+
+    def _attempt(self, messages: List[Dict], model: str, stage: str,
+                 policy: CallPolicy, params: Dict) -> Completion:
+        def call():
+            return self.inner.complete(messages, model=model, stage=stage, **params)
+
+        start = time.monotonic()
+        hedge_delay = self._hedge_delay(stage, policy)
+        if hedge_delay is None:
+            completion = call()
+            latency = time.monotonic() - start
+            self.stats.record(stage, "success", latency)
+            self.stats.record(stage, "unhedged", latency)
+            return completion
+
+        # Hedge threads run in a copy of the caller's context so route and trace labels follow
+        primary = _hedge_executor.submit(contextvars.copy_context().run, call)
+        primary.add_done_callback(
+            lambda f: f.exception() is None and self.stats.record(stage, "unhedged", time.monotonic() - start))
+        try:
+            completion = primary.result(timeout=hedge_delay)
+            self.stats.record(stage, "success", time.monotonic() - start)
+            return completion
+        except FutureTimeoutError:
+            pass
+
+        hedge = _hedge_executor.submit(contextvars.copy_context().run, call)
+        self.stats.record(stage, "hedges")
+        pending, error = {primary, hedge}, None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self.stats.record(stage, "success", time.monotonic() - start)
+                    if future is hedge:
+                        self.stats.record(stage, "hedge_win")
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+    def stream(self, messages: List[Dict], model: str = DEFAULT_MODEL,
+               stage: str = "default", **params) -> Iterator[str]:
+        policy = self.policy(stage)
+        params.setdefault("timeout", policy.timeout)
+        attempt = 0
+        while True:
+            start = time.monotonic()
+            started = False
+            try:
+                for token in self.inner.stream(messages, model=model, stage=stage, **params):
+                    started = True
+                    yield token
+                self.stats.record(stage, "success", time.monotonic() - start)
+                return
+            except Exception as e:
+                if started or not self._should_retry(stage, policy, attempt, e):
+                    raise
+                attempt += 1
+                time.sleep(self._backoff(policy, attempt))
+
+    async def acomplete(self, messages: List[Dict], model: str = DEFAULT_MODEL,
+                        stage: str = "default", **params) -> Completion:
+        policy = self.policy(stage)
+        params.setdefault("timeout", policy.timeout)
+        attempt = 0
+        while True:
+            try:
+                return await self._attempt_async(messages, model, stage, policy, params)
+            except Exception as e:
+                if not self._should_retry(stage, policy, attempt, e):
+                    raise
+                attempt += 1
+                await asyncio.sleep(self._backoff(policy, attempt))
+
+    async def _attempt_async(self, messages: List[Dict], model: str, stage: str,
+                             policy: CallPolicy, params: Dict) -> Completion:
+        start = time.monotonic()
+        primary = asyncio.ensure_future(self.inner.acomplete(messages, model=model, stage=stage, **params))
+        primary.add_done_callback(
+            lambda t: not t.cancelled() and t.exception() is None
+            and self.stats.record(stage, "unhedged", time.monotonic() - start))
+        hedge_delay = self._hedge_delay(stage, policy)
+        done, _ = await asyncio.wait({primary}, timeout=hedge_delay)
+        if done:
+            completion = primary.result()
+            self.stats.record(stage, "success", time.monotonic() - start)
+            return completion
+
+        hedge = asyncio.ensure_future(self.inner.acomplete(messages, model=model, stage=stage, **params))
+        self.stats.record(stage, "hedges")
+        pending, error = {primary, hedge}, None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    self.stats.record(stage, "success", time.monotonic() - start)
+                    if task is hedge:
+                        self.stats.record(stage, "hedge_win")
+                    # The slower request is left to finish so its latency still counts
+                    return task.result()
+                error = error or task.exception()
+        raise error
+
+
+class CircuitBreaker:
+    """Trips when too many recent LLM calls fail or are slow, and probes to recover
+
+    Closed: calls go through and their outcomes fill a rolling window. Once the window
+    holds ``min_calls`` outcomes and the error or slow-call rate reaches its threshold,
+    the breaker opens and rejects calls for ``cooldown`` seconds. The first call after
+    that is let through as a probe (half-open): success closes the breaker, failure
+    opens it for another cooldown. Only the probe's outcome counts then; calls admitted
+    before the breaker tripped are ignored when they finish. Callers decide what counts
+    as a failure: CircuitBreakerBackend counts timeouts and server errors, while a bad
+    request says nothing about the backend's health.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+    # How allow() admitted a call; passed back to record() with its outcome
+    CALL, PROBE = "call", "probe"
+
+    def __init__(self, error_rate: float = 0.5, slow_call_seconds: float = 20.0, slow_rate: float = 0.5,
+                 window: int = 50, min_calls: int = 10, cooldown: float = 30.0, clock=time.monotonic):
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate = slow_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self._clock = clock
+        self._outcomes = deque(maxlen=window)  # (failed, slow) per call
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self.trips = 0
+        self.rejected = 0
+        self.probes = 0
+        self.failed_probes = 0
+
+    def _rejecting(self, now: float) -> bool:
+        if self.state == self.OPEN:
+            return now - self._opened_at < self.cooldown
+        return self.state == self.HALF_OPEN and self._probing
+
+    def is_open(self) -> bool:
+        """Whether a call made now would be rejected"""
+        with self._lock:
+            return self._rejecting(self._clock())
+
+    def reject(self):
+        """Count a call that was skipped because the breaker is open"""
+        with self._lock:
+            self.rejected += 1
+
+    def allow(self) -> Optional[str]:
+        """Admit one call as CALL or PROBE, or count it as rejected and return None"""
+        with self._lock:
+            now = self._clock()
+            if self._rejecting(now):
+                self.rejected += 1
+                return None
+            if self.state != self.CLOSED:
+                self.state = self.HALF_OPEN
+                self._probing = True
+                self.probes += 1
+                return self.PROBE
+            return self.CALL
+
+    def record(self, failed: bool, latency: float, admission: str = CALL):
+        """Report the outcome of a call, with the admission allow() returned for it"""
+        slow = latency >= self.slow_call_seconds
+        with self._lock:
+            if admission == self.PROBE:
+                self._probing = False
+                if failed or slow:
+                    self.failed_probes += 1
+                    self._open()
+                else:
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+                return
+            if self.state != self.CLOSED:
+                # Started before the breaker tripped; only the probe decides recovery
+                return
+            self._outcomes.append((failed, slow))
+            if len(self._outcomes) < self.min_calls:
+                return
+            errors, slow_calls = self._rates()
+            if errors >= self.error_rate or slow_calls >= self.slow_rate:
+                self.trips += 1
+                self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self._opened_at = self._clock()
+
+    def _rates(self):
+        total = len(self._outcomes) or 1
+        return (sum(failed for failed, _ in self._outcomes) / total,
+                sum(slow for _, slow in self._outcomes) / total)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            now = self._clock()
+            errors, slow_calls = self._rates()
+            return {
+                "state": self.state,
+                "trips": self.trips,
+                "rejected": self.rejected,
+                "probes": self.probes,
+                "failed_probes": self.failed_probes,
+                "window_calls": len(self._outcomes),
+                "error_rate": round(errors, 3),
+                "slow_rate": round(slow_calls, 3),
+                "retry_in_seconds": (round(max(0.0, self.cooldown - (now - self._opened_at)), 1)
+                                     if self.state == self.OPEN else None)
+            }
+
+
+class CircuitBreakerBackend(LLMBackend):
+    """Fails fast with CircuitOpenError while ``breaker`` is open
+
+    Callers already fall back to local templates on errors, so an open breaker turns
+    a slow or failing LLM into an immediate template-only reply. The breaker is
+    shared by every API key, so only provider-wide trouble (timeouts, server errors)
+    counts against it; 429s are per key and handled by RateLimitedBackend.
+    """
+
+    def __init__(self, inner: LLMBackend, breaker: CircuitBreaker):
+        self.inner = inner
+        self.name = inner.name
+        self.breaker = breaker
+
+    def available(self) -> bool:
+        # Callers told False skip the backend, so that counts as a rejected call
+        if self.breaker.is_open():
+            self.breaker.reject()
+            return False
+        return self.inner.available()
+
+    @staticmethod
+    def _counts_as_failure(error: Exception) -> bool:
+        return getattr(error, "retryable", False) and not isinstance(error, LLMRateLimitError)
+
+    def _admit(self, stage: str) -> str:
+        admission = self.breaker.allow()
+        if admission is None:
+            raise CircuitOpenError(f"LLM circuit breaker is open; skipping {stage} call")
+        return admission
+
+    def complete(self, messages: List[Dict], model: str = DEFAULT_MODEL,
+                 stage: str = "default", **params) -> Completion:
+        admission = self._admit(stage)
+        start, failed = time.monotonic(), False
+        try:
+            return self.inner.complete(messages, model=model, stage=stage, **params)
+        except Exception as e:
+            failed = self._counts_as_failure(e)
+            raise
+        finally:
+            self.breaker.record(failed, time.monotonic() - start, admission)
+
+    def stream(self, messages: List[Dict], model: str = DEFAULT_MODEL,
+               stage: str = "default", **params) -> Iterator[str]:
+        admission = self._admit(stage)
+        start, failed = time.monotonic(), False
+        try:
+            yield from self.inner.stream(messages, model=model, stage=stage, **params)
+        except Exception as e:
+            failed = self._counts_as_failure(e)
+            raise
+        finally:
+            # Also runs when the reader stops early, so a probe is never left in flight
+            self.breaker.record(failed, time.monotonic() - start, admission)
+
+    async def acomplete(self, messages: List[Dict], model: str = DEFAULT_MODEL,
+                        stage: str = "default", **params) -> Completion:
+        admission = self._admit(stage)
+        start, failed = time.monotonic(), False
+        try:
+            return await self.inner.acomplete(messages, model=model, stage=stage, **params)
+        except Exception as e:
+            failed = self._counts_as_failure(e)
+            raise
+        finally:
+            self.breaker.record(failed, time.monotonic() - start, admission)
+
+
+class RateLimitedBackend(LLMBackend):
+    """Admits each request through the API key's AdaptiveRateLimiter
+
+    Sits directly in front of the provider, so retries and hedges take a slot too
+    and the limiter sees every 429. Requests over the limit wait up to
+    ``queue_timeout`` seconds, then fail with LLMQueueTimeoutError, which is not
+    retried. Queue wait and provider time are recorded separately.
+    """
+
+    def __init__(self, inner: LLMBackend, limiter: AdaptiveRateLimiter, queue_timeout: float = 10.0):
+        self.inner = inner
+        self.name = inner.name
+        self.limiter = limiter
+        self.queue_timeout = queue_timeout
+
+    def available(self) -> bool:
+        return self.inner.available()
+
+    def _admitted(self, stage: str, start: float, admitted: bool):
+        metrics.LLM_QUEUE_WAIT.observe(time.monotonic() - start, stage=stage, route=metrics.current_route())
+        if not admitted:
+            raise LLMQueueTimeoutError(f"Waited over {self.queue_timeout:g}s for the rate limiter; skipping {stage} call")
+
+    def _release(self, stage: str, model: str, start: float, error: Optional[Exception]):
+        latency = time.monotonic() - start
+        throttled = isinstance(error, LLMRateLimitError)
+        # Only successes and timeouts say how loaded the provider is
+        self.limiter.release(latency if error is None or isinstance(error, LLMTimeoutError) else None, throttled)
+        metrics.LLM_UPSTREAM_LATENCY.observe(latency, stage=stage, model=model, route=metrics.current_route())
+
+    def complete(self, messages: List[Dict], model: str = DEFAULT_MODEL,
+                 stage: str = "default", **params) -> Completion:
+        queued = time.monotonic()
+        self._admitted(stage, queued, self.limiter.acquire(self.queue_timeout))
+        start, error = time.monotonic(), None
+        try:
+            return self.inner.complete(messages, model=model, stage=stage, **params)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._release(stage, model, start, error)
+
+    def stream(self, messages: List[Dict], model: str = DEFAULT_MODEL,
+               stage: str = "default", **params) -> Iterator[str]:
+        queued = time.monotonic()
+        self._admitted(stage, queued, self.limiter.acquire(self.queue_timeout))
+        start, error = time.monotonic(), None
+        try:
+            yield from self.inner.stream(messages, model=model, stage=stage, **params)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._release(stage, model, start, error)
+
+    async def acomplete(self, messages: List[Dict], model: str = DEFAULT_MODEL,
+                        stage: str = "default", **params) -> Completion:
+        queued = time.monotonic()
+        self._admitted(stage, queued, await self.limiter.acquire_async(self.queue_timeout))
+        start, error = time.monotonic(), None
+        try:
+            return await self.inner.acomplete(messages, model=model, stage=stage, **params)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._release(stage, model, start, error)
+
+
+class MetricsBackend(LLMBackend):
+    """Records latency, token and outcome metrics for every call, labelled by stage, model and route
+
+    Sits outside the retry and breaker layers, so latency is what the caller waited
+    and a breaker rejection shows up as a CircuitOpenError outcome.
+    """
+
+    def __init__(self, inner: LLMBackend):
+        self.inner = inner
+        self.name = inner.name
+
+    def available(self) -> bool:
+        return self.inner.available()
+
+    @staticmethod
+    def _record(stage: str, model: str, start: float, error: Optional[Exception],
+                prompt_tokens: Optional[int] = None, completion_tokens: Optional[int] = None):
+        labels = {"stage": stage, "model": model, "route": metrics.current_route()}
+        metrics.LLM_REQUESTS.inc(outcome="ok" if error is None else type(error).__name__, **labels)
+        metrics.LLM_LATENCY.observe(time.monotonic() - start, **labels)
+        if prompt_tokens is not None:
+            metrics.LLM_PROMPT_TOKENS.observe(prompt_tokens, **labels)
+        if completion_tokens is not None:
+            metrics.LLM_COMPLETION_TOKENS.observe(completion_tokens, **labels)
+
+    @classmethod
+    def _record_completion(cls, stage: str, model: str, start: float, completion: Completion):
+        usage = completion.usage
+        cls._record(stage, model, start, None,
+                    usage.prompt_tokens if usage else None, usage.completion_tokens if usage else None)
+
+    def complete(self, messages: List[Dict], model: str = DEFAULT_MODEL,
+                 stage: str = "default", **params) -> Completion:
+        start = time.monotonic()
+        try:
+            completion = self.inner.complete(messages, model=model, stage=stage, **params)
+        except Exception as e:
+            self._record(stage, model, start, e)
+            raise
+        self._record_completion(stage, model, start, completion)
+        return completion
+
+    def stream(self, messages: List[Dict], model: str = DEFAULT_MODEL,
+               stage: str = "default", **params) -> Iterator[str]:
+        # Streams carry no usage, so tokens are counted locally once the stream ends
+        start, chunks, error = time.monotonic(), [], None
+        try:
+            for chunk in self.inner.stream(messages, model=model, stage=stage, **params):
+                chunks.append(chunk)
+                yield chunk
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            prompt = "\n".join(str(message.get("content", "")) for message in messages)
+            self._record(stage, model, start, error, count_tokens(prompt),
+                         count_tokens("".join(chunks)) if error is None else None)
+
+    async def acomplete(self, messages: List[Dict], model: str = DEFAULT_MODEL,
+                        stage: str = "default", **params) -> Completion:
+        start = time.monotonic()
+        try:
+            completion = await self.inner.acomplete(messages, model=model, stage=stage, **params)
+        except Exception as e:
+            self._record(stage, model, start, e)
+            raise
+        self._record_completion(stage, model, start, completion)
+        return completion
+
+
+def request_fingerprint(messages: List[Dict], model: str, stage: str, params: Dict, scope: str = "") -> str:
+    """Canonical hash of everything that decides a completion: same inputs, same key"""
+    payload = json.dumps({"scope": scope, "model": model, "stage": stage, "messages": messages, "params": params},
+                         sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Runs one call per key at a time; identical calls made meanwhile wait and share its outcome"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self._async_flights: Dict[Tuple[int, str], asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """``fn()``'s result, or that of the identical call in flight, and whether it was shared"""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = fn()
+            return flight.result, False
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    async def do_async(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """do for coroutine functions; calls are only shared within one event loop"""
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        with self._lock:
+            future = self._async_flights.get(flight_key)
+            leader = future is None
+            if leader:
+                future = self._async_flights[flight_key] = loop.create_future()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            # Shielded so a cancelled follower does not cancel the leader's call
+            return await asyncio.shield(future), True
+
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result, False
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark it retrieved, so an unawaited flight is not logged
+            raise
+        finally:
+            with self._lock:
+                del self._async_flights[flight_key]
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            calls = self.leaders + self.coalesced
+            return {
+                "in_flight": len(self._flights) + len(self._async_flights),
+                "upstream_calls": self.leaders,
+                "coalesced": self.coalesced,
+                "dedup_rate": round(self.coalesced / calls, 3) if calls else None
+            }
+
+
+class SingleFlightBackend(LLMBackend):
+    """Shares one upstream call between identical requests that are in flight together
+
+    Requests match on a canonical hash of ``scope`` (the API key), model, stage,
+    messages and sampling parameters. Waiting callers get the same completion, or the
+    same error, with zero usage since they spent no tokens. Streams are passed
+    through, as their tokens cannot be replayed to a second reader.
+    """
+
+    def __init__(self, inner: LLMBackend, group: SingleFlight, scope: str = ""):
+        self.inner = inner
+        self.name = inner.name
+        self.group = group
+        self.scope = scope
+
+    def available(self) -> bool:
+        return self.inner.available()
+
+    def _shared(self, completion: Completion, stage: str) -> Completion:
+        metrics.LLM_COALESCED.inc(stage=stage, route=metrics.current_route())
+        return replace(completion, usage=Usage(0, 0) if completion.usage else None)
+
+    def complete(self, messages: List[Dict], model: str = DEFAULT_MODEL,
+                 stage: str = "default", **params) -> Completion:
+        key = request_fingerprint(messages, model, stage, params, self.scope)
+        completion, shared = self.group.do(
+            key, lambda: self.inner.complete(messages, model=model, stage=stage, **params))
+        return self._shared(completion, stage) if shared else completion
+
+    def stream(self, messages: List[Dict], model: str = DEFAULT_MODEL,
+               stage: str = "default", **params) -> Iterator[str]:
+        return self.inner.stream(messages, model=model, stage=stage, **params)
+
+    async def acomplete(self, messages: List[Dict], model: str = DEFAULT_MODEL,
+                        stage: str = "default", **params) -> Completion:
+        key = request_fingerprint(messages, model, stage, params, self.scope)
+        completion, shared = await self.group.do_async(
+            key, lambda: self.inner.acomplete(messages, model=model, stage=stage, **params))
+        return self._shared(completion, stage) if shared else completion
@@ -0,0 +1,188 @@
+"""
+Shared OpenAI Clients for Recruiter Bot and Negotiator Bot
+Keeps one keep-alive connection pool per API key instead of a new client per request
+"""
+
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+
+def hash_api_key(api_key: str) -> str:
+    """Stable identifier for an API key that never exposes the key itself"""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class _PooledClient:
+    client: Any  # OpenAI, or AsyncOpenAI when loop is set
+    last_used: float
+    loop: Optional[asyncio.AbstractEventLoop] = None  # the event loop an async client's connections belong to
+    users: int = 0
+    retired: bool = False  # evicted; closed once its last user releases it
+
+
+class ClientRegistry:
+    """Process-wide OpenAI clients keyed by API-key hash, with idle eviction and a size cap
+
+    Sync and async clients are pooled separately, each map capped at ``max_clients``.
+    An evicted client that is still leased (e.g. mid-stream) is closed when released.
+    """
+
+    def __init__(self, max_clients: int = 64, idle_ttl: float = 600.0,
+                 max_connections: int = 20, max_keepalive_connections: int = 10,
+                 keepalive_expiry: float = 60.0, base_url: Optional[str] = None):
+        self.max_clients = max_clients
+        self.idle_ttl = idle_ttl
+        self.base_url = base_url
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self._timeout = httpx.Timeout(60.0, connect=5.0)
+        self._clients: "OrderedDict[str, _PooledClient]" = OrderedDict()
+        self._async_clients: "OrderedDict[str, _PooledClient]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _new_client(self, api_key: str) -> OpenAI:
+        return OpenAI(
+            api_key=api_key,
+            base_url=self.base_url,
+            max_retries=0,  # retried with per-stage policies by llm_backend.ResilientBackend
+            http_client=httpx.Client(limits=self._limits, timeout=self._timeout)
+        )
+
+    def _new_async_client(self, api_key: str) -> AsyncOpenAI:
+        return AsyncOpenAI(
+            api_key=api_key,
+            base_url=self.base_url,
+            max_retries=0,
+            http_client=httpx.AsyncClient(limits=self._limits, timeout=self._timeout)
+        )
+
+    def get(self, api_key: str) -> OpenAI:
+        """Return the pooled client for this API key, creating it on first use
+
+        Fine for a single request; hold a lease() for anything longer, such as a stream.
+        """
+        with self.lease(api_key) as client:
+            return client
+
+    @contextmanager
+    def lease(self, api_key: str) -> Iterator[OpenAI]:
+        """The pooled client for this API key, kept open until the block exits"""
+        pooled = self._checkout(self._clients, api_key, self._new_client)
+        try:
+            yield pooled.client
+        finally:
+            self._checkin(pooled)
+
+    @contextmanager
+    def lease_async(self, api_key: str) -> Iterator[AsyncOpenAI]:
+        """The pooled async client for this API key and the running event loop
+
+        Use it inside a coroutine: async connections belong to one loop, so a client made
+        on another loop (e.g. an earlier asyncio.run) is replaced.
+        """
+        loop = asyncio.get_running_loop()
+        pooled = self._checkout(self._async_clients, api_key, self._new_async_client, loop)
+        try:
+            yield pooled.client
+        finally:
+            self._checkin(pooled)
+
+    def _checkout(self, clients: "OrderedDict[str, _PooledClient]", api_key: str, create: Callable[[str], Any],
+                  loop: Optional[asyncio.AbstractEventLoop] = None) -> _PooledClient:
+        key = hash_api_key(api_key)
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(clients, now)
+            pooled = clients.get(key)
+            if pooled is not None and pooled.loop is loop:
+                self.hits += 1
+                clients.move_to_end(key)
+            else:
+                if pooled is not None:
+                    del clients[key]
+                    self._retire(pooled)
+                self.misses += 1
+                pooled = clients[key] = _PooledClient(client=create(api_key), last_used=now, loop=loop)
+                while len(clients) > self.max_clients:
+                    _, oldest = clients.popitem(last=False)
+                    self._retire(oldest)
+            pooled.last_used = now
+            pooled.users += 1
+            return pooled
+
+    def _checkin(self, pooled: _PooledClient):
+        with self._lock:
+            pooled.users -= 1
+            pooled.last_used = time.monotonic()
+            if pooled.retired and pooled.users == 0:
+                self._close(pooled)
+
+    def _evict_idle(self, clients: "OrderedDict[str, _PooledClient]", now: float):
+        # Entries are kept in least-recently-used order, so idle ones are at the front
+        while clients:
+            key, pooled = next(iter(clients.items()))
+            if now - pooled.last_used < self.idle_ttl:
+                break
+            del clients[key]
+            self._retire(pooled)
+
+    def _retire(self, pooled: _PooledClient):
+        """Drop a client from the pool, closing it now unless it is leased; needs the lock"""
+        self.evictions += 1
+        pooled.retired = True
+        if pooled.users == 0:
+            self._close(pooled)
+
+    def _close(self, pooled: _PooledClient):
+        try:
+            if pooled.loop is None:
+                pooled.client.close()
+            elif not pooled.loop.is_closed():
+                # An async client has to be closed on its own loop; a closed loop took its connections with it
+                asyncio.run_coroutine_threadsafe(pooled.client.close(), pooled.loop)
+        except Exception as e:
+            print(f"Error closing pooled OpenAI client: {e}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "async_clients": len(self._async_clients),
+                "max_clients": self.max_clients,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+    def clear(self):
+        with self._lock:
+            for clients in (self._clients, self._async_clients):
+                while clients:
+                    _, pooled = clients.popitem(last=False)
+                    pooled.retired = True
+                    if pooled.users == 0:
+                        self._close(pooled)
+
+
+client_registry = ClientRegistry()
+
+
+def get_openai_client(api_key: str) -> OpenAI:
+    """Pooled OpenAI client for the given API key"""
+    return client_registry.get(api_key)
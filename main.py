@@ -1,9 +1,12 @@
 import os
 import json
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, send_file, Response, stream_with_context
 from werkzeug.utils import secure_filename
-from openai import OpenAI
 import random
+import uuid
+import asyncio
+import threading
+import time
 from dotenv import load_dotenv
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
@@ -12,9 +15,26 @@ from reportlab.lib.units import inch
 from reportlab.lib import colors
 from datetime import datetime
 import io
-from typing import Dict, List, Optional
-from dataclasses import dataclass
+from string import Formatter
+from types import MappingProxyType
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, replace
 from enum import Enum
+from tactic_classifier import get_tactic_classifier
+from recruiter_rules import PrescreenStats, evaluate_locally, prescreen
+from job_queue import JobQueue, QueueFullError
+from rate_limiter import AdaptiveRateLimiter, RateLimiterRegistry
+import metrics
+import tracing
+from prompt_budget import (STAGE_BUDGETS, PromptBuilder, TurnUsage, compact_offer, count_tokens,
+                           current_turn_usage, record_usage, start_turn_usage)
+from llm_clients import hash_api_key
+from llm_backend import (STAGE_POLICIES, CallStats, CircuitBreaker, CircuitBreakerBackend, FakeLLMBackend,
+                         LLMBackend, MetricsBackend, OpenAIBackend, RateLimitedBackend, ResilientBackend,
+                         SingleFlight, SingleFlightBackend, parse_latency_spec)
+from context_registry import ContextRegistry
+from context_store import BoundedContextStore, ContextExpiredError, ContextStorage
 # Import moved to avoid circular dependency
 
 # Load environment variables from .env file
@@ -41,12 +61,29 @@ class NegotiationStrategy(Enum):
     COLLABORATIVE_PROBLEM_SOLVER = "collaborative_problem_solver"
     STRATEGIC_QUESTIONER = "strategic_questioner"
 
+class PipelineMode(Enum):
+    TWO_CALL = "two_call"
+    FUSED = "fused"
+
+class AnalysisMode(Enum):
+    LLM = "llm"
+    LOCAL = "local"
+    LOCAL_FIRST = "local_first"
+
+class ResponseMode(Enum):
+    FAST = "fast"
+    BALANCED = "balanced"
+    QUALITY = "quality"
+
 class ResponseTone(Enum):
     POLITE_BUT_FIRM = "polite_but_firm"
     PROFESSIONALLY_DISAPPOINTED = "professionally_disappointed"
     STRATEGICALLY_CURIOUS = "strategically_curious"
     CONFIDENTLY_ASSERTIVE = "confidently_assertive"
 
+# Returned whenever the tactic analysis cannot be obtained
+DEFAULT_ANALYSIS = {"tactic": "unknown", "pressure_points": [], "response_strategy": "professional"}
+
 @dataclass
 class NegotiationContext:
     company_name: str
@@ -59,6 +96,18 @@ class NegotiationContext:
     target_benefits: List[str]
     deal_breakers: List[str]
     leverage_points: List[str]
+    
+    def to_dict(self) -> Dict:
+        """JSON-serializable form used by persistent context storage"""
+        data = asdict(self)
+        data["strategy"] = self.strategy.value
+        return data
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> "NegotiationContext":
+        data = dict(data)
+        data["strategy"] = NegotiationStrategy(data["strategy"])
+        return cls(**data)
 
 @dataclass
 class ResponseTemplate:
@@ -69,98 +118,88 @@ class ResponseTemplate:
     variables: List[str]
     effectiveness_score: float
 
-class NegotiatorBot:
-    def __init__(self, api_key: str = None):
-        self.api_key = api_key
-        if not self.api_key:
-            raise ValueError("OpenAI API key is required")
-        
-        self.client = OpenAI(api_key=self.api_key)
-        self.response_templates = self._load_response_templates()
-        self.negotiation_contexts = {}
-        
-    def _load_response_templates(self) -> List[ResponseTemplate]:
-        """Load pre-built response templates for different negotiation scenarios"""
-        templates = [
-            # Professional Passive-Aggressive Templates
-            ResponseTemplate(
-                template_id="salary_undervalued",
-                strategy=NegotiationStrategy.PROFESSIONAL_PASSIVE_AGGRESSIVE,
-                tone=ResponseTone.PROFESSIONALLY_DISAPPOINTED,
-                template_text="""Thank you for your offer. While I appreciate the opportunity, I must express some concern about the compensation package. Given my {experience_years} years of experience in {industry} and my track record of {achievement}, I had hoped for a more competitive offer that reflects market standards. 
+def load_response_templates() -> List[ResponseTemplate]:
+    """Load pre-built response templates for different negotiation scenarios"""
+    templates = [
+        # Professional Passive-Aggressive Templates
+        ResponseTemplate(
+            template_id="salary_undervalued",
+            strategy=NegotiationStrategy.PROFESSIONAL_PASSIVE_AGGRESSIVE,
+            tone=ResponseTone.PROFESSIONALLY_DISAPPOINTED,
+            template_text="""Thank you for your offer. While I appreciate the opportunity, I must express some concern about the compensation package. Given my {experience_years} years of experience in {industry} and my track record of {achievement}, I had hoped for a more competitive offer that reflects market standards. 
 
 I'm curious about your compensation philosophy - do you typically benchmark against industry standards? I'd be interested to understand how you arrived at this figure, as it seems significantly below what I've seen for similar roles at comparable companies.""",
-                variables=["experience_years", "industry", "achievement"],
-                effectiveness_score=0.85
-            ),
-            
-            # More Aggressive and Persuasive Templates
-            ResponseTemplate(
-                template_id="market_value_assertion_strong",
-                strategy=NegotiationStrategy.CONFIDENT_ASSERTIVE,
-                tone=ResponseTone.CONFIDENTLY_ASSERTIVE,
-                template_text="""I appreciate the offer, but I need to be direct about the market reality. My research shows that professionals with my {experience_years} years of experience in {industry} and proven track record of {achievement} are commanding {target_salary_range} in the current market.
+            variables=["experience_years", "industry", "achievement"],
+            effectiveness_score=0.85
+        ),
+        
+        # More Aggressive and Persuasive Templates
+        ResponseTemplate(
+            template_id="market_value_assertion_strong",
+            strategy=NegotiationStrategy.CONFIDENT_ASSERTIVE,
+            tone=ResponseTone.CONFIDENTLY_ASSERTIVE,
+            template_text="""I appreciate the offer, but I need to be direct about the market reality. My research shows that professionals with my {experience_years} years of experience in {industry} and proven track record of {achievement} are commanding {target_salary_range} in the current market.
 
 I have multiple offers in the pipeline, and while I'm genuinely excited about this opportunity, I need to ensure we're aligned on compensation. The current offer is approximately {salary_gap} below market rate, which concerns me about how the company values top talent.
 
 What flexibility do you have to bridge this gap? I'm confident I can deliver exceptional value, but I need compensation that reflects that value proposition.""",
-                variables=["experience_years", "industry", "achievement", "target_salary_range", "salary_gap"],
-                effectiveness_score=0.92
-            ),
-            
-            ResponseTemplate(
-                template_id="leverage_competition",
-                strategy=NegotiationStrategy.CONFIDENT_ASSERTIVE,
-                tone=ResponseTone.CONFIDENTLY_ASSERTIVE,
-                template_text="""I'm excited about this role, but I need to be transparent about my situation. I have a competing offer from {competitor_company} for {competing_salary}, and while I prefer this opportunity, the compensation gap is significant.
+            variables=["experience_years", "industry", "achievement", "target_salary_range", "salary_gap"],
+            effectiveness_score=0.92
+        ),
+        
+        ResponseTemplate(
+            template_id="leverage_competition",
+            strategy=NegotiationStrategy.CONFIDENT_ASSERTIVE,
+            tone=ResponseTone.CONFIDENTLY_ASSERTIVE,
+            template_text="""I'm excited about this role, but I need to be transparent about my situation. I have a competing offer from {competitor_company} for {competing_salary}, and while I prefer this opportunity, the compensation gap is significant.
 
 My decision timeline is tight - I need to respond to them by {deadline}. However, I'm willing to give you priority if we can find a mutually beneficial arrangement.
 
 What's the highest you can go? I'm looking for {target_salary} to make this work, but I'm open to creative solutions like performance bonuses, equity, or accelerated review cycles.""",
-                variables=["competitor_company", "competing_salary", "deadline", "target_salary"],
-                effectiveness_score=0.95
-            ),
-            
-            ResponseTemplate(
-                template_id="value_proposition_strong",
-                strategy=NegotiationStrategy.CONFIDENT_ASSERTIVE,
-                tone=ResponseTone.CONFIDENTLY_ASSERTIVE,
-                template_text="""Let me be clear about what I bring to the table. In my previous role, I {specific_achievement} which resulted in {quantified_impact}. I'm not just looking for a job - I'm looking to make a significant impact.
+            variables=["competitor_company", "competing_salary", "deadline", "target_salary"],
+            effectiveness_score=0.95
+        ),
+        
+        ResponseTemplate(
+            template_id="value_proposition_strong",
+            strategy=NegotiationStrategy.CONFIDENT_ASSERTIVE,
+            tone=ResponseTone.CONFIDENTLY_ASSERTIVE,
+            template_text="""Let me be clear about what I bring to the table. In my previous role, I {specific_achievement} which resulted in {quantified_impact}. I'm not just looking for a job - I'm looking to make a significant impact.
 
 The current offer doesn't reflect the value I can deliver. I'm confident I can {future_value_proposition} within the first year, which would justify a higher compensation package.
 
 I'm asking for {target_salary} because that's what the market pays for someone who can deliver these results. What do you think about structuring this as a performance-based increase with a higher base?""",
-                variables=["specific_achievement", "quantified_impact", "future_value_proposition", "target_salary"],
-                effectiveness_score=0.90
-            ),
-            
-            ResponseTemplate(
-                template_id="benefits_inadequate",
-                strategy=NegotiationStrategy.PROFESSIONAL_PASSIVE_AGGRESSIVE,
-                tone=ResponseTone.STRATEGICALLY_CURIOUS,
-                template_text="""I notice the benefits package is quite different from what I've seen at other companies in this space. Specifically, the {benefit_type} seems limited compared to industry standards. 
+            variables=["specific_achievement", "quantified_impact", "future_value_proposition", "target_salary"],
+            effectiveness_score=0.90
+        ),
+        
+        ResponseTemplate(
+            template_id="benefits_inadequate",
+            strategy=NegotiationStrategy.PROFESSIONAL_PASSIVE_AGGRESSIVE,
+            tone=ResponseTone.STRATEGICALLY_CURIOUS,
+            template_text="""I notice the benefits package is quite different from what I've seen at other companies in this space. Specifically, the {benefit_type} seems limited compared to industry standards. 
 
 Could you help me understand your benefits philosophy? I'm particularly interested in how you view employee retention and work-life balance, as these factors significantly impact my decision-making process.""",
-                variables=["benefit_type"],
-                effectiveness_score=0.80
-            ),
-            
-            ResponseTemplate(
-                template_id="market_value_assertion",
-                strategy=NegotiationStrategy.CONFIDENT_ASSERTIVE,
-                tone=ResponseTone.CONFIDENTLY_ASSERTIVE,
-                template_text="""Based on my research and conversations with industry peers, my market value for this role is significantly higher than what's being offered. My expertise in {skill_area} and proven track record of {specific_achievement} command premium compensation.
+            variables=["benefit_type"],
+            effectiveness_score=0.80
+        ),
+        
+        ResponseTemplate(
+            template_id="market_value_assertion",
+            strategy=NegotiationStrategy.CONFIDENT_ASSERTIVE,
+            tone=ResponseTone.CONFIDENTLY_ASSERTIVE,
+            template_text="""Based on my research and conversations with industry peers, my market value for this role is significantly higher than what's being offered. My expertise in {skill_area} and proven track record of {specific_achievement} command premium compensation.
 
 I'm confident I can deliver exceptional value to {company_name}, but I need to ensure the compensation reflects that value proposition. Let's discuss how we can align the offer with market standards.""",
-                variables=["skill_area", "specific_achievement", "company_name"],
-                effectiveness_score=0.88
-            ),
-            
-            ResponseTemplate(
-                template_id="creative_solution",
-                strategy=NegotiationStrategy.COLLABORATIVE_PROBLEM_SOLVER,
-                tone=ResponseTone.POLITE_BUT_FIRM,
-                template_text="""I understand budget constraints, but I'm confident we can find a creative solution that works for both parties. Here are some alternatives I'd be open to discussing:
+            variables=["skill_area", "specific_achievement", "company_name"],
+            effectiveness_score=0.88
+        ),
+        
+        ResponseTemplate(
+            template_id="creative_solution",
+            strategy=NegotiationStrategy.COLLABORATIVE_PROBLEM_SOLVER,
+            tone=ResponseTone.POLITE_BUT_FIRM,
+            template_text="""I understand budget constraints, but I'm confident we can find a creative solution that works for both parties. Here are some alternatives I'd be open to discussing:
 
 - Performance-based bonuses tied to specific metrics
 - Additional equity/stock options
@@ -169,18 +208,205 @@ I'm confident I can deliver exceptional value to {company_name}, but I need to e
 - Earlier salary review timeline
 
 What combination of these would make sense for your organization?""",
-                variables=[],
-                effectiveness_score=0.87
-            )
-        ]
-        return templates
+            variables=[],
+            effectiveness_score=0.87
+        )
+    ]
+    return templates
+
+def _current_salary(context: NegotiationContext) -> Optional[int]:
+    """Numeric salary of the current offer (e.g. "$85,000" -> 85000), or None when it has no digits"""
+    current_salary = context.current_offer.get("salary", 0)
+    if isinstance(current_salary, str):
+        digits = ''.join(filter(str.isdigit, current_salary))
+        return int(digits) if digits else None
+    return current_salary
+
+def _resolve_salary_gap(context: NegotiationContext):
+    if context.current_offer and context.target_salary:
+        current_salary = _current_salary(context)
+        if current_salary is not None:
+            return f"${context.target_salary - current_salary:,}"
+    return "$15,000-$25,000"
+
+_COMPETITOR_COMPANIES = ("Google", "Microsoft", "Amazon", "Apple", "Meta", "Netflix", "Uber", "Airbnb")
+_QUANTIFIED_IMPACTS = ("increased revenue by 150%", "reduced costs by $2M annually", "improved efficiency by 40%", "led to 300% user growth")
+_FUTURE_VALUE_PROPOSITIONS = ("increase team productivity by 50%", "deliver $5M in cost savings", "launch 3 major features", "build a scalable architecture")
+
+# Dispatch table: template variable name -> resolver taking the negotiation context
+TEMPLATE_VARIABLE_RESOLVERS: Mapping[str, Callable[[NegotiationContext], object]] = MappingProxyType({
+    "experience_years": lambda c: c.user_profile.get("years_experience", "5+"),
+    "industry": lambda c: c.user_profile.get("industry", "technology"),
+    "achievement": lambda c: c.user_profile.get("key_achievement", "delivering exceptional results"),
+    "benefit_type": lambda c: "health insurance",
+    "skill_area": lambda c: c.user_profile.get("primary_skill", "software development"),
+    "specific_achievement": lambda c: c.user_profile.get("key_achievement", "increasing team productivity by 40%"),
+    "company_name": lambda c: c.company_name,
+    "target_salary_range": lambda c: f"${c.target_salary - 10000}-${c.target_salary + 10000}" if c.target_salary else "$100,000-$130,000",
+    "salary_gap": _resolve_salary_gap,
+    "competitor_company": lambda c: _COMPETITOR_COMPANIES[hash(c.company_name) % len(_COMPETITOR_COMPANIES)],
+    "competing_salary": lambda c: f"${(c.target_salary or 120000) + 5000:,}",
+    "deadline": lambda c: "Friday",
+    "target_salary": lambda c: f"${c.target_salary:,}" if c.target_salary else "$120,000",
+    "quantified_impact": lambda c: _QUANTIFIED_IMPACTS[hash(c.company_name) % len(_QUANTIFIED_IMPACTS)],
+    "future_value_proposition": lambda c: _FUTURE_VALUE_PROPOSITIONS[hash(c.company_name) % len(_FUTURE_VALUE_PROPOSITIONS)],
+})
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    """A response template with its format string parsed once up front"""
+    template: ResponseTemplate
+    # (literal text, field name or None, format spec) segments from string.Formatter.parse
+    segments: Tuple[Tuple[str, Optional[str], str], ...]
+    resolvers: Tuple[Tuple[str, Callable[[NegotiationContext], object]], ...]
+    salary_sensitive: bool
+    
+    @classmethod
+    def compile(cls, template: ResponseTemplate) -> "CompiledTemplate":
+        segments = tuple((literal, field, spec or "")
+                         for literal, field, spec, _ in Formatter().parse(template.template_text))
+        return cls(
+            template=template,
+            segments=segments,
+            resolvers=tuple((var, TEMPLATE_VARIABLE_RESOLVERS[var]) for var in template.variables
+                            if var in TEMPLATE_VARIABLE_RESOLVERS),
+            salary_sensitive="salary" in template.template_id
+        )
+    
+    def render(self, variables: Mapping) -> str:
+        parts = []
+        for literal, field, spec in self.segments:
+            parts.append(literal)
+            if field is not None:
+                parts.append(format(variables[field], spec))
+        return "".join(parts)
+
+class TemplateRegistry:
+    """Immutable, precompiled set of response templates indexed by strategy"""
+    
+    def __init__(self, templates: List[ResponseTemplate]):
+        compiled = tuple(CompiledTemplate.compile(t) for t in templates)
+        self.templates: Tuple[ResponseTemplate, ...] = tuple(c.template for c in compiled)
+        self._by_id = MappingProxyType({c.template.template_id: c for c in compiled})
+        self._by_strategy = MappingProxyType({
+            strategy: tuple(c for c in compiled if c.template.strategy == strategy)
+            for strategy in NegotiationStrategy
+        })
+    
+    def compiled(self, template: ResponseTemplate) -> CompiledTemplate:
+        return self._by_id[template.template_id]
+    
+    def for_strategy(self, strategy: NegotiationStrategy) -> Tuple[CompiledTemplate, ...]:
+        return self._by_strategy[strategy]
+
+# Shared by every NegotiatorBot instance
+RESPONSE_TEMPLATES = TemplateRegistry(load_response_templates())
+
+class LazyAnalysis(Mapping):
+    """Tactic analysis that is only computed the first time one of its fields is read"""
+    
+    def __init__(self, loader: Callable[[], Dict]):
+        self._loader = loader
+        self._value = None
+    
+    @classmethod
+    def of(cls, value: Dict) -> "LazyAnalysis":
+        """Wrap an analysis that has already been computed"""
+        analysis = cls(lambda: value)
+        analysis._value = value
+        return analysis
+    
+    @property
+    def resolved(self) -> bool:
+        return self._value is not None
+    
+    def _resolve(self) -> Dict:
+        if self._value is None:
+            self._value = self._loader()
+        return self._value
+    
+    def __getitem__(self, key):
+        return self._resolve()[key]
+    
+    def __iter__(self):
+        return iter(self._resolve())
+    
+    def __len__(self):
+        return len(self._resolve())
+
+@dataclass(frozen=True)
+class ResponsePlan:
+    """How one turn is produced: the pipeline, how the message is analyzed and the reply's token limit"""
+    mode: str
+    pipeline: Optional[PipelineMode]  # None: the filled template, without any LLM call
+    analysis_mode: AnalysisMode
+    completion_tokens: Optional[int] = None  # None: the stage budget
+    degraded: bool = False  # the LLM was unavailable, so the template was used instead
+    
+    def to_dict(self) -> Dict:
+        return {
+            "mode": self.mode,
+            "pipeline": self.pipeline.value if self.pipeline else "template",
+            "analysis": self.analysis_mode.value,
+            "max_tokens": self.completion_tokens,
+            "degraded": self.degraded
+        }
+
+# Plans for the per-request modes; "quality" is the two-call pipeline with the bot's own analysis_mode
+RESPONSE_PLANS = {
+    ResponseMode.FAST: ResponsePlan("fast", None, AnalysisMode.LOCAL),
+    ResponseMode.BALANCED: ResponsePlan("balanced", PipelineMode.TWO_CALL, AnalysisMode.LOCAL, completion_tokens=160),
+}
+
+@dataclass
+class ResponseDraft:
+    """A generated reply that has not been recorded in the negotiation history yet"""
+    context_id: str
+    incoming_message: str
+    offer_details: Optional[Dict]
+    template: ResponseTemplate
+    response: str
+    analysis: LazyAnalysis
+    usage: TurnUsage
+    plan: ResponsePlan
+
+class ContextUnavailableError(ValueError):
+    """Raised when a negotiation context was never created or has expired"""
+    
+    def __init__(self, context_id: str, expired: bool):
+        super().__init__(f"Context {context_id} {'expired' if expired else 'not found'}")
+        self.context_id = context_id
+        self.expired = expired
+
+class NegotiatorBot:
+    def __init__(self, api_key: str = None, pipeline_mode: PipelineMode = PipelineMode.TWO_CALL,
+                 analysis_mode: AnalysisMode = AnalysisMode.LLM, local_confidence_threshold: float = 0.6,
+                 context_store: ContextStorage = None, backend: LLMBackend = None):
+        self.api_key = api_key
+        if not self.api_key:
+            raise ValueError("OpenAI API key is required")
+        
+        self.backend = backend or self._create_backend()
+        self.pipeline_mode = PipelineMode(pipeline_mode)
+        self.analysis_mode = AnalysisMode(analysis_mode)
+        self.local_confidence_threshold = local_confidence_threshold
+        self.stage_budgets = dict(STAGE_BUDGETS)
+        self.template_registry = RESPONSE_TEMPLATES
+        self.response_templates = RESPONSE_TEMPLATES.templates
+        # Pass a shared store to apply one memory budget across many bots
+        self.negotiation_contexts = context_store if context_store is not None else BoundedContextStore()
+        
+    def _create_backend(self) -> LLMBackend:
+        """LLM backend selected by LLM_BACKEND, on the pooled client for this API key"""
+        return create_llm_backend(self.api_key)
     
     def create_negotiation_context(self, company_name: str, position: str, 
                                  user_profile: Dict, target_salary: int = None,
                                  target_benefits: List[str] = None,
                                  deal_breakers: List[str] = None) -> str:
         """Create a new negotiation context"""
-        context_id = f"{company_name}_{position}_{int(datetime.now().timestamp())}"
+        # The random suffix keeps IDs unique when several users start the same negotiation at once
+        context_id = f"{company_name}_{position}_{int(datetime.now().timestamp())}_{uuid.uuid4().hex[:8]}"
         
         context = NegotiationContext(
             company_name=company_name,
@@ -220,200 +446,395 @@ What combination of these would make sense for your organization?""",
     def generate_response(self, context_id: str, incoming_message: str, 
                          offer_details: Dict = None) -> str:
         """Generate a negotiation response using AI and templates"""
-        if context_id not in self.negotiation_contexts:
-            raise ValueError(f"Context {context_id} not found")
+        return self.generate_response_details(context_id, incoming_message, offer_details)["response"]
+    
+    @tracing.traced("generate_response")
+    def generate_response_details(self, context_id: str, incoming_message: str,
+                                  offer_details: Dict = None, mode: Optional[ResponseMode] = None) -> Dict:
+        """Generate a negotiation response and report how the turn was produced
+        
+        ``mode`` (fast, balanced or quality) overrides the bot's pipeline for this turn.
+        """
+        context = self._start_turn(context_id, offer_details)
+        plan = self._plan_for(mode)
+        template, response, analysis = self._compose_response(context, incoming_message, plan)
+        return self._finish_turn(context_id, template, response, analysis, plan=plan)
+    
+    @tracing.traced("draft_response")
+    def draft_response(self, context_id: str, incoming_message: str,
+                       offer_details: Dict = None, mode: Optional[ResponseMode] = None) -> "ResponseDraft":
+        """Generate a reply without recording anything, e.g. speculatively ahead of time
+        
+        The draft is computed against a snapshot of the context with ``offer_details``
+        applied; pass it to commit_draft to log it as the turn.
+        """
+        usage = start_turn_usage()
+        context = self._load_context(context_id)
+        snapshot = replace(
+            context,
+            current_offer=offer_details or context.current_offer,
+            negotiation_history=list(context.negotiation_history),
+            leverage_points=list(context.leverage_points)
+        )
+        plan = self._plan_for(mode)
+        template, response, analysis = self._compose_response(snapshot, incoming_message, plan)
+        return ResponseDraft(context_id, incoming_message, offer_details, template, response, analysis, usage, plan)
+    
+    def commit_draft(self, draft: "ResponseDraft") -> Dict:
+        """Record a draft from draft_response as the turn it was generated for"""
+        self._record_offer(draft.context_id, self._load_context(draft.context_id), draft.offer_details)
+        return self._finish_turn(draft.context_id, draft.template, draft.response, draft.analysis,
+                                 draft.usage, draft.plan)
+    
+    def _plan_for(self, mode: Optional[ResponseMode]) -> ResponsePlan:
+        """The execution plan for a turn in ``mode``, or the bot's own pipeline when mode is None"""
+        if mode is None:
+            plan = ResponsePlan("default", self.pipeline_mode, self.analysis_mode)
+        elif ResponseMode(mode) == ResponseMode.QUALITY:
+            plan = ResponsePlan("quality", PipelineMode.TWO_CALL, self.analysis_mode)
+        else:
+            plan = RESPONSE_PLANS[ResponseMode(mode)]
+        
+        if plan.pipeline is None:
+            return plan
+        if not self.backend.available():
+            metrics.record_fallback("turn", reason="llm_unavailable")
+            return replace(plan, pipeline=None, analysis_mode=AnalysisMode.LOCAL,
+                           completion_tokens=None, degraded=True)
+        stage = "fused" if plan.pipeline == PipelineMode.FUSED else "enhancement"
+        return replace(plan, completion_tokens=plan.completion_tokens or self.stage_budgets[stage].completion_tokens)
+    
+    def _compose_response(self, context: NegotiationContext, incoming_message: str,
+                          plan: ResponsePlan) -> Tuple[ResponseTemplate, str, LazyAnalysis]:
+        """Pick a template and produce the reply for one turn, without touching the history"""
+        if plan.pipeline is None:
+            return self._compose_local_response(context, incoming_message)
+        if plan.pipeline == PipelineMode.FUSED:
+            # Template selection only depends on the context, so the analysis and
+            # the enhanced reply can come back from a single completion
+            template = self._select_template(LazyAnalysis.of({}), context)
+            fused_analysis, response = self._generate_fused_response(
+                incoming_message, template, context, plan.completion_tokens)
+            analysis = LazyAnalysis.of(fused_analysis)
+        else:
+            # Analyze the incoming message only if a scorer or prompt reads from it
+            analysis = LazyAnalysis(lambda: self._run_analysis(incoming_message, context, plan.analysis_mode))
+            
+            # Select appropriate template
+            template = self._select_template(analysis, context)
+            
+            # Generate response using AI
+            response = self._generate_ai_response(template, context, analysis, plan.completion_tokens)
+        
+        return template, response, analysis
+    
+    def _compose_local_response(self, context: NegotiationContext,
+                                incoming_message: str) -> Tuple[ResponseTemplate, str, LazyAnalysis]:
+        """Template-only turn with local tactic classification, used while the LLM is unavailable"""
+        analysis = LazyAnalysis(lambda: get_tactic_classifier().classify(incoming_message))
+        template = self._select_template(analysis, context)
+        return template, self._format_template(template, context), analysis
+    
+    def generate_response_stream(self, context_id: str, incoming_message: str,
+                                 offer_details: Dict = None) -> Iterator[str]:
+        """Yield the enhanced reply token by token as the completion streams in
         
-        context = self.negotiation_contexts[context_id]
+        Always uses the two-call pipeline, since a fused JSON reply cannot be shown
+        incrementally. The reply is logged in the history once the stream ends, or as
+        much of it as was sent if the client goes away first.
+        """
+        context = self._start_turn(context_id, offer_details)
+        plan = replace(self._plan_for(ResponseMode.QUALITY), mode="stream")
+        if plan.pipeline is None:
+            template, response, analysis = self._compose_local_response(context, incoming_message)
+            try:
+                yield response
+            finally:
+                self._finish_turn(context_id, template, response, analysis, plan=plan)
+            return
+        
+        analysis = LazyAnalysis(lambda: self._run_analysis(incoming_message, context, plan.analysis_mode))
+        template = self._select_template(analysis, context)
+        formatted_template = self._format_template(template, context)
+        enhancement_prompt = self._build_enhancement_prompt(formatted_template, context)
         
+        parts = []
+        try:
+            with tracing.span("enhance", streamed=True):
+                try:
+                    stream = self.backend.stream(
+                        [{"role": "user", "content": enhancement_prompt}],
+                        stage="enhancement",
+                        temperature=0.8,
+                        max_tokens=plan.completion_tokens
+                    )
+                    
+                    for token in stream:
+                        parts.append(token)
+                        yield token
+                except Exception as e:
+                    print(f"Error streaming AI response: {e}")
+                    metrics.record_fallback("enhancement", e)
+                    if not parts:
+                        parts.append(formatted_template)
+                        yield formatted_template
+                else:
+                    # Streamed chunks carry no usage, so the completion is counted locally
+                    record_usage("enhancement", enhancement_prompt, "".join(parts))
+        finally:
+            # Also runs on GeneratorExit when the client disconnects mid-stream
+            try:
+                self._finish_turn(context_id, template, "".join(parts).strip(), analysis, plan=plan)
+            except KeyError as e:
+                # The context expired while the reply streamed; there is no history left to log to
+                print(f"Error logging streamed response: context {e} is gone")
+    
+    def _start_turn(self, context_id: str, offer_details: Optional[Dict]) -> NegotiationContext:
+        """Look up the context and record any new offer before generating a reply"""
+        start_turn_usage()
+        context = self._load_context(context_id)
+        self._record_offer(context_id, context, offer_details)
+        return context
+    
+    def _load_context(self, context_id: str) -> NegotiationContext:
+        try:
+            return self.negotiation_contexts[context_id]
+        except KeyError as e:
+            raise ContextUnavailableError(context_id, isinstance(e, ContextExpiredError)) from e
+    
+    def _record_offer(self, context_id: str, context: NegotiationContext, offer_details: Optional[Dict]):
         # Update context with new offer if provided
         if offer_details:
             context.current_offer = offer_details
-            context.negotiation_history.append({
+            self.negotiation_contexts.update_context(context_id, current_offer=offer_details)
+            self.negotiation_contexts.append_history(context_id, {
                 "timestamp": datetime.now().isoformat(),
                 "type": "offer_received",
                 "details": offer_details
             })
-        
-        # Analyze the incoming message
-        analysis = self._analyze_incoming_message(incoming_message, context)
-        
-        # Select appropriate template
-        template = self._select_template(analysis, context)
-        
-        # Generate response using AI
-        response = self._generate_ai_response(template, context, analysis)
-        
-        # Log the response
-        context.negotiation_history.append({
+    
+    @tracing.traced("log_history")
+    def _finish_turn(self, context_id: str, template: ResponseTemplate, response: str,
+                     analysis: LazyAnalysis, usage: Optional[TurnUsage] = None,
+                     plan: Optional[ResponsePlan] = None) -> Dict:
+        """Log the reply in the negotiation history and describe the turn"""
+        usage = usage or current_turn_usage()
+        tokens = usage.to_dict() if usage else None
+        plan_used = plan.to_dict() if plan else None
+        self.negotiation_contexts.append_history(context_id, {
             "timestamp": datetime.now().isoformat(),
             "type": "response_sent",
             "template_used": template.template_id,
-            "response": response
+            "response": response,
+            "analysis_ran": analysis.resolved,
+            "tokens": tokens,
+            "plan": plan_used
         })
         
-        return response
+        return {
+            "response": response,
+            "template_used": template.template_id,
+            "analysis_ran": analysis.resolved,
+            "analysis": dict(analysis) if analysis.resolved else None,
+            "tokens": tokens,
+            "plan": plan_used
+        }
+    
+    @tracing.traced("analyze")
+    def _run_analysis(self, message: str, context: NegotiationContext,
+                      analysis_mode: Optional[AnalysisMode] = None) -> Dict:
+        """Analyze the message with the local classifier, the LLM, or local first with LLM fallback"""
+        analysis_mode = analysis_mode or self.analysis_mode
+        if analysis_mode == AnalysisMode.LLM:
+            return self._analyze_incoming_message(message, context)
+        
+        analysis = get_tactic_classifier().classify(message)
+        if analysis_mode == AnalysisMode.LOCAL or analysis["confidence"] >= self.local_confidence_threshold:
+            return analysis
+        return self._analyze_incoming_message(message, context)
+    
+    def _context_summary(self, context: NegotiationContext, include_offer: bool = False) -> str:
+        """One compact line describing the negotiation for a prompt"""
+        parts = [
+            f"Company: {context.company_name}",
+            f"Position: {context.position}",
+            f"Target salary: {context.target_salary or 'unspecified'}"
+        ]
+        if include_offer:
+            parts.append(f"Current offer: {compact_offer(context.current_offer)}")
+        parts.append(f"Leverage: {', '.join(context.leverage_points) or 'none'}")
+        return " | ".join(parts)
+    
+    def _build_analysis_prompt(self, message: str, context: NegotiationContext) -> str:
+        """Build the prompt asking which tactics the recruiter is using"""
+        return (PromptBuilder(self.stage_budgets["analysis"].prompt_tokens)
+                .line("Analyze this negotiation message from a company recruiter/manager.")
+                .field(f'Message: "{message}"', min_tokens=48)
+                .field(f"Context: {self._context_summary(context)}", min_tokens=24)
+                .line("Determine: 1) the negotiation tactic used, 2) the pressure points applied, "
+                      "3) the information sought, 4) how we should respond strategically.")
+                .line("Respond in JSON format with analysis results.")
+                .build())
     
     def _analyze_incoming_message(self, message: str, context: NegotiationContext) -> Dict:
         """Analyze incoming message to determine negotiation tactics"""
-        analysis_prompt = f"""
-        Analyze this negotiation message from a company recruiter/manager:
-        
-        Message: "{message}"
-        
-        Context:
-        - Company: {context.company_name}
-        - Position: {context.position}
-        - User's target salary: {context.target_salary}
-        - User's leverage points: {context.leverage_points}
-        
-        Determine:
-        1. What negotiation tactic is the company using?
-        2. What pressure points are they applying?
-        3. What information are they seeking?
-        4. How should we respond strategically?
-        
-        Respond in JSON format with analysis results.
-        """
+        analysis_prompt = self._build_analysis_prompt(message, context)
         
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": analysis_prompt}],
-                temperature=0.3
+            completion = self.backend.complete(
+                [{"role": "user", "content": analysis_prompt}],
+                stage="analysis",
+                temperature=0.3,
+                max_tokens=self.stage_budgets["analysis"].completion_tokens
             )
             
-            analysis_text = response.choices[0].message.content
-            return json.loads(analysis_text)
+            record_usage("analysis", analysis_prompt, completion.text, completion)
+            return json.loads(completion.text)
         except Exception as e:
             print(f"Error analyzing message: {e}")
-            return {"tactic": "unknown", "pressure_points": [], "response_strategy": "professional"}
+            metrics.record_fallback("analysis", e)
+            return dict(DEFAULT_ANALYSIS)
     
-    def _select_template(self, analysis: Dict, context: NegotiationContext) -> ResponseTemplate:
+    @tracing.traced("select_template")
+    def _select_template(self, analysis: Mapping, context: NegotiationContext) -> ResponseTemplate:
         """Select the most appropriate response template"""
-        # Filter templates by strategy
-        strategy_templates = [t for t in self.response_templates 
-                            if t.strategy == context.strategy]
+        strategy_templates = self.template_registry.for_strategy(context.strategy)
+        if not strategy_templates:
+            raise ValueError(f"No response templates for strategy {context.strategy.value}")
         
-        # Score templates based on analysis and context
-        scored_templates = []
-        for template in strategy_templates:
-            score = template.effectiveness_score
-            
-            # Boost score based on context match
-            if context.current_offer and "salary" in template.template_id:
-                current_salary = context.current_offer.get("salary", 0)
-                # Extract numeric value from salary string (e.g., "$85,000" -> 85000)
-                if isinstance(current_salary, str):
-                    current_salary = int(''.join(filter(str.isdigit, current_salary)))
-                if current_salary < (context.target_salary or 0):
-                    score += 0.1
-            
-            scored_templates.append((template, score))
+        # Salary templates get a boost while the offer is below the target
+        salary_boost = 0.0
+        if context.current_offer and any(c.salary_sensitive for c in strategy_templates):
+            current_salary = _current_salary(context)
+            if current_salary is not None and current_salary < (context.target_salary or 0):
+                salary_boost = 0.1
         
-        # Return highest scoring template
-        scored_templates.sort(key=lambda x: x[1], reverse=True)
-        return scored_templates[0][0]
+        # Highest score wins; ties go to the template defined first
+        best = max(strategy_templates, key=lambda c: c.template.effectiveness_score
+                   + (salary_boost if c.salary_sensitive else 0.0))
+        return best.template
+    
+    @tracing.traced("resolve_variables")
+    def _resolve_template_variables(self, template: ResponseTemplate, context: NegotiationContext) -> Dict:
+        """Resolve the values for a template's variables from the negotiation context"""
+        return {var: resolve(context) for var, resolve in self.template_registry.compiled(template).resolvers}
     
+    def _build_enhancement_prompt(self, formatted_template: str, context: NegotiationContext) -> str:
+        """Build the prompt that turns a formatted template into a persuasive reply"""
+        return (PromptBuilder(self.stage_budgets["enhancement"].prompt_tokens)
+                .line("Transform this negotiation response into a highly persuasive, strategic communication "
+                      "that will make the recruiter more likely to increase their offer. "
+                      "Use advanced negotiation psychology.")
+                .field(f"Original Response:\n{formatted_template}", min_tokens=96)
+                .field(f"Context: {self._context_summary(context, include_offer=True)}", min_tokens=32)
+                .line("Apply these persuasive techniques: urgency and scarcity (other offers, timeline pressure); "
+                      "social proof and authority (industry standards, market research); mutual-benefit framing; "
+                      "specific numbers and data; FOMO; confident, assertive language; creative solutions; "
+                      "references to the company's values/mission.")
+                .line("Make the candidate sound highly desirable and in-demand. The recruiter should feel they "
+                      "need to act quickly to secure this talent.")
+                .line("Keep it professional but compelling. Maximum 200 words.")
+                .build())
+    
+    def _build_fused_prompt(self, message: str, enhancement_prompt: str) -> str:
+        """Build the single prompt that asks for both the tactic analysis and the enhanced reply"""
+        # The enhancement prompt is already within its own budget, so only the message shrinks here
+        return (PromptBuilder(self.stage_budgets["fused"].prompt_tokens)
+                .line("You have two tasks for this negotiation message from a company recruiter/manager.")
+                .field(f'Message: "{message}"', min_tokens=48)
+                .line("TASK 1 - Analyze the message. Determine what negotiation tactic the company is using, "
+                      "what pressure points they are applying, what information they are seeking and how we "
+                      "should respond strategically.")
+                .line(f"TASK 2 - {enhancement_prompt.strip()}")
+                .line('Respond with a single JSON object and nothing else: {"analysis": {"tactic": "...", '
+                      '"pressure_points": ["..."], "information_sought": "...", "response_strategy": "..."}, '
+                      '"response": "The enhanced negotiation response"}')
+                .build())
+    
+    def _format_template(self, template: ResponseTemplate, context: NegotiationContext) -> str:
+        """Fill a response template with variables resolved from the context"""
+        return self.template_registry.compiled(template).render(self._resolve_template_variables(template, context))
+    
+    @tracing.traced("enhance")
     def _generate_ai_response(self, template: ResponseTemplate, context: NegotiationContext, 
-                            analysis: Dict) -> str:
+                            analysis: Mapping, max_tokens: Optional[int] = None) -> str:
         """Generate AI-enhanced response using template"""
-        # Prepare variables for template
-        variables = {}
-        for var in template.variables:
-            if var == "experience_years":
-                variables[var] = context.user_profile.get("years_experience", "5+")
-            elif var == "industry":
-                variables[var] = context.user_profile.get("industry", "technology")
-            elif var == "achievement":
-                variables[var] = context.user_profile.get("key_achievement", "delivering exceptional results")
-            elif var == "benefit_type":
-                variables[var] = "health insurance"
-            elif var == "skill_area":
-                variables[var] = context.user_profile.get("primary_skill", "software development")
-            elif var == "specific_achievement":
-                variables[var] = context.user_profile.get("key_achievement", "increasing team productivity by 40%")
-            elif var == "company_name":
-                variables[var] = context.company_name
-            elif var == "target_salary_range":
-                variables[var] = f"${context.target_salary - 10000}-${context.target_salary + 10000}" if context.target_salary else "$100,000-$130,000"
-            elif var == "salary_gap":
-                if context.current_offer and context.target_salary:
-                    current_salary = context.current_offer.get("salary", 0)
-                    if isinstance(current_salary, str):
-                        current_salary = int(''.join(filter(str.isdigit, current_salary)))
-                    gap = context.target_salary - current_salary
-                    variables[var] = f"${gap:,}"
-                else:
-                    variables[var] = "$15,000-$25,000"
-            elif var == "competitor_company":
-                companies = ["Google", "Microsoft", "Amazon", "Apple", "Meta", "Netflix", "Uber", "Airbnb"]
-                variables[var] = companies[hash(context.company_name) % len(companies)]
-            elif var == "competing_salary":
-                target = context.target_salary or 120000
-                variables[var] = f"${target + 5000:,}"
-            elif var == "deadline":
-                variables[var] = "Friday"
-            elif var == "target_salary":
-                variables[var] = f"${context.target_salary:,}" if context.target_salary else "$120,000"
-            elif var == "quantified_impact":
-                impacts = ["increased revenue by 150%", "reduced costs by $2M annually", "improved efficiency by 40%", "led to 300% user growth"]
-                variables[var] = impacts[hash(context.company_name) % len(impacts)]
-            elif var == "future_value_proposition":
-                propositions = ["increase team productivity by 50%", "deliver $5M in cost savings", "launch 3 major features", "build a scalable architecture"]
-                variables[var] = propositions[hash(context.company_name) % len(propositions)]
-                
-        # Format template with variables
-        formatted_template = template.template_text.format(**variables)
+        # Fill the template with context variables
+        formatted_template = self._format_template(template, context)
         
         # Enhance with AI
-        enhancement_prompt = f"""
-        Transform this negotiation response into a highly persuasive, strategic communication that will make the recruiter more likely to increase their offer. Use advanced negotiation psychology:
-
-        Original Response:
-        {formatted_template}
-        
-        Context:
-        - Company: {context.company_name}
-        - Position: {context.position}
-        - Target salary: {context.target_salary}
-        - Current offer: {context.current_offer}
-        - Leverage points: {context.leverage_points}
-        
-        Apply these persuasive techniques:
-        1. Create urgency and scarcity ("I have other offers", "timeline pressure")
-        2. Use social proof and authority ("industry standards", "market research")
-        3. Frame as mutual benefit ("win-win", "partnership")
-        4. Use specific numbers and data
-        5. Create FOMO (fear of missing out)
-        6. Use confident, assertive language
-        7. Suggest creative solutions
-        8. Reference the company's values/mission
-        
-        Make the candidate sound highly desirable and in-demand. The recruiter should feel they need to act quickly to secure this talent.
-        
-        Keep it professional but compelling. Maximum 200 words.
-        """
+        enhancement_prompt = self._build_enhancement_prompt(formatted_template, context)
         
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": enhancement_prompt}],
+            completion = self.backend.complete(
+                [{"role": "user", "content": enhancement_prompt}],
+                stage="enhancement",
                 temperature=0.8,
-                max_tokens=300
+                max_tokens=max_tokens or self.stage_budgets["enhancement"].completion_tokens
             )
             
-            return response.choices[0].message.content.strip()
+            record_usage("enhancement", enhancement_prompt, completion.text, completion)
+            return completion.text.strip()
         except Exception as e:
             print(f"Error generating AI response: {e}")
+            metrics.record_fallback("enhancement", e)
             return formatted_template
-    
+
+    @tracing.traced("enhance", pipeline="fused")
+    def _generate_fused_response(self, message: str, template: ResponseTemplate,
+                                 context: NegotiationContext, max_tokens: Optional[int] = None) -> Tuple[Dict, str]:
+        """Analyze the incoming message and generate the enhanced reply in one completion"""
+        formatted_template = self._format_template(template, context)
+        fused_prompt = self._build_fused_prompt(message, self._build_enhancement_prompt(formatted_template, context))
+
+        try:
+            completion = self.backend.complete(
+                [{"role": "user", "content": fused_prompt}],
+                stage="fused",
+                temperature=0.8,
+                max_tokens=max_tokens or self.stage_budgets["fused"].completion_tokens
+            )
+
+            record_usage("fused", fused_prompt, completion.text, completion)
+            return self._parse_fused_response(completion.text, formatted_template)
+        except Exception as e:
+            print(f"Error generating fused response: {e}")
+            metrics.record_fallback("fused", e)
+            return dict(DEFAULT_ANALYSIS), formatted_template
+
+    def _parse_fused_response(self, text: str, formatted_template: str) -> Tuple[Dict, str]:
+        """Split a fused completion into its analysis and reply parts"""
+        text = (text or "").strip()
+        try:
+            # Tolerate prose or code fences around the JSON object
+            payload = json.loads(text[text.index("{"):text.rindex("}") + 1])
+        except ValueError:
+            # The model ignored the format; treat the whole completion as the reply
+            metrics.record_fallback("fused", reason="json_parse")
+            return dict(DEFAULT_ANALYSIS), text or formatted_template
+
+        analysis = payload.get("analysis")
+        if not isinstance(analysis, dict):
+            analysis = dict(DEFAULT_ANALYSIS)
+        reply = payload.get("response")
+        if not isinstance(reply, str) or not reply.strip():
+            reply = formatted_template
+        return analysis, reply.strip()
+
     def get_negotiation_status(self, context_id: str) -> Dict:
         """Get current status of a negotiation"""
-        if context_id not in self.negotiation_contexts:
+        try:
+            context = self.negotiation_contexts[context_id]
+        except ContextExpiredError:
+            return {"error": "Context expired", "expired": True}
+        except KeyError:
             return {"error": "Context not found"}
         
-        context = self.negotiation_contexts[context_id]
-        
+        return self.status_for(context)
+    
+    @staticmethod
+    def status_for(context: NegotiationContext) -> Dict:
+        """Status payload for a negotiation context"""
         return {
             "company": context.company_name,
             "position": context.position,
@@ -427,15 +848,257 @@ What combination of these would make sense for your organization?""",
     def update_strategy(self, context_id: str, new_strategy: NegotiationStrategy):
         """Update negotiation strategy"""
         if context_id in self.negotiation_contexts:
-            self.negotiation_contexts[context_id].strategy = new_strategy
+            self.negotiation_contexts.update_context(context_id, strategy=new_strategy)
     
     def add_leverage_point(self, context_id: str, leverage_point: str):
         """Add a new leverage point"""
         if context_id in self.negotiation_contexts:
-            self.negotiation_contexts[context_id].leverage_points.append(leverage_point)
+            leverage_points = self.negotiation_contexts[context_id].leverage_points + [leverage_point]
+            self.negotiation_contexts.update_context(context_id, leverage_points=leverage_points)
+
+class AsyncNegotiatorBot(NegotiatorBot):
+    """NegotiatorBot that awaits its LLM backend, for running many negotiations concurrently
+    
+    Template selection, prompt building and history logging are shared with NegotiatorBot;
+    only the chat-completion calls are awaited. As in NegotiatorBot the tactic analysis is
+    lazy and nothing in a turn reads it; async code that needs its fields should await
+    analyze_incoming_message_async rather than read the lazy analysis, whose LLM call blocks.
+    """
+    
+    def __init__(self, api_key: str = None, max_concurrency: int = 8, **kwargs):
+        super().__init__(api_key, **kwargs)
+        self.max_concurrency = max_concurrency
+        # Per context: its turn lock and how many turns hold or wait for it
+        self._context_locks: Dict[str, list] = {}
+    
+    async def generate_response_async(self, context_id: str, incoming_message: str,
+                                      offer_details: Dict = None) -> str:
+        """Generate a negotiation response without blocking the event loop"""
+        details = await self.generate_response_details_async(context_id, incoming_message, offer_details)
+        return details["response"]
+    
+    @asynccontextmanager
+    async def _context_turn(self, context_id: str):
+        """Run turns on the same context one at a time so the history stays ordered
+        
+        The lock is dropped once no turn holds or waits for it, so contexts that were
+        evicted or finished do not keep an entry.
+        """
+        entry = self._context_locks.setdefault(context_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._context_locks[context_id]
+    
+    @tracing.traced("generate_response")
+    async def generate_response_details_async(self, context_id: str, incoming_message: str,
+                                              offer_details: Dict = None,
+                                              mode: Optional[ResponseMode] = None) -> Dict:
+        """Async counterpart of generate_response_details"""
+        async with self._context_turn(context_id):
+            context = self._start_turn(context_id, offer_details)
+            plan = self._plan_for(mode)
+            
+            if plan.pipeline is None:
+                template, response, analysis = self._compose_local_response(context, incoming_message)
+            elif plan.pipeline == PipelineMode.FUSED:
+                template = self._select_template(LazyAnalysis.of({}), context)
+                fused_analysis, response = await self._generate_fused_response_async(
+                    incoming_message, template, context, plan.completion_tokens)
+                analysis = LazyAnalysis.of(fused_analysis)
+            else:
+                # Analyze the incoming message only if a scorer or prompt reads from it
+                analysis = LazyAnalysis(lambda: self._run_analysis(incoming_message, context, plan.analysis_mode))
+                template = self._select_template(analysis, context)
+                response = await self._generate_ai_response_async(template, context, analysis, plan.completion_tokens)
+            
+            return self._finish_turn(context_id, template, response, analysis, plan=plan)
+    
+    async def generate_responses(self, context_ids: List[str], messages: List[str],
+                                 offer_details: List[Optional[Dict]] = None,
+                                 return_exceptions: bool = False) -> List:
+        """Generate replies for many negotiations at once, at most max_concurrency in flight"""
+        if len(context_ids) != len(messages):
+            raise ValueError("context_ids and messages must have the same length")
+        offer_details = offer_details or [None] * len(context_ids)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def run(context_id, message, offer):
+            async with semaphore:
+                return await self.generate_response_async(context_id, message, offer)
+        
+        return await asyncio.gather(
+            *(run(c, m, o) for c, m, o in zip(context_ids, messages, offer_details)),
+            return_exceptions=return_exceptions
+        )
+    
+    @tracing.traced("analyze")
+    async def analyze_incoming_message_async(self, message: str, context_id: str,
+                                             analysis_mode: Optional[AnalysisMode] = None) -> Dict:
+        """Run the tactic analysis explicitly, honouring analysis_mode"""
+        analysis_mode = analysis_mode or self.analysis_mode
+        context = self._load_context(context_id)
+        if analysis_mode != AnalysisMode.LLM:
+            analysis = get_tactic_classifier().classify(message)
+            if analysis_mode == AnalysisMode.LOCAL or analysis["confidence"] >= self.local_confidence_threshold:
+                return analysis
+        
+        analysis_prompt = self._build_analysis_prompt(message, context)
+        try:
+            completion = await self.backend.acomplete(
+                [{"role": "user", "content": analysis_prompt}],
+                stage="analysis",
+                temperature=0.3,
+                max_tokens=self.stage_budgets["analysis"].completion_tokens
+            )
+            
+            record_usage("analysis", analysis_prompt, completion.text, completion)
+            return json.loads(completion.text)
+        except Exception as e:
+            print(f"Error analyzing message: {e}")
+            metrics.record_fallback("analysis", e)
+            return dict(DEFAULT_ANALYSIS)
+    
+    @tracing.traced("enhance")
+    async def _generate_ai_response_async(self, template: ResponseTemplate, context: NegotiationContext,
+                                          analysis: Mapping, max_tokens: Optional[int] = None) -> str:
+        formatted_template = self._format_template(template, context)
+        enhancement_prompt = self._build_enhancement_prompt(formatted_template, context)
+        
+        try:
+            completion = await self.backend.acomplete(
+                [{"role": "user", "content": enhancement_prompt}],
+                stage="enhancement",
+                temperature=0.8,
+                max_tokens=max_tokens or self.stage_budgets["enhancement"].completion_tokens
+            )
+            
+            record_usage("enhancement", enhancement_prompt, completion.text, completion)
+            return completion.text.strip()
+        except Exception as e:
+            print(f"Error generating AI response: {e}")
+            metrics.record_fallback("enhancement", e)
+            return formatted_template
+    
+    @tracing.traced("enhance", pipeline="fused")
+    async def _generate_fused_response_async(self, message: str, template: ResponseTemplate,
+                                             context: NegotiationContext,
+                                             max_tokens: Optional[int] = None) -> Tuple[Dict, str]:
+        formatted_template = self._format_template(template, context)
+        fused_prompt = self._build_fused_prompt(message, self._build_enhancement_prompt(formatted_template, context))
+        
+        try:
+            completion = await self.backend.acomplete(
+                [{"role": "user", "content": fused_prompt}],
+                stage="fused",
+                temperature=0.8,
+                max_tokens=max_tokens or self.stage_budgets["fused"].completion_tokens
+            )
+            
+            record_usage("fused", fused_prompt, completion.text, completion)
+            return self._parse_fused_response(completion.text, formatted_template)
+        except Exception as e:
+            print(f"Error generating fused response: {e}")
+            metrics.record_fallback("fused", e)
+            return dict(DEFAULT_ANALYSIS), formatted_template
+
+def _optional_env(name: str, cast, default=None):
+    """``name`` cast with ``cast``, or ``default`` when it is unset; an explicit 0 is kept"""
+    value = os.getenv(name)
+    return cast(value) if value else default
+
+def create_context_store() -> ContextStorage:
+    """Build the context storage backend selected by CONTEXT_STORE (memory or sqlite)"""
+    backend = os.getenv('CONTEXT_STORE', 'memory').lower()
+    if backend == 'sqlite':
+        from sqlite_context_store import SQLiteContextStore
+        return SQLiteContextStore(
+            os.getenv('CONTEXT_DB_PATH', 'negotiations.db'),
+            context_type=NegotiationContext,
+            ttl_seconds=_optional_env('CONTEXT_TTL_SECONDS', float)
+        )
+    return BoundedContextStore(
+        ttl_seconds=_optional_env('CONTEXT_TTL_SECONDS', float, 3600.0),
+        max_contexts=_optional_env('MAX_CONTEXTS', int, 1000),
+        max_bytes=_optional_env('CONTEXT_MEMORY_BUDGET_BYTES', int, 64 * 1024 * 1024)
+    )
+
+_fake_llm_backend = None
+
+def _llm_call_policies() -> Dict:
+    """STAGE_POLICIES with the retry and hedging overrides from the environment"""
+    overrides = {}
+    max_retries = _optional_env('LLM_MAX_RETRIES', int)
+    if max_retries is not None:
+        overrides['max_retries'] = max_retries
+    hedge_percentile = _optional_env('LLM_HEDGE_PERCENTILE', float)
+    if hedge_percentile is not None:
+        overrides['hedge_percentile'] = hedge_percentile / 100 if hedge_percentile > 1 else hedge_percentile
+    hedge_after_ms = _optional_env('LLM_HEDGE_AFTER_MS', float)
+    if hedge_after_ms is not None:
+        overrides['hedge_after'] = hedge_after_ms / 1000
+    return {stage: replace(policy, **overrides) for stage, policy in STAGE_POLICIES.items()}
+
+# Latency, retry and hedge statistics for every LLM call in this process
+llm_call_stats = CallStats()
+llm_call_policies = _llm_call_policies()
+# One breaker for the process: when the LLM is down it is down for every tenant
+llm_circuit_breaker = CircuitBreaker(
+    error_rate=_optional_env('LLM_BREAKER_ERROR_RATE', float, 0.5),
+    slow_call_seconds=_optional_env('LLM_BREAKER_SLOW_MS', float, 20000.0) / 1000,
+    cooldown=_optional_env('LLM_BREAKER_COOLDOWN_SECONDS', float, 30.0)
+)
+# Outbound request rate and AIMD concurrency limit for each API key
+llm_rate_limiters = RateLimiterRegistry(lambda: AdaptiveRateLimiter(
+    rate=_optional_env('LLM_RATE_LIMIT_RPS', float, 10.0),
+    burst=_optional_env('LLM_RATE_LIMIT_BURST', int, 20),
+    max_concurrency=_optional_env('LLM_MAX_CONCURRENCY', int, 16),
+    latency_target=_optional_env('LLM_LATENCY_TARGET_MS', float, 10000.0) / 1000
+))
+LLM_QUEUE_TIMEOUT = _optional_env('LLM_QUEUE_TIMEOUT_MS', float, 10000.0) / 1000
+# Identical in-flight calls (e.g. a canned battle message sent twice) share one upstream call
+llm_single_flight = SingleFlight()
+LLM_SINGLE_FLIGHT = os.getenv('LLM_SINGLE_FLIGHT', 'true').lower() not in ('0', 'false', 'no')
+
+def _raw_llm_backend(api_key: str) -> LLMBackend:
+    global _fake_llm_backend
+    if os.getenv('LLM_BACKEND', 'openai').lower() != 'fake':
+        return OpenAIBackend(api_key)
+    if _fake_llm_backend is None:
+        # One fake for the whole process, so its latency replay and error stats are shared
+        _fake_llm_backend = FakeLLMBackend(
+            latency=parse_latency_spec(os.getenv('FAKE_LLM_LATENCY', 'fixed:0')),
+            error_rate=_optional_env('FAKE_LLM_ERROR_RATE', float, 0.0),
+            seed=_optional_env('FAKE_LLM_SEED', int, 0)
+        )
+    return _fake_llm_backend
+
+def create_llm_backend(api_key: str) -> LLMBackend:
+    """LLM backend selected by LLM_BACKEND: openai (default) or fake, for offline load tests
+
+    Identical calls in flight for the same API key share one upstream call. The
+    rest are recorded on /metrics and go through the shared circuit breaker, then
+    per-stage timeouts, jittered retries and optional hedging; each request sent to
+    the provider, hedges and retries included, waits for the API key's rate limiter.
+    """
+    key_hash = hash_api_key(api_key or '')
+    limiter = llm_rate_limiters.get(key_hash)
+    limited = RateLimitedBackend(_raw_llm_backend(api_key), limiter, queue_timeout=LLM_QUEUE_TIMEOUT)
+    resilient = ResilientBackend(limited, policies=llm_call_policies, stats=llm_call_stats)
+    instrumented = MetricsBackend(CircuitBreakerBackend(resilient, llm_circuit_breaker))
+    if not LLM_SINGLE_FLIGHT:
+        return instrumented
+    return SingleFlightBackend(instrumented, llm_single_flight, scope=key_hash)
 
 # Global instances
-negotiator_bot = None
+# One context store (and memory budget) is shared by every tenant's bot
+context_store = create_context_store()
+context_registry = ContextRegistry()
+context_store.add_eviction_listener(lambda context_id, reason: context_registry.remove(context_id))
 offer_generator = None
 
 def get_offer_generator():
@@ -569,6 +1232,7 @@ def generate_initial_offer():
     
     return offer, offer_level
 
+@tracing.traced("generate_offer_pdf")
 def generate_offer_pdf(offer, offer_level):
     """Generate a professional PDF offer letter"""
     buffer = io.BytesIO()
@@ -660,24 +1324,10 @@ def generate_offer_pdf(offer, offer_level):
     buffer.seek(0)
     return buffer
 
-def evaluate_negotiation(user_message, current_offer, offer_level, conversation_history, api_key):
-    """Use GPT to evaluate negotiation and determine response"""
-    
-    # Count previous negotiations to make subsequent ones stricter
-    negotiation_count = len([msg for msg in conversation_history if msg.get('role') == 'user'])
-    
-    system_prompt = f"""You are a professional recruiter for {current_offer['company']['name']}. You have made a firm initial offer for a {current_offer['title']} position.
-
-CURRENT OFFER DETAILS:
-- Company: {current_offer['company']['name']} (DO NOT CHANGE)
-- Position: {current_offer['title']} (DO NOT CHANGE)
-- Salary: {current_offer['salary']}
-- Benefits: {', '.join(current_offer['benefits'])}
-- Equity: {current_offer.get('equity', 'N/A')}
-- Signing Bonus: {current_offer.get('bonus', 'N/A')}
-- Description: {current_offer['description']}
-
-NEGOTIATION HISTORY: This is negotiation attempt #{negotiation_count + 1}
+# The recruiter rules, offer ladder, JSON format and examples are identical for every call,
+# so they form a static prefix that provider-side prompt caching can reuse; the offer,
+# attempt number and candidate message follow in a small trailing message
+EVALUATION_SYSTEM_PROMPT = """You are a professional recruiter. You have made a firm initial offer for the position and company given under CURRENT OFFER DETAILS in the user's message.
 
 IMPORTANT: This is a REAL job offer. The candidate must negotiate professionally and persuasively to get improvements. 
 - For the FIRST negotiation attempt, be moderately lenient if the candidate provides reasonable arguments
@@ -717,14 +1367,14 @@ AVAILABLE OFFER LEVELS:
 - Senior: $130,000 (best benefits + stock + bonus + flexibility) - for senior professionals
 
 RESPONSE FORMAT (JSON):
-{{
+{
     "response": "Your professional response to the candidate",
     "action": "improve" | "maintain" | "decline" | "withdraw",
     "new_offer_level": "newgrad" | "entry" | "mid" | "senior" | null,
     "reasoning": "Brief explanation of your decision",
     "improvements": "If improving, list what specifically changed (e.g., 'Salary increased from $85,000 to $90,000, added 5 extra PTO days')",
     "new_offer": "If improving, provide the updated offer details with same company and position"
-}}
+}
 
 EXAMPLES OF GOOD NEGOTIATIONS:
 - "I have 8 years of experience in React and led a team of 5 developers at my previous company. I also have AWS certifications that would be valuable for this role."
@@ -747,25 +1397,58 @@ EXAMPLES OF WITHDRAWAL-WORTHY NEGOTIATIONS:
 
 Be realistic and professional. Most negotiations should result in "maintain" unless the candidate provides compelling evidence of their value."""
 
+def _evaluation_request(user_message, current_offer, negotiation_count):
+    """The per-call part of the evaluate_negotiation prompt"""
+    return f"""CURRENT OFFER DETAILS:
+- Company: {current_offer['company']['name']} (DO NOT CHANGE)
+- Position: {current_offer['title']} (DO NOT CHANGE)
+- Salary: {current_offer['salary']}
+- Benefits: {', '.join(current_offer['benefits'])}
+- Equity: {current_offer.get('equity', 'N/A')}
+- Signing Bonus: {current_offer.get('bonus', 'N/A')}
+- Description: {current_offer['description']}
+
+NEGOTIATION HISTORY: This is negotiation attempt #{negotiation_count + 1}
+
+Candidate says: {user_message}"""
+
+# Share of evaluate_negotiation calls the rule-based pre-screen answered without the LLM
+negotiation_prescreen_stats = PrescreenStats()
+NEGOTIATION_PRESCREEN = os.getenv('NEGOTIATION_PRESCREEN', 'true').lower() not in ('0', 'false', 'no')
+
+@tracing.traced("evaluate_negotiation")
+def evaluate_negotiation(user_message, current_offer, offer_level, conversation_history, api_key, max_tokens=500,
+                         negotiation_count=None):
+    """Use GPT to evaluate negotiation and determine response"""
+    
+    # Clear-cut generic asks and hostile messages are decided locally, without the LLM
+    if NEGOTIATION_PRESCREEN:
+        decision = prescreen(user_message)
+        negotiation_prescreen_stats.record(decision)
+        if decision is not None:
+            return dict(decision, evaluator='prescreen')
+    
+    # Count previous negotiations to make subsequent ones stricter
+    if negotiation_count is None:
+        negotiation_count = len([msg for msg in conversation_history if msg.get('role') == 'user'])
+    
     try:
-        # Create a new client instance with the user's API key
-        user_client = OpenAI(api_key=api_key)
-        
-        response = user_client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Candidate says: {user_message}"}
+        # The OpenAI backend reuses the pooled client (and its open connections) for the user's API key
+        completion = create_llm_backend(api_key).complete(
+            [
+                {"role": "system", "content": EVALUATION_SYSTEM_PROMPT},
+                {"role": "user", "content": _evaluation_request(user_message, current_offer, negotiation_count)}
             ],
+            stage="evaluation",
             temperature=0.7,
-            max_tokens=500
+            max_tokens=max_tokens
         )
         
-        response_text = response.choices[0].message.content
-        return json.loads(response_text)
+        return json.loads(completion.text)
         
     except Exception as e:
         print(f"Error in evaluate_negotiation: {e}")
+        metrics.record_fallback("evaluation", e)
         print(f"Error type: {type(e)}")
         print(f"API key provided: {api_key[:10]}..." if api_key else "No API key")
         
@@ -786,6 +1469,47 @@ Be realistic and professional. Most negotiations should result in "maintain" unl
             "reasoning": "Technical error occurred"
         }
 
+# Spans go to this JSON-lines file; tracing is off (and nearly free) when it is unset
+tracing.configure(os.getenv('TRACE_FILE'))
+
+def _request_id() -> str:
+    """The caller's X-Request-ID when it is a sane token, otherwise a new ID"""
+    request_id = request.headers.get('X-Request-ID', '')
+    if 0 < len(request_id) <= 64 and request_id.replace('-', '').replace('_', '').isalnum():
+        return request_id
+    return tracing.new_request_id()
+
+@app.before_request
+def _start_request_metrics():
+    # Label by the URL rule, not the path, so IDs in paths don't multiply the series
+    metrics.set_route(request.url_rule.rule if request.url_rule else "unmatched")
+    request.environ["metrics.start"] = time.monotonic()
+    
+    # Spans opened while serving the request, including async jobs it submits, carry its ID
+    tracing.set_request_id(_request_id())
+    span = tracing.span("request", route=metrics.current_route(), method=request.method)
+    request.environ["tracing.span"] = span.__enter__()
+
+@app.after_request
+def _record_request_metrics(response):
+    start = request.environ.get("metrics.start")
+    if start is not None:
+        metrics.HTTP_LATENCY.observe(time.monotonic() - start, route=metrics.current_route(),
+                                     method=request.method, status=str(response.status_code))
+    
+    span = request.environ.pop("tracing.span", None)
+    if span is not None:
+        span.set_attribute("status", response.status_code)
+        span.__exit__(None, None, None)
+    request_id = tracing.current_request_id()
+    if request_id:
+        response.headers['X-Request-ID'] = request_id
+    return response
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -804,50 +1528,182 @@ def start_conversation():
         return jsonify({'error': 'Invalid API key format'}), 400
     
     initial_offer, offer_level = generate_initial_offer()
+    session_id = uuid.uuid4().hex
+    negotiation_sessions[session_id] = NegotiationSession(hash_api_key(api_key), initial_offer, offer_level)
     
     company = initial_offer['company']
     return jsonify({
+        'session_id': session_id,
         'offer': initial_offer,
         'offer_level': offer_level,
         'message': f"Thank you for your interest in joining {company['name']}! After reviewing your application, we're pleased to extend you an offer for the {initial_offer['title']} position at our {company['headquarters']} office. The salary is {initial_offer['salary']} with comprehensive benefits including {', '.join(initial_offer['benefits'][:3])} and more. This offer reflects our assessment of your qualifications and the market rate for this role. Do you have any questions about the offer?"
     })
 
-@app.route('/negotiate', methods=['POST'])
-def negotiate():
-    """Handle negotiation attempts"""
-    data = request.json
-    user_message = data.get('message', '')
-    current_offer = data.get('current_offer', {})
-    current_offer_level = data.get('offer_level', 'entry')
-    conversation_history = data.get('history', [])
-    api_key = data.get('api_key')
+# /negotiate calls made with "async": true run here instead of holding a Flask worker.
+# Jobs are kept by the worker process that accepted them, so polls must reach that process
+negotiation_jobs = JobQueue(
+    max_workers=_optional_env('NEGOTIATION_WORKERS', int, 4),
+    max_pending=_optional_env('NEGOTIATION_QUEUE_LIMIT', int, 100),
+    name='negotiation'
+)
+
+# Returned for unknown job IDs: the job may belong to another worker process
+_JOB_NOT_FOUND = {'error': 'Job not found; jobs are only known to the worker process that accepted them'}
+
+# Recruiter evaluation per mode: the local rules (no LLM call), or one call with this max_tokens
+EVALUATION_MAX_TOKENS = {
+    ResponseMode.FAST: None,
+    ResponseMode.BALANCED: 300,
+    ResponseMode.QUALITY: 500,
+}
+
+def _request_enum(data, name: str, enum_type, default=None):
+    """``data[name]`` as a member of ``enum_type``, or ``default`` when absent; raises ValueError for unknown values"""
+    value = data.get(name)
+    if not value:
+        return default
+    try:
+        return enum_type(str(value).lower())
+    except ValueError:
+        raise ValueError(f"Unknown {name} '{value}'; use one of: {', '.join(m.value for m in enum_type)}")
+
+def _response_mode(data) -> Optional[ResponseMode]:
+    """The optional ``mode`` of a request; raises ValueError for unknown modes"""
+    return _request_enum(data, 'mode', ResponseMode)
+
+@dataclass
+class NegotiationSession:
+    """Offer state kept between /negotiate calls, so clients only send the new message"""
+    tenant: str
+    offer: Dict
+    offer_level: str
+    user_turns: int = 0
+    closed: Optional[str] = None  # "withdraw" or "decline" once the offer is off the table
     
-    print(f"Negotiate request received:")
-    print(f"  Message: {user_message}")
-    print(f"  Offer level: {current_offer_level}")
-    print(f"  API key: {api_key[:10]}..." if api_key else "  API key: None")
+    def to_dict(self) -> Dict:
+        """JSON-serializable form used by persistent session storage"""
+        return asdict(self)
     
-    if not user_message.strip():
-        return jsonify({'error': 'Please provide a message'}), 400
+    @classmethod
+    def from_dict(cls, data: Dict) -> "NegotiationSession":
+        data = dict(data)
+        data.pop("negotiation_history", None)  # SQLiteContextStore adds it to every row it reads
+        return cls(**data)
+
+class SessionUnavailableError(Exception):
+    """Raised when a /negotiate call cannot use or update its session; carries the HTTP error"""
     
-    if not api_key:
-        return jsonify({'error': 'API key is required'}), 400
+    def __init__(self, message: str, status: int, **details):
+        super().__init__(message)
+        self.status = status
+        self.details = details
     
-    # Validate API key format
-    if not api_key.startswith('sk-') or len(api_key) < 20:
-        return jsonify({'error': 'Invalid API key format'}), 400
+    @classmethod
+    def missing(cls, error: KeyError) -> "SessionUnavailableError":
+        """For a session the store does not have: expired (410) or never created (404)"""
+        if isinstance(error, ContextExpiredError):
+            return cls('Session expired', 410, expired=True)
+        return cls('Session not found', 404)
     
-    # Use current offer if provided, otherwise fall back to template
-    if not current_offer:
-        current_offer = JOB_OFFERS[current_offer_level]
+    @classmethod
+    def closed(cls, action: str) -> "SessionUnavailableError":
+        return cls('This offer is no longer open', 409, action=action)
+    
+    def response(self):
+        return jsonify({'error': str(self), **self.details}), self.status
+
+def create_session_store() -> ContextStorage:
+    """Storage for /negotiate sessions, in the same backend as the contexts (CONTEXT_STORE)"""
+    ttl_seconds = _optional_env('NEGOTIATION_SESSION_TTL_SECONDS', float, 3600.0)
+    if os.getenv('CONTEXT_STORE', 'memory').lower() == 'sqlite':
+        from sqlite_context_store import SQLiteContextStore
+        return SQLiteContextStore(
+            os.getenv('CONTEXT_DB_PATH', 'negotiations.db'),
+            context_type=NegotiationSession,
+            ttl_seconds=ttl_seconds,
+            table_prefix='session_'
+        )
+    return BoundedContextStore(ttl_seconds=ttl_seconds, max_contexts=10000)
+
+# Sessions created by /start_conversation; idle ones expire like negotiation contexts
+negotiation_sessions = create_session_store()
+
+def _get_session(session_id: str) -> NegotiationSession:
+    """The stored session; raises SessionUnavailableError when it expired or never existed"""
+    try:
+        return negotiation_sessions[session_id]
+    except KeyError as e:
+        raise SessionUnavailableError.missing(e) from e
+
+def run_session_negotiation(session_id: str, user_message: str, api_key: str,
+                            mode: ResponseMode = ResponseMode.QUALITY) -> Dict:
+    """run_negotiation against a server-side session, then advance its offer and turn count
+    
+    Raises SessionUnavailableError if the session expires, or another turn closes it or
+    changes its offer, before this turn is recorded.
+    """
+    started = _get_session(session_id)
+    response_data = run_negotiation(user_message, started.offer, started.offer_level, [], api_key, mode,
+                                    negotiation_count=started.user_turns)
+    
+    def advance(session: NegotiationSession) -> Dict:
+        # Runs inside the store's write lock, so concurrent turns (in any worker) apply one at a time
+        if session.closed:
+            raise SessionUnavailableError.closed(session.closed)
+        updates = {'user_turns': session.user_turns + 1}
+        if response_data.get('new_offer'):
+            updates.update(offer=response_data['new_offer'], offer_level=response_data['new_offer_level'])
+        elif response_data.get('offer_withdrawn') or response_data.get('offer_declined'):
+            updates['closed'] = response_data['action']
+        if len(updates) > 1 and (session.offer, session.offer_level) != (started.offer, started.offer_level):
+            # This outcome was decided against an offer that is no longer on the table
+            raise SessionUnavailableError('The offer changed during this turn; send the message again', 409)
+        return updates
+    
+    try:
+        updates = negotiation_sessions.modify_context(session_id, advance)
+    except KeyError as e:
+        raise SessionUnavailableError.missing(e) from e
+    
+    response_data.update(session_id=session_id, turn=updates['user_turns'])
+    return response_data
+
+def _lookup_session(session_id: str, api_key: str):
+    """The caller's open session, or the error response to return instead"""
+    try:
+        session = _get_session(session_id)
+    except SessionUnavailableError as e:
+        return None, e.response()
+    # Sessions are private to the API key that started them
+    if session.tenant != hash_api_key(api_key):
+        return None, (jsonify({'error': 'Session not found'}), 404)
+    if session.closed:
+        return None, SessionUnavailableError.closed(session.closed).response()
+    return session, None
+
+def run_negotiation(user_message, current_offer, current_offer_level, conversation_history, api_key,
+                    mode: ResponseMode = ResponseMode.QUALITY, negotiation_count: Optional[int] = None) -> Dict:
+    """Evaluate one negotiation attempt and build the /negotiate response body"""
+    if negotiation_count is None:
+        negotiation_count = len([msg for msg in conversation_history if msg.get('role') == 'user'])
     
     # Evaluate the negotiation
-    evaluation = evaluate_negotiation(user_message, current_offer, current_offer_level, conversation_history, api_key)
+    max_tokens = EVALUATION_MAX_TOKENS[mode]
+    if max_tokens is None:
+        evaluation = evaluate_locally(user_message, current_offer_level, negotiation_count)
+    else:
+        evaluation = evaluate_negotiation(user_message, current_offer, current_offer_level, conversation_history,
+                                          api_key, max_tokens=max_tokens, negotiation_count=negotiation_count)
     
     response_data = {
         'response': evaluation['response'],
         'action': evaluation['action'],
-        'reasoning': evaluation['reasoning']
+        'reasoning': evaluation['reasoning'],
+        'plan': {
+            'mode': mode.value,
+            'evaluator': 'rules' if max_tokens is None else evaluation.get('evaluator', 'llm'),
+            'max_tokens': max_tokens
+        }
     }
     
     # Handle improved offers - preserve company and position
@@ -876,7 +1732,101 @@ def negotiate():
     elif evaluation['action'] == 'withdraw':
         response_data['offer_withdrawn'] = True
     
-    return jsonify(response_data)
+    return response_data
+
+@app.route('/negotiate', methods=['POST'])
+def negotiate():
+    """Handle negotiation attempts"""
+    data = request.json
+    user_message = data.get('message', '')
+    current_offer = data.get('current_offer', {})
+    current_offer_level = data.get('offer_level', 'entry')
+    conversation_history = data.get('history', [])
+    api_key = data.get('api_key')
+    
+    print(f"Negotiate request received:")
+    print(f"  Message: {user_message}")
+    print(f"  Offer level: {current_offer_level}")
+    print(f"  API key: {api_key[:10]}..." if api_key else "  API key: None")
+    
+    if not user_message.strip():
+        return jsonify({'error': 'Please provide a message'}), 400
+    
+    if not api_key:
+        return jsonify({'error': 'API key is required'}), 400
+    
+    # Validate API key format
+    if not api_key.startswith('sk-') or len(api_key) < 20:
+        return jsonify({'error': 'Invalid API key format'}), 400
+    
+    try:
+        mode = _response_mode(data) or ResponseMode.QUALITY
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    session_id = data.get('session_id')
+    if session_id:
+        # The session holds the offer and turn count, so the request carries only the new message
+        _, error = _lookup_session(session_id, api_key)
+        if error:
+            return error
+        handler, args = run_session_negotiation, (session_id, user_message, api_key, mode)
+    else:
+        # Use current offer if provided, otherwise fall back to template
+        if not current_offer:
+            current_offer = JOB_OFFERS[current_offer_level]
+        handler, args = run_negotiation, (user_message, current_offer, current_offer_level,
+                                          conversation_history, api_key, mode)
+    
+    if data.get('async'):
+        try:
+            job = negotiation_jobs.submit(handler, *args)
+        except QueueFullError as e:
+            return jsonify({'error': f'Too many negotiations in progress ({e}), try again shortly'}), 503
+        return jsonify({
+            'job_id': job.job_id,
+            'status': job.status,
+            'poll_url': f'/negotiate/jobs/{job.job_id}',
+            'events_url': f'/negotiate/jobs/{job.job_id}/events'
+        }), 202
+    
+    try:
+        return jsonify(handler(*args))
+    except SessionUnavailableError as e:
+        return e.response()
+
+@app.route('/negotiate/jobs/<job_id>', methods=['GET'])
+def negotiation_job(job_id):
+    """Poll an asynchronous /negotiate job"""
+    job = negotiation_jobs.get(job_id)
+    if job is None:
+        return jsonify(_JOB_NOT_FOUND), 404
+    return jsonify(job.to_dict())
+
+@app.route('/negotiate/jobs/<job_id>/events', methods=['GET'])
+def negotiation_job_events(job_id):
+    """Deliver an asynchronous /negotiate result as a Server-Sent Event once it is ready
+    
+    The open stream occupies a server thread until the job finishes, so serve it from an
+    async or gevent worker; with sync workers, poll /negotiate/jobs/<job_id> instead.
+    """
+    job = negotiation_jobs.get(job_id)
+    if job is None:
+        return jsonify(_JOB_NOT_FOUND), 404
+    
+    def events():
+        # Comment lines keep proxies from closing the connection while the job waits
+        while not job.done.wait(timeout=15.0):
+            yield ": waiting\n\n"
+        payload = job.to_dict()
+        event = 'done' if payload['status'] == 'done' else 'error'
+        yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 @app.route('/download_pdf', methods=['POST'])
 def download_pdf():
@@ -901,7 +1851,17 @@ def download_pdf():
 
 @app.route('/health')
 def health():
-    return jsonify({'status': 'healthy'})
+    return jsonify({
+        'status': 'degraded' if llm_circuit_breaker.is_open() else 'healthy',
+        'context_store': context_store.stats(),
+        'llm': llm_call_stats.snapshot(),
+        'llm_circuit_breaker': llm_circuit_breaker.snapshot(),
+        'llm_rate_limits': llm_rate_limiters.snapshot(),
+        'llm_single_flight': llm_single_flight.snapshot(),
+        'negotiation_prescreen': negotiation_prescreen_stats.snapshot(),
+        'negotiation_jobs': negotiation_jobs.stats(),
+        'negotiation_sessions': negotiation_sessions.stats()
+    })
 
 @app.route("/get_random_offer", methods=["GET"])
 def get_random_offer():
@@ -1021,6 +1981,39 @@ def upload_resume():
         return jsonify({"error": str(e)}), 500
 
 # Negotiator Bot Routes
+def _lookup_context(context_id, api_key=None):
+    """Registered context for this worker, rebinding contexts created by another worker
+    
+    With a shared storage backend the context may have been created in a different
+    process; it can be served here when the caller presents the API key it was created with.
+    Returns None for an entry whose context the storage no longer has, since another process
+    may have purged it; _missing_context_response then drops the entry.
+    """
+    entry = context_registry.get(context_id)
+    if entry:
+        return entry if context_id in context_store else None
+    if not api_key:
+        return None
+    
+    owner = context_store.get_owner(context_id)
+    if not owner or owner[0] != hash_api_key(api_key):
+        return None
+    tenant, options = owner
+    bot = NegotiatorBot(
+        api_key,
+        pipeline_mode=PipelineMode(options.get('pipeline_mode', PipelineMode.TWO_CALL.value)),
+        analysis_mode=AnalysisMode(options.get('analysis_mode', AnalysisMode.LLM.value)),
+        context_store=context_store
+    )
+    return context_registry.register(context_id, bot)
+
+def _missing_context_response(context_id):
+    """Error response for a context ID that is not registered, or no longer stored"""
+    # A context still registered here but gone from storage expired, whichever process purged it
+    if context_registry.remove(context_id) is not None or context_store.was_evicted(context_id):
+        return jsonify({'error': 'Context expired', 'expired': True}), 410
+    return jsonify({'error': 'Context not found'}), 404
+
 @app.route('/create_negotiation_context', methods=['POST'])
 def create_negotiation_context():
     """Create a new negotiation context for the negotiator bot"""
@@ -1034,10 +2027,22 @@ def create_negotiation_context():
         return jsonify({'error': 'Invalid API key format'}), 400
     
     try:
-        global negotiator_bot
-        negotiator_bot = NegotiatorBot(api_key)
+        pipeline_mode = _request_enum(data, 'pipeline_mode', PipelineMode, PipelineMode.TWO_CALL)
+        analysis_mode = _request_enum(data, 'analysis_mode', AnalysisMode, AnalysisMode.LLM)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        # Each context gets its own bot so its API key and options never leak into
+        # another user's negotiation; the OpenAI client underneath is pooled per key
+        bot = NegotiatorBot(
+            api_key,
+            pipeline_mode=pipeline_mode,
+            analysis_mode=analysis_mode,
+            context_store=context_store
+        )
         
-        context_id = negotiator_bot.create_negotiation_context(
+        context_id = bot.create_negotiation_context(
             company_name=data.get('company_name', 'Unknown Company'),
             position=data.get('position', 'Software Engineer'),
             user_profile=data.get('user_profile', {}),
@@ -1045,6 +2050,11 @@ def create_negotiation_context():
             target_benefits=data.get('target_benefits', []),
             deal_breakers=data.get('deal_breakers', [])
         )
+        context_registry.register(context_id, bot)
+        context_store.set_owner(context_id, hash_api_key(api_key), {
+            'pipeline_mode': bot.pipeline_mode.value,
+            'analysis_mode': bot.analysis_mode.value
+        })
         
         return jsonify({
             'context_id': context_id,
@@ -1064,23 +2074,78 @@ def generate_negotiation_response():
     if not context_id or not incoming_message:
         return jsonify({'error': 'Context ID and message are required'}), 400
     
-    if not negotiator_bot:
-        return jsonify({'error': 'Negotiator bot not initialized'}), 400
+    try:
+        mode = _response_mode(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    entry = _lookup_context(context_id, data.get('api_key'))
+    if not entry:
+        return _missing_context_response(context_id)
     
     try:
-        response = negotiator_bot.generate_response(
-            context_id, 
-            incoming_message, 
-            offer_details
-        )
+        with entry.lock:
+            details = entry.bot.generate_response_details(
+                context_id, 
+                incoming_message, 
+                offer_details,
+                mode=mode
+            )
         
         return jsonify({
-            'response': response,
-            'context_id': context_id
+            'response': details['response'],
+            'context_id': context_id,
+            'analysis_ran': details['analysis_ran'],
+            'tokens': details['tokens'],
+            'plan': details['plan']
         })
+    except ContextUnavailableError:
+        # The context expired after the lookup, e.g. on its first access past the TTL
+        return _missing_context_response(context_id)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/generate_negotiation_response_stream', methods=['POST'])
+def generate_negotiation_response_stream():
+    """Stream a negotiation response as Server-Sent Events"""
+    data = request.json
+    context_id = data.get('context_id')
+    incoming_message = data.get('message')
+    offer_details = data.get('offer_details')
+    
+    if not context_id or not incoming_message:
+        return jsonify({'error': 'Context ID and message are required'}), 400
+    
+    entry = _lookup_context(context_id, data.get('api_key'))
+    if not entry:
+        return _missing_context_response(context_id)
+    
+    def events():
+        parts = []
+        try:
+            # Hold the context lock for the whole stream so turns cannot interleave
+            with entry.lock:
+                for token in entry.bot.generate_response_stream(context_id, incoming_message, offer_details):
+                    parts.append(token)
+                    yield f"data: {json.dumps({'token': token})}\n\n"
+            usage = current_turn_usage()
+            done = {
+                'response': ''.join(parts).strip(),
+                'context_id': context_id,
+                'tokens': usage.to_dict() if usage else None
+            }
+            yield f"event: done\ndata: {json.dumps(done)}\n\n"
+        except ContextUnavailableError as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e), 'expired': e.expired})}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/get_negotiation_status', methods=['POST'])
 def get_negotiation_status():
     """Get the current status of a negotiation"""
@@ -1090,12 +2155,16 @@ def get_negotiation_status():
     if not context_id:
         return jsonify({'error': 'Context ID is required'}), 400
     
-    if not negotiator_bot:
-        return jsonify({'error': 'Negotiator bot not initialized'}), 400
+    # Status needs no LLM access, so it is read straight from the shared storage
+    try:
+        context = context_store[context_id]
+    except ContextExpiredError:
+        return jsonify({'error': 'Context expired', 'expired': True}), 410
+    except KeyError:
+        return jsonify({'error': 'Context not found'}), 404
     
     try:
-        status = negotiator_bot.get_negotiation_status(context_id)
-        return jsonify(status)
+        return jsonify(NegotiatorBot.status_for(context))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1109,12 +2178,14 @@ def update_negotiation_strategy():
     if not context_id or not strategy:
         return jsonify({'error': 'Context ID and strategy are required'}), 400
     
-    if not negotiator_bot:
-        return jsonify({'error': 'Negotiator bot not initialized'}), 400
+    entry = _lookup_context(context_id, data.get('api_key'))
+    if not entry:
+        return _missing_context_response(context_id)
     
     try:
         strategy_enum = NegotiationStrategy(strategy)
-        negotiator_bot.update_strategy(context_id, strategy_enum)
+        with entry.lock:
+            entry.bot.update_strategy(context_id, strategy_enum)
         return jsonify({'message': 'Strategy updated successfully'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -0,0 +1,238 @@
+"""
+Prometheus Metrics for Recruiter Bot and Negotiator Bot
+Labelled counters, gauges and histograms for LLM calls, jobs and HTTP routes, in the Prometheus text format
+"""
+
+import json
+import math
+import threading
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+
+# The Flask route being served in this thread or task; LLM calls are labelled with it
+_current_route: ContextVar[str] = ContextVar("metrics_route", default="none")
+
+
+def set_route(route: str):
+    _current_route.set(route)
+
+
+def current_route() -> str:
+    return _current_route.get()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        """(sample name, labels, value) for every line of the exposition"""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}"
+                     for name, labels, value in self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Per label set: count per bucket (not cumulative), sum, count
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            snapshot = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        for key, (counts, total, count) in sorted(snapshot.items()):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", dict(labels, le=_format_value(bound)), cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+
+class MetricsRegistry:
+    """The metrics exposed on /metrics; each process keeps its own values"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+registry = MetricsRegistry()
+
+LLM_REQUESTS = registry.counter(
+    "negotiator_llm_requests_total", "Chat-completion calls by outcome (ok or the error type)",
+    ("stage", "model", "route", "outcome"))
+LLM_LATENCY = registry.histogram(
+    "negotiator_llm_request_duration_seconds", "Chat-completion latency as seen by the caller, retries included",
+    ("stage", "model", "route"))
+LLM_PROMPT_TOKENS = registry.histogram(
+    "negotiator_llm_prompt_tokens", "Prompt tokens per chat completion",
+    ("stage", "model", "route"), buckets=TOKEN_BUCKETS)
+LLM_COMPLETION_TOKENS = registry.histogram(
+    "negotiator_llm_completion_tokens", "Completion tokens per chat completion",
+    ("stage", "model", "route"), buckets=TOKEN_BUCKETS)
+LLM_QUEUE_WAIT = registry.histogram(
+    "negotiator_llm_queue_wait_seconds", "Time a chat-completion request waited for its API key's rate limiter",
+    ("stage", "route"))
+LLM_UPSTREAM_LATENCY = registry.histogram(
+    "negotiator_llm_upstream_duration_seconds", "Time of each request to the LLM provider, excluding queue wait",
+    ("stage", "model", "route"))
+LLM_COALESCED = registry.counter(
+    "negotiator_llm_coalesced_total", "Chat-completion calls answered by an identical call already in flight",
+    ("stage", "route"))
+JSON_PARSE_FAILURES = registry.counter(
+    "negotiator_llm_json_parse_failures_total", "Completions that should have been JSON but did not parse",
+    ("stage", "route"))
+FALLBACKS = registry.counter(
+    "negotiator_fallbacks_total", "Times a local fallback replaced an LLM result, by reason",
+    ("stage", "reason", "route"))
+JOBS_QUEUED = registry.gauge(
+    "negotiator_jobs_queued", "Background jobs waiting for a worker in this process", ("queue",))
+JOBS_RUNNING = registry.gauge(
+    "negotiator_jobs_running", "Background jobs running in this process", ("queue",))
+JOB_WAIT = registry.histogram(
+    "negotiator_job_wait_seconds", "Time a background job waited for a worker", ("queue",))
+JOB_RUN = registry.histogram(
+    "negotiator_job_run_seconds", "Time a background job took once a worker picked it up", ("queue", "status"))
+HTTP_LATENCY = registry.histogram(
+    "negotiator_http_request_duration_seconds", "Flask request latency until the response (or stream) starts",
+    ("route", "method", "status"))
+
+
+def record_fallback(stage: str, error: Optional[Exception] = None, reason: Optional[str] = None):
+    """Count a fallback, and a JSON-parse failure when that is what caused it"""
+    if reason is None:
+        if isinstance(error, json.JSONDecodeError):
+            reason = "json_parse"
+        else:
+            reason = type(error).__name__ if error is not None else "unknown"
+    if reason == "json_parse":
+        JSON_PARSE_FAILURES.inc(stage=stage, route=current_route())
+    FALLBACKS.inc(stage=stage, reason=reason, route=current_route())
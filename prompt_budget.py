@@ -0,0 +1,195 @@
+"""
+Prompt Token Budgeting for Negotiator Bot
+Counts tokens locally, serializes offers compactly and keeps each prompt stage within a token budget
+"""
+
+import re
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+# Words, digit runs and single punctuation marks, roughly how BPE tokenizers split text
+_PIECE_PATTERN = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+_ELLIPSIS = " ..."
+_MONEY_PATTERN = re.compile(r"^\$\s*(\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?\s*(k|K)?$")
+
+
+def _piece_tokens(piece: str) -> int:
+    if piece.isdigit():
+        return (len(piece) + 2) // 3  # digits are split into groups of up to three
+    if piece.isalpha():
+        return 1 + max(0, len(piece) - 4) // 4  # common words are a single token
+    return 1
+
+
+def count_tokens(text: str) -> int:
+    """Approximate the prompt token count without calling a tokenizer or the API"""
+    if not text:
+        return 0
+    return sum(_piece_tokens(piece) for piece in _PIECE_PATTERN.findall(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text after about max_tokens tokens, marking the cut with an ellipsis"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    limit = max_tokens - count_tokens(_ELLIPSIS)
+    total = 0
+    for match in _PIECE_PATTERN.finditer(text):
+        total += _piece_tokens(match.group())
+        if total > limit:
+            return text[:match.start()].rstrip() + _ELLIPSIS
+    return text
+
+
+def _canonical_value(value: Any, max_chars: int) -> str:
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, str):
+        money = _MONEY_PATTERN.match(value.strip())
+        if money:
+            amount = int(money.group(1).replace(",", ""))
+            return str(amount * 1000 if money.group(2) else amount)
+        value = " ".join(value.split())
+        return value if len(value) <= max_chars else value[:max_chars].rstrip() + "..."
+    if isinstance(value, (list, tuple)):
+        return "|".join(_canonical_value(item, max_chars) for item in value if item not in (None, ""))
+    if isinstance(value, dict):
+        return "{" + compact_offer(value, max_chars=max_chars) + "}"
+    return _canonical_value(str(value), max_chars)
+
+
+def compact_offer(offer: Optional[Dict], max_fields: int = 8, max_chars: int = 60) -> str:
+    """Canonical one-line form of an offer: sorted snake_case keys, plain numbers, no empty values
+
+    {"Salary": "$85,000", "benefits": ["health", "401k"], "notes": None} becomes
+    "benefits=health|401k; salary=85000".
+    """
+    if not offer:
+        return "none"
+    if not isinstance(offer, dict):
+        return _canonical_value(offer, max_chars)
+
+    fields = []
+    for key in sorted(offer, key=lambda k: str(k).lower()):
+        value = offer[key]
+        if value is None or value == "" or value == [] or value == {}:
+            continue
+        name = re.sub(r"\W+", "_", str(key).strip().lower()).strip("_")
+        fields.append(f"{name}={_canonical_value(value, max_chars)}")
+
+    if len(fields) > max_fields:
+        fields = fields[:max_fields] + [f"+{len(fields) - max_fields} more"]
+    return "; ".join(fields) or "none"
+
+
+@dataclass(frozen=True)
+class StageBudget:
+    """Token limits for one LLM stage of a turn"""
+    prompt_tokens: int
+    completion_tokens: int
+
+
+STAGE_BUDGETS: Dict[str, StageBudget] = {
+    "analysis": StageBudget(prompt_tokens=400, completion_tokens=250),
+    "enhancement": StageBudget(prompt_tokens=700, completion_tokens=300),
+    "fused": StageBudget(prompt_tokens=900, completion_tokens=450),
+}
+
+
+@dataclass
+class _Section:
+    text: str
+    min_tokens: Optional[int]  # None for fixed text that is never shortened
+
+
+class PromptBuilder:
+    """Assembles a prompt from fixed lines and shrinkable fields within a token budget
+
+    When the prompt is over budget, the largest shrinkable field is truncated first,
+    never below its ``min_tokens``. Fixed instruction text is never touched.
+    """
+
+    def __init__(self, budget: int):
+        self.budget = budget
+        self._sections: List[_Section] = []
+        self.truncated = False
+
+    def line(self, text: str = "") -> "PromptBuilder":
+        self._sections.append(_Section(text, None))
+        return self
+
+    def field(self, text: str, min_tokens: int = 16) -> "PromptBuilder":
+        self._sections.append(_Section(text, min_tokens))
+        return self
+
+    def build(self) -> str:
+        sizes = [count_tokens(section.text) for section in self._sections]
+        overage = sum(sizes) - self.budget
+        while overage > 0:
+            shrinkable = [i for i, section in enumerate(self._sections)
+                          if section.min_tokens is not None and sizes[i] > section.min_tokens]
+            if not shrinkable:
+                break
+            largest = max(shrinkable, key=lambda i: sizes[i])
+            section = self._sections[largest]
+            section.text = truncate_to_tokens(section.text, max(section.min_tokens, sizes[largest] - overage))
+            new_size = count_tokens(section.text)
+            if new_size >= sizes[largest]:
+                break
+            overage -= sizes[largest] - new_size
+            sizes[largest] = new_size
+            self.truncated = True
+        return "\n".join(section.text for section in self._sections)
+
+
+class TurnUsage:
+    """Prompt and completion tokens spent by each stage of one negotiation turn"""
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, int]] = {}
+
+    def record(self, stage: str, prompt_tokens: int, completion_tokens: int):
+        totals = self.stages.setdefault(stage, {"prompt_tokens": 0, "completion_tokens": 0})
+        totals["prompt_tokens"] += prompt_tokens
+        totals["completion_tokens"] += completion_tokens
+
+    def to_dict(self) -> Dict:
+        return {
+            "prompt_tokens": sum(s["prompt_tokens"] for s in self.stages.values()),
+            "completion_tokens": sum(s["completion_tokens"] for s in self.stages.values()),
+            "stages": {stage: dict(totals) for stage, totals in self.stages.items()}
+        }
+
+
+# The turn being generated in this thread or asyncio task
+_current_usage: ContextVar[Optional[TurnUsage]] = ContextVar("negotiator_turn_usage", default=None)
+
+
+def start_turn_usage() -> TurnUsage:
+    """Begin counting tokens for a new turn in the current thread or task"""
+    usage = TurnUsage()
+    _current_usage.set(usage)
+    return usage
+
+
+def current_turn_usage() -> Optional[TurnUsage]:
+    return _current_usage.get()
+
+
+def record_usage(stage: str, prompt: str, completion: str, response: Any = None):
+    """Add one completion to the current turn, preferring the API's own usage counts"""
+    usage = _current_usage.get()
+    if usage is None:
+        return
+    reported = getattr(response, "usage", None)
+    prompt_tokens = getattr(reported, "prompt_tokens", None)
+    completion_tokens = getattr(reported, "completion_tokens", None)
+    if not isinstance(prompt_tokens, int) or not isinstance(completion_tokens, int):
+        prompt_tokens, completion_tokens = count_tokens(prompt), count_tokens(completion)
+    usage.record(stage, prompt_tokens, completion_tokens)
+
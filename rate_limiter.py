@@ -0,0 +1,195 @@
+"""
+Adaptive Rate Limiting for Recruiter Bot and Negotiator Bot
+Per-API-key token bucket with an AIMD concurrency limit driven by 429s and latency
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Optional
+
+
+def _percentile_ms(values, fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 1)
+
+
+class AdaptiveRateLimiter:
+    """Admits LLM calls for one API key at ``rate`` per second and ``limit`` at a time
+
+    The token bucket holds up to ``burst`` calls' worth of tokens. The concurrency
+    limit follows AIMD: every call that finishes within ``latency_target`` raises it by
+    1/limit (about one per round of calls), while a 429 halves it and a slow call cuts
+    it by ``slow_factor``, at most once per round trip (the recent average latency,
+    capped at ``decrease_cooldown``) so one burst of 429s only counts once. A 429 also
+    empties the bucket, pausing new calls briefly.
+    Callers over the limit wait in line until their deadline instead of failing.
+    """
+
+    # How often a waiter blocked on concurrency re-checks if no release wakes it
+    poll_interval = 0.05
+
+    def __init__(self, rate: float = 10.0, burst: int = 20, max_concurrency: int = 16,
+                 min_concurrency: int = 1, latency_target: float = 10.0, decrease_factor: float = 0.5,
+                 slow_factor: float = 0.9, decrease_cooldown: float = 1.0, window: int = 500,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.slow_factor = slow_factor
+        self.decrease_cooldown = decrease_cooldown
+        self._clock = clock
+        self._cond = threading.Condition()
+        self.limit = float(max_concurrency)
+        self.tokens = float(burst)
+        self._refilled_at = clock()
+        self._decreased_at = float("-inf")
+        self._latency_avg = None  # moving average of successful call latency, in seconds
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.throttled = 0
+        self.slow_calls = 0
+        self.decreases = 0
+        self.queue_timeouts = 0
+        self._queue_wait_ms = deque(maxlen=window)
+        self._llm_ms = deque(maxlen=window)
+
+    def _try_acquire(self) -> float:
+        """Take a slot and a token and return 0, or return how long to wait first; needs the lock"""
+        now = self._clock()
+        self.tokens = min(self.burst, self.tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+        if self.in_flight >= int(self.limit):
+            return self.poll_interval
+        if self.tokens < 1:
+            return (1 - self.tokens) / self.rate
+        self.tokens -= 1
+        self.in_flight += 1
+        self.admitted += 1
+        return 0.0
+
+    def _finish_wait(self, started: float, admitted: bool) -> bool:
+        """Leave the queue, recording the wait; needs the lock"""
+        self.queued -= 1
+        if admitted:
+            self._queue_wait_ms.append((self._clock() - started) * 1000)
+        else:
+            self.queue_timeouts += 1
+        return admitted
+
+    def acquire(self, timeout: float) -> bool:
+        """Wait up to ``timeout`` seconds for a slot; False means the deadline passed"""
+        with self._cond:
+            started = self._clock()
+            deadline = started + timeout
+            self.queued += 1
+            while True:
+                wait = self._try_acquire()
+                if wait == 0:
+                    return self._finish_wait(started, True)
+                remaining = deadline - self._clock()
+                if remaining <= 0:
+                    return self._finish_wait(started, False)
+                # Releases notify, so a freed slot is picked up without waiting out the poll
+                self._cond.wait(min(wait, remaining))
+
+    async def acquire_async(self, timeout: float) -> bool:
+        """acquire without blocking the event loop"""
+        with self._cond:
+            started = self._clock()
+            self.queued += 1
+        deadline = started + timeout
+        while True:
+            with self._cond:
+                wait = self._try_acquire()
+                if wait == 0:
+                    return self._finish_wait(started, True)
+                remaining = deadline - self._clock()
+                if remaining <= 0:
+                    return self._finish_wait(started, False)
+            await asyncio.sleep(min(wait, remaining, self.poll_interval))
+
+    def release(self, latency: Optional[float] = None, throttled: bool = False):
+        """Give back a slot and adjust the limit: ``throttled`` for a 429, else the call's latency
+
+        Leave ``latency`` None for failures that say nothing about load, e.g. a bad request.
+        """
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.throttled += 1
+                self.tokens = min(self.tokens, 0.0)
+                self._decrease(self.decrease_factor)
+            elif latency is not None:
+                self._llm_ms.append(latency * 1000)
+                self._latency_avg = latency if self._latency_avg is None else 0.9 * self._latency_avg + 0.1 * latency
+                if latency > self.latency_target:
+                    self.slow_calls += 1
+                    self._decrease(self.slow_factor)
+                else:
+                    self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def _decrease(self, factor: float):
+        now = self._clock()
+        # Calls already in flight were sent at the old limit; let them land before cutting again
+        round_trip = min(self.decrease_cooldown, self._latency_avg or self.decrease_cooldown)
+        if now - self._decreased_at < round_trip:
+            return
+        self._decreased_at = now
+        self.decreases += 1
+        self.limit = max(self.min_concurrency, self.limit * factor)
+
+    def snapshot(self) -> Dict:
+        with self._cond:
+            return {
+                "concurrency_limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "queued": self.queued,
+                "tokens": round(min(self.burst, self.tokens + (self._clock() - self._refilled_at) * self.rate), 1),
+                "admitted": self.admitted,
+                "throttled": self.throttled,
+                "slow_calls": self.slow_calls,
+                "decreases": self.decreases,
+                "queue_timeouts": self.queue_timeouts,
+                "queue_wait_ms": {"p50": _percentile_ms(self._queue_wait_ms, 0.50),
+                                  "p95": _percentile_ms(self._queue_wait_ms, 0.95)},
+                "llm_ms": {"p50": _percentile_ms(self._llm_ms, 0.50), "p95": _percentile_ms(self._llm_ms, 0.95)}
+            }
+
+
+class RateLimiterRegistry:
+    """One AdaptiveRateLimiter per API key, shared by every backend created for that key"""
+
+    def __init__(self, factory: Callable[[], AdaptiveRateLimiter] = AdaptiveRateLimiter, max_keys: int = 1000):
+        self.factory = factory
+        self.max_keys = max_keys
+        self._limiters: "OrderedDict[str, AdaptiveRateLimiter]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> AdaptiveRateLimiter:
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limiter = self._limiters[key] = self.factory()
+                # Forget the least recently used idle keys; a busy limiter is never dropped
+                for old_key in list(self._limiters)[:-1]:
+                    if len(self._limiters) <= self.max_keys:
+                        break
+                    if self._limiters[old_key].in_flight == 0 and self._limiters[old_key].queued == 0:
+                        del self._limiters[old_key]
+            self._limiters.move_to_end(key)
+            return limiter
+
+    def snapshot(self) -> Dict:
+        """Per-key stats, keyed by a short prefix of the key's hash"""
+        with self._lock:
+            limiters = list(self._limiters.items())
+        return {key[:12]: limiter.snapshot() for key, limiter in limiters}
@@ -0,0 +1,178 @@
+"""
+Local Recruiter Rules for Recruiter Bot
+Decides a negotiation attempt with keyword rules instead of calling the LLM
+"""
+
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# Offer levels from lowest to highest, as in main.JOB_OFFERS
+OFFER_LADDER = ["newgrad", "entry", "mid", "senior"]
+
+# Withdrawal-worthy language from the evaluate_negotiation prompt
+HOSTILE_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r"\b(insulting|ridiculous|pathetic|cheap|joke|greedy|stupid)\b",
+    r"\bwasting my time\b",
+    r"\byou(?:'d| had)? better\b",
+    r"\bor i(?:'m| am) (?:gone|out|walking)\b",
+    r"\bnot accept(?:ing)? anything less\b",
+    r"\bmaking a (?:big )?mistake\b",
+    r"\bdeserve way more\b",
+)]
+
+# Kinds of evidence the prompt accepts as a reason to improve the offer
+EVIDENCE_PATTERNS = {
+    "experience": re.compile(r"\b\d+\+? years?\b|\bexperience[d]? (?:in|with)\b", re.IGNORECASE),
+    "leadership": re.compile(r"\b(led|lead|managed|mentored|architected)\b", re.IGNORECASE),
+    "credentials": re.compile(r"\b(certifi\w*|degree|phd|master'?s|patents?|published)\b", re.IGNORECASE),
+    "market": re.compile(r"\b(market (?:rate|data|research)|research shows|levels\.fyi|glassdoor|typically earn)\b",
+                         re.IGNORECASE),
+    "competing_offer": re.compile(r"\b(competing|another|other) offers?\b", re.IGNORECASE),
+    "impact": re.compile(r"\b(saved|increased|reduced|improved|grew|delivered|shipped)\b", re.IGNORECASE),
+}
+
+# Bare asks with nothing to back them up, like the prompt's "bad negotiation" examples
+GENERIC_ASK_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r"\b(?:i|we) (?:need|want|would like|deserve|expect) (?:more|a higher|a bigger|better)\b",
+    r"\b(?:the |this |your )?(?:offer|salary|pay|number) is (?:too|really|very|a bit)? ?(?:low|small)\b",
+    r"\b(?:can|could|would|will) you (?:increase|raise|improve|bump|up)\b",
+    r"\b(?:more|higher) (?:money|salary|pay|compensation)\b",
+    r"\bbetter (?:benefits|offer|package)\b",
+)]
+
+POLITENESS_PATTERN = re.compile(
+    r"\b(please|thank(?:s| you)|appreciate|grateful|excited|glad|happy to|respectfully|"
+    r"would you be open|i understand|i hope)\b", re.IGNORECASE)
+
+RESPONSES = {
+    "withdraw": "We expect professional communication throughout the hiring process. Given the tone of this "
+                "conversation, we have decided to withdraw our offer. We wish you the best in your search.",
+    "improve": "Thank you for laying out your experience so clearly. Based on the specific value you would "
+               "bring to the team, we are able to improve our offer.",
+    "maintain": "Thank you for sharing your thoughts. Our offer reflects the market rate for this role and "
+                "your qualifications, so it remains as it stands.",
+}
+
+
+def evidence_kinds(message: str) -> List[str]:
+    """Which kinds of supporting evidence the candidate's message contains"""
+    return [kind for kind, pattern in EVIDENCE_PATTERNS.items() if pattern.search(message)]
+
+
+@dataclass(frozen=True)
+class MessageFeatures:
+    """What the local rules look at in a candidate's message"""
+    words: int
+    hostile: int  # hostile patterns matched
+    generic_ask: bool
+    politeness: int  # polite phrases used
+    evidence: List[str]
+
+    @classmethod
+    def of(cls, message: str) -> "MessageFeatures":
+        return cls(
+            words=len(message.split()),
+            hostile=sum(1 for pattern in HOSTILE_PATTERNS if pattern.search(message)),
+            generic_ask=any(pattern.search(message) for pattern in GENERIC_ASK_PATTERNS),
+            politeness=len(POLITENESS_PATTERN.findall(message)),
+            evidence=evidence_kinds(message)
+        )
+
+
+def next_offer_level(offer_level: str) -> Optional[str]:
+    if offer_level not in OFFER_LADDER:
+        return None
+    index = OFFER_LADDER.index(offer_level)
+    return OFFER_LADDER[index + 1] if index + 1 < len(OFFER_LADDER) else None
+
+
+def _withdraw() -> Dict:
+    return {
+        "response": RESPONSES["withdraw"],
+        "action": "withdraw",
+        "new_offer_level": None,
+        "reasoning": "Unprofessional or confrontational language"
+    }
+
+
+def _maintain(reasoning: str) -> Dict:
+    return {
+        "response": RESPONSES["maintain"],
+        "action": "maintain",
+        "new_offer_level": None,
+        "reasoning": reasoning
+    }
+
+
+def evaluate_locally(user_message: str, offer_level: str, negotiation_count: int) -> Dict:
+    """Recruiter decision in the evaluate_negotiation JSON format, without an LLM call
+
+    Hostile language withdraws the offer; two kinds of evidence (three after two
+    attempts, since each attempt is judged more strictly) improve it by one level;
+    anything else maintains it.
+    """
+    if any(pattern.search(user_message) for pattern in HOSTILE_PATTERNS):
+        return _withdraw()
+
+    kinds = evidence_kinds(user_message)
+    new_level = next_offer_level(offer_level)
+    if new_level and len(kinds) >= (2 if negotiation_count < 2 else 3):
+        return {
+            "response": RESPONSES["improve"],
+            "action": "improve",
+            "new_offer_level": new_level,
+            "reasoning": f"Specific evidence of value: {', '.join(kinds)}",
+            "improvements": f"Moved from the {offer_level} to the {new_level} package"
+        }
+
+    return _maintain("No compelling new evidence of value" if kinds else "Generic request without supporting evidence")
+
+
+def prescreen(user_message: str) -> Optional[Dict]:
+    """Decide clear-cut messages locally, or return None to leave the message to the LLM
+
+    Only two outcomes are resolved here, both spelled out in the evaluate_negotiation
+    prompt: hostile messages without any softening politeness are withdrawn, and short
+    generic asks with no evidence, hostility or hedging are maintained. Anything that
+    might earn an improvement, or mixes signals, goes to the LLM.
+    """
+    features = MessageFeatures.of(user_message)
+    if features.hostile and (features.politeness == 0 or features.hostile >= 2):
+        return _withdraw()
+    if features.hostile or features.evidence:
+        return None
+    if features.words <= 25 and (features.generic_ask or features.words <= 4) and features.politeness <= 1:
+        return _maintain("Generic request without supporting evidence")
+    return None
+
+
+class PrescreenStats:
+    """How many evaluations the pre-screen resolved without an LLM call"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.screened = 0
+        self.withdrawn = 0
+        self.maintained = 0
+
+    def record(self, decision: Optional[Dict]):
+        with self._lock:
+            self.screened += 1
+            if decision is not None:
+                if decision["action"] == "withdraw":
+                    self.withdrawn += 1
+                else:
+                    self.maintained += 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            resolved = self.withdrawn + self.maintained
+            return {
+                "screened": self.screened,
+                "resolved_locally": resolved,
+                "withdrawn": self.withdrawn,
+                "maintained": self.maintained,
+                "local_fraction": round(resolved / self.screened, 3) if self.screened else None
+            }
@@ -0,0 +1,65 @@
+"""
+Speculative Negotiator Turns
+Drafts the negotiator's next reply in the background while the current round is still on screen
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class TurnSpeculator:
+    """Holds at most one pending draft, keyed by the inputs it was generated for
+
+    ``prepare`` starts drafting a reply for predicted inputs in a worker thread.
+    ``take`` returns that draft only when the actual inputs match the prediction;
+    otherwise the draft is discarded and the caller generates the turn as usual.
+    """
+
+    def __init__(self, max_workers: int = 2):
+        # A discarded draft may still be running, so allow a second one alongside it
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculative-turn")
+        self._pending: Optional[Tuple[Hashable, Future]] = None
+        self._lock = threading.Lock()
+        self.stats = {"started": 0, "hits": 0, "discarded": 0}
+
+    def prepare(self, bot: Any, context_id: str, incoming_message: str,
+                offer_details: Optional[Dict], key: Hashable):
+        """Start drafting ``bot``'s reply unless a draft for the same key is already pending"""
+        with self._lock:
+            if self._pending is not None and self._pending[0] == key:
+                return
+            if self._pending is not None:
+                self.stats["discarded"] += 1
+            future = self._executor.submit(bot.draft_response, context_id, incoming_message, offer_details)
+            self._pending = (key, future)
+            self.stats["started"] += 1
+
+    def take(self, key: Hashable, timeout: Optional[float] = None):
+        """The pending draft if it was generated for ``key``, else None"""
+        with self._lock:
+            pending, self._pending = self._pending, None
+        if pending is None:
+            return None
+        if pending[0] != key:
+            with self._lock:
+                self.stats["discarded"] += 1
+            return None
+
+        try:
+            draft = pending[1].result(timeout=timeout)
+        except Exception as e:
+            print(f"Error in speculative negotiator turn: {e}")
+            with self._lock:
+                self.stats["discarded"] += 1
+            return None
+        with self._lock:
+            self.stats["hits"] += 1
+        return draft
+
+    def discard(self):
+        """Drop any pending draft, e.g. when the negotiation is stopped"""
+        with self._lock:
+            if self._pending is not None:
+                self.stats["discarded"] += 1
+            self._pending = None
@@ -0,0 +1,241 @@
+"""
+SQLite Negotiation Context Store
+Persists negotiation contexts in a WAL-mode SQLite database shared by every worker process
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from context_store import ContextExpiredError, ContextStorage
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {prefix}contexts (
+    context_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    tenant TEXT,
+    options TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS {prefix}history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    context_id TEXT NOT NULL,
+    entry TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS {prefix}history_by_context ON {prefix}history (context_id, id);
+CREATE INDEX IF NOT EXISTS {prefix}contexts_by_updated ON {prefix}contexts (updated_at);
+CREATE TABLE IF NOT EXISTS {prefix}evicted (
+    context_id TEXT PRIMARY KEY,
+    reason TEXT NOT NULL,
+    evicted_at REAL NOT NULL
+);
+"""
+
+
+class SQLiteContextStore(ContextStorage):
+    """ContextStorage backed by SQLite in WAL mode
+
+    The context row holds everything except the history; each history entry is its
+    own append-only row, so a turn inserts rows instead of rewriting the context.
+    ``context_type`` must provide ``to_dict()`` and ``from_dict()`` (NegotiationContext does).
+    ``table_prefix`` lets several stores share one database, each with its own tables.
+    """
+
+    def __init__(self, path: str, context_type: Any, ttl_seconds: Optional[float] = None,
+                 purge_interval: float = 60.0, table_prefix: str = ""):
+        super().__init__()
+        self.path = path
+        self.context_type = context_type
+        self.table_prefix = table_prefix
+        self.ttl_seconds = ttl_seconds
+        self.purge_interval = purge_interval
+        self._local = threading.local()
+        self._last_purge = 0.0
+        self.evictions = {"ttl": 0}
+        self._connection().executescript(_SCHEMA.format(prefix=table_prefix))
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def __getitem__(self, context_id: str):
+        self._purge_expired()
+        return self._read(self._connection(), context_id)
+
+    def _read(self, connection: sqlite3.Connection, context_id: str):
+        row = connection.execute(
+            f"SELECT data FROM {self.table_prefix}contexts WHERE context_id = ?", (context_id,)
+        ).fetchone()
+        if row is None:
+            if self.was_evicted(context_id):
+                raise ContextExpiredError(context_id)
+            raise KeyError(context_id)
+
+        data = json.loads(row[0])
+        data["negotiation_history"] = [
+            json.loads(entry) for (entry,) in connection.execute(
+                f"SELECT entry FROM {self.table_prefix}history WHERE context_id = ? ORDER BY id",
+                (context_id,)
+            )
+        ]
+        return self.context_type.from_dict(data)
+
+    def __setitem__(self, context_id: str, context):
+        data = context.to_dict()
+        history = data.pop("negotiation_history", [])
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute(f"DELETE FROM {self.table_prefix}history WHERE context_id = ?", (context_id,))
+            connection.execute(f"DELETE FROM {self.table_prefix}evicted WHERE context_id = ?", (context_id,))
+            connection.execute(
+                f"INSERT OR REPLACE INTO {self.table_prefix}contexts "
+                "(context_id, data, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                (context_id, json.dumps(data, default=str), now, now)
+            )
+            connection.executemany(
+                f"INSERT INTO {self.table_prefix}history (context_id, entry) VALUES (?, ?)",
+                [(context_id, json.dumps(entry, default=str)) for entry in history]
+            )
+        self._purge_expired()
+
+    def __delitem__(self, context_id: str):
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            deleted = connection.execute(
+                f"DELETE FROM {self.table_prefix}contexts WHERE context_id = ?", (context_id,)
+            ).rowcount
+            connection.execute(f"DELETE FROM {self.table_prefix}history WHERE context_id = ?", (context_id,))
+        if not deleted:
+            raise KeyError(context_id)
+
+    def __contains__(self, context_id) -> bool:
+        self._purge_expired()
+        return self._connection().execute(
+            f"SELECT 1 FROM {self.table_prefix}contexts WHERE context_id = ?", (context_id,)
+        ).fetchone() is not None
+
+    def __iter__(self) -> Iterator[str]:
+        rows = self._connection().execute(f"SELECT context_id FROM {self.table_prefix}contexts").fetchall()
+        return iter(context_id for (context_id,) in rows)
+
+    def __len__(self) -> int:
+        return self._connection().execute(f"SELECT COUNT(*) FROM {self.table_prefix}contexts").fetchone()[0]
+
+    def append_history(self, context_id: str, entry: Dict):
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            touched = connection.execute(
+                f"UPDATE {self.table_prefix}contexts SET updated_at = ? WHERE context_id = ?",
+                (time.time(), context_id)
+            ).rowcount
+            if not touched:
+                raise KeyError(context_id)
+            connection.execute(
+                f"INSERT INTO {self.table_prefix}history (context_id, entry) VALUES (?, ?)",
+                (context_id, json.dumps(entry, default=str))
+            )
+
+    def update_context(self, context_id: str, **fields):
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute(
+                f"SELECT data FROM {self.table_prefix}contexts WHERE context_id = ?", (context_id,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(context_id)
+            self._write_fields(connection, context_id, json.loads(row[0]), fields)
+
+    def modify_context(self, context_id: str, update: Callable[[Any], Dict]) -> Dict:
+        connection = self._connection()
+        with connection:
+            # The write lock is taken before the read, so no other process can change the row in between
+            connection.execute("BEGIN IMMEDIATE")
+            context = self._read(connection, context_id)
+            fields = update(context)
+            if fields:
+                data = context.to_dict()
+                data.pop("negotiation_history", None)
+                self._write_fields(connection, context_id, data, fields)
+        return fields
+
+    def _write_fields(self, connection: sqlite3.Connection, context_id: str, data: Dict, fields: Dict):
+        for name, value in fields.items():
+            data[name] = getattr(value, "value", value)  # enums are stored by value
+        connection.execute(
+            f"UPDATE {self.table_prefix}contexts SET data = ?, updated_at = ? WHERE context_id = ?",
+            (json.dumps(data, default=str), time.time(), context_id)
+        )
+
+    def set_owner(self, context_id: str, tenant: str, options: Dict):
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                f"UPDATE {self.table_prefix}contexts SET tenant = ?, options = ? WHERE context_id = ?",
+                (tenant, json.dumps(options), context_id)
+            )
+
+    def get_owner(self, context_id: str) -> Optional[Tuple[str, Dict]]:
+        row = self._connection().execute(
+            f"SELECT tenant, options FROM {self.table_prefix}contexts WHERE context_id = ?", (context_id,)
+        ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return row[0], json.loads(row[1] or "{}")
+
+    def was_evicted(self, context_id: str) -> bool:
+        return self._connection().execute(
+            f"SELECT 1 FROM {self.table_prefix}evicted WHERE context_id = ?", (context_id,)
+        ).fetchone() is not None
+
+    def stats(self) -> Dict:
+        connection = self._connection()
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "contexts": len(self),
+            "history_rows": connection.execute(
+                f"SELECT COUNT(*) FROM {self.table_prefix}history").fetchone()[0],
+            "ttl_seconds": self.ttl_seconds,
+            "evictions": dict(self.evictions)
+        }
+
+    def _purge_expired(self):
+        """Delete contexts idle for longer than ttl_seconds, at most once per purge_interval"""
+        now = time.time()
+        if self.ttl_seconds is None or now - self._last_purge < self.purge_interval:
+            return
+        self._last_purge = now
+        cutoff = now - self.ttl_seconds
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            expired = [context_id for (context_id,) in connection.execute(
+                f"SELECT context_id FROM {self.table_prefix}contexts WHERE updated_at < ?", (cutoff,)
+            )]
+            for context_id in expired:
+                connection.execute(f"DELETE FROM {self.table_prefix}contexts WHERE context_id = ?",
+                                   (context_id,))
+                connection.execute(f"DELETE FROM {self.table_prefix}history WHERE context_id = ?",
+                                   (context_id,))
+                connection.execute(
+                    f"INSERT OR REPLACE INTO {self.table_prefix}evicted (context_id, reason, evicted_at) "
+                    "VALUES (?, 'ttl', ?)",
+                    (context_id, now)
+                )
+        self.evictions["ttl"] += len(expired)
+        for context_id in expired:
+            self._notify_eviction(context_id, "ttl")
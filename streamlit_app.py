@@ -5,6 +5,7 @@ from datetime import datetime
 from main import NegotiatorBot, NegotiationStrategy, ResponseTone, NegotiationContext, ResponseTemplate
 from offer_generator import OfferGenerator, CompanyType
 from resume_parser import ResumeParser
+from speculation import TurnSpeculator
 from dataclasses import dataclass
 from typing import List, Dict
 import random
@@ -103,6 +104,13 @@ if 'resume_parser' not in st.session_state:
     st.session_state.resume_parser = ResumeParser()
 if 'resume_data' not in st.session_state:
     st.session_state.resume_data = None
+if 'speculator' not in st.session_state:
+    st.session_state.speculator = TurnSpeculator()
+if 'battle_seed' not in st.session_state:
+    st.session_state.battle_seed = random.random()
+
+# What the negotiator is asked to answer each round
+NEGOTIATOR_PROMPT = "We need to discuss the compensation package."
 
 # Recruiter Bot Class
 class RecruiterBot:
@@ -124,7 +132,8 @@ class RecruiterBot:
         # Much more conservative salary progression
         self.salary_progression = [0, 0, 0, 1000, 2000, 3000, 5000, 5000, 5000, 5000, 5000]
     
-    def respond(self, round_num):
+    def respond(self, round_num, rng=None):
+        rng = rng or random
         if self.offer is None:
             return "No offer available", 0
             
@@ -177,11 +186,30 @@ class RecruiterBot:
                     "We need to maintain equity across our team members."
                 ]
                 if round_num % 2 == 0:  # Every other response
-                    response += f" {random.choice(resistance_phrases)}"
+                    response += f" {rng.choice(resistance_phrases)}"
             
             return response, current_salary
         return "Thank you for your time. We'll be moving forward with other candidates. Best of luck with your job search.", current_salary
 
+def recruiter_turn(round_num):
+    """Recruiter message and salary for a round, reproducible within one battle so it can be predicted"""
+    rng = random.Random(f"{st.session_state.battle_seed}:{round_num}")
+    return RecruiterBot(st.session_state.current_offer).respond(round_num, rng)
+
+def negotiator_turn_key(recruiter_message, salary):
+    """Everything the negotiator's next reply depends on"""
+    return (st.session_state.context_id, recruiter_message, salary)
+
+def prepare_negotiator_turn(recruiter_message, salary):
+    """Start drafting the negotiator's reply to this recruiter message in the background"""
+    st.session_state.speculator.prepare(
+        st.session_state.negotiator_bot,
+        st.session_state.context_id,
+        NEGOTIATOR_PROMPT,
+        {"salary": salary},
+        key=negotiator_turn_key(recruiter_message, salary)
+    )
+
 def display_message(sender, message, message_type="system"):
     """Display a message in the chat interface"""
     if message_type == "negotiator":
@@ -334,6 +362,8 @@ def main():
                 st.session_state.conversation_history = []
                 st.session_state.round_count = 0
                 st.session_state.current_salary = st.session_state.current_offer.base_salary
+                st.session_state.battle_seed = random.random()
+                st.session_state.speculator.discard()
                 
                 # Initialize negotiator context
                 if st.session_state.negotiator_bot:
@@ -370,6 +400,7 @@ def main():
         with col2:
             if st.button("⏹️ Stop", disabled=not st.session_state.conversation_active):
                 st.session_state.conversation_active = False
+                st.session_state.speculator.discard()
                 st.rerun()
         
         st.divider()
@@ -396,8 +427,7 @@ def main():
     if st.session_state.conversation_active and st.session_state.negotiator_bot and st.session_state.current_offer:
         if st.session_state.round_count == 0:
             # Initial recruiter offer
-            recruiter_bot = RecruiterBot(st.session_state.current_offer)
-            message, salary = recruiter_bot.respond(0)
+            message, salary = recruiter_turn(0)
             st.session_state.conversation_history.append({
                 'sender': 'recruiter',
                 'content': message,
@@ -406,6 +436,8 @@ def main():
             })
             st.session_state.current_salary = salary
             st.session_state.round_count = 1
+            # The negotiator's reply is generated while the offer is on screen
+            prepare_negotiator_turn(message, salary)
             st.rerun()
         
         elif st.session_state.round_count < 10 and st.session_state.round_count % 2 == 1:
@@ -416,12 +448,19 @@ def main():
             time.sleep(2)
             
             try:
-                # Generate negotiator response
-                response = st.session_state.negotiator_bot.generate_response(
-                    st.session_state.context_id,
-                    "We need to discuss the compensation package.",
-                    {"salary": st.session_state.current_salary}
+                # Use the reply drafted in the background if it answers what the recruiter actually said
+                recruiter_message = st.session_state.conversation_history[-1]['content']
+                draft = st.session_state.speculator.take(
+                    negotiator_turn_key(recruiter_message, st.session_state.current_salary)
                 )
+                if draft is not None:
+                    response = st.session_state.negotiator_bot.commit_draft(draft)["response"]
+                else:
+                    response = st.session_state.negotiator_bot.generate_response(
+                        st.session_state.context_id,
+                        NEGOTIATOR_PROMPT,
+                        {"salary": st.session_state.current_salary}
+                    )
                 
                 st.session_state.conversation_history.append({
                     'sender': 'negotiator',
@@ -430,6 +469,11 @@ def main():
                     'timestamp': datetime.now()
                 })
                 st.session_state.round_count += 1
+                
+                # Predict the recruiter's next message and draft the reply to it while this round is shown
+                if st.session_state.round_count + 1 < 10:
+                    next_message, next_salary = recruiter_turn(st.session_state.round_count // 2)
+                    prepare_negotiator_turn(next_message, next_salary)
                 st.rerun()
                 
             except Exception as e:
@@ -443,8 +487,7 @@ def main():
             # Simulate thinking time
             time.sleep(1.5)
             
-            recruiter_bot = RecruiterBot(st.session_state.current_offer)
-            message, salary = recruiter_bot.respond(st.session_state.round_count // 2)
+            message, salary = recruiter_turn(st.session_state.round_count // 2)
             
             st.session_state.conversation_history.append({
                 'sender': 'recruiter',
@@ -454,6 +497,9 @@ def main():
             })
             st.session_state.current_salary = salary
             st.session_state.round_count += 1
+            # Keeps the speculative draft if the prediction was right, otherwise starts over
+            if st.session_state.round_count < 10:
+                prepare_negotiator_turn(message, salary)
             st.rerun()
         
         else:
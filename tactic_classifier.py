@@ -0,0 +1,166 @@
+"""
+Local Tactic Classifier for Negotiator Bot
+Labels recruiter messages with negotiation tactics without calling the LLM
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Tactic labels and the analysis fields they map to
+TACTICS = {
+    "budget_fixed": {
+        "pressure_point": "fixed budget",
+        "information_sought": "whether the candidate will accept the current budget",
+        "response_strategy": "anchor on market data and propose non-salary compensation"
+    },
+    "competing_candidates": {
+        "pressure_point": "competing candidates",
+        "information_sought": "how badly the candidate wants the role",
+        "response_strategy": "reinforce unique value and signal other options"
+    },
+    "final_offer": {
+        "pressure_point": "final offer",
+        "information_sought": "whether the candidate will walk away",
+        "response_strategy": "test the finality with a specific, reasoned counter"
+    },
+    "deferral": {
+        "pressure_point": "delayed decision",
+        "information_sought": "the candidate's timeline and patience",
+        "response_strategy": "set a clear timeline and ask for a concrete commitment"
+    },
+    "internal_equity": {
+        "pressure_point": "team consistency",
+        "information_sought": "whether the candidate accepts the salary bands",
+        "response_strategy": "differentiate the candidate from the existing band"
+    },
+    "alternative_compensation": {
+        "pressure_point": "non-salary trade-offs",
+        "information_sought": "which benefits the candidate values",
+        "response_strategy": "accept the opening and name specific alternatives"
+    },
+    "initial_offer": {
+        "pressure_point": "anchoring",
+        "information_sought": "the candidate's reaction to the first number",
+        "response_strategy": "express enthusiasm and counter with market evidence"
+    },
+    "withdrawal": {
+        "pressure_point": "walk-away",
+        "information_sought": "whether the candidate will concede",
+        "response_strategy": "de-escalate and reopen the conversation professionally"
+    },
+}
+
+# Recruiter lines from streamlit_app.RecruiterBot.responses and the recruiterResponses
+# array in templates/index.html, plus paraphrases so every tactic has several examples
+TRAINING_DATA: List[Tuple[str, List[str]]] = [
+    ("Thank you for your interest in joining our team! After reviewing your application, we're pleased to extend you an offer for the position. The salary is $85,000 with comprehensive benefits. This offer reflects our assessment of your qualifications and the market rate for this role. Do you have any questions about the offer?", ["initial_offer"]),
+    ("I understand your perspective, but our standard rate for this level is firm. We have many qualified candidates interested in this position.", ["budget_fixed", "competing_candidates"]),
+    ("We understand your concerns, but this is our standard rate for this level. We have many qualified candidates interested in this position.", ["budget_fixed", "competing_candidates"]),
+    ("I appreciate your enthusiasm, but our budget is fixed for this role. We can offer additional benefits like flexible hours or professional development opportunities.", ["budget_fixed", "alternative_compensation"]),
+    ("We value your skills, but we need to maintain consistency across our team. Perhaps we can discuss a performance review after 6 months?", ["internal_equity", "deferral"]),
+    ("I understand your concerns about market rates. Let me check with our compensation team and get back to you with a revised offer.", ["deferral"]),
+    ("We're excited about your potential, but we need to work within our established salary bands. Would you be open to discussing other forms of compensation?", ["internal_equity", "alternative_compensation"]),
+    ("Thank you for your patience. After reviewing your case, we can offer $90,000 with the same benefits package. This is our final offer.", ["final_offer"]),
+    ("We appreciate your negotiation skills, but we need to make a decision soon. We have other candidates waiting for our response.", ["competing_candidates"]),
+    ("I understand your position, but we need to maintain fairness across our team. Our offer remains at $90,000.", ["internal_equity", "final_offer"]),
+    ("We value your expertise, but we have budget constraints. Perhaps we can revisit this conversation in a few months?", ["budget_fixed", "deferral"]),
+    ("Thank you for your time. We'll be moving forward with other candidates. Best of luck with your job search.", ["withdrawal"]),
+    ("Our budget for this position has already been approved and there is no room to increase the base salary.", ["budget_fixed"]),
+    ("Unfortunately the salary range for this role is fixed by finance and we cannot go above it.", ["budget_fixed"]),
+    ("There are several other strong applicants in the final round for this role.", ["competing_candidates"]),
+    ("Another candidate has already accepted a similar offer, so we need your answer quickly.", ["competing_candidates"]),
+    ("This is the best and final offer we can make. We are unable to go any higher.", ["final_offer"]),
+    ("Our offer stands at this number and it is not negotiable any further.", ["final_offer"]),
+    ("Let me discuss this with the hiring manager and I will follow up next week.", ["deferral"]),
+    ("We can revisit compensation at your first annual review once you have settled in.", ["deferral"]),
+    ("Everyone at this level is paid within the same band, so we have to keep it equitable.", ["internal_equity"]),
+    ("We could add a signing bonus or extra stock options instead of raising the salary.", ["alternative_compensation"]),
+    ("Would additional PTO, remote work or a learning budget help bridge the gap?", ["alternative_compensation"]),
+    ("We're pleased to offer you the role with a starting salary of $100,000 plus benefits.", ["initial_offer"]),
+    ("We have decided to rescind the offer and will not be proceeding with your application.", ["withdrawal"]),
+    ("We no longer think this is the right fit and are closing the position with you.", ["withdrawal"]),
+]
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9$%]+")
+
+
+def _tokenize(text: str) -> List[str]:
+    """Lowercased unigrams plus adjacent bigrams"""
+    words = _TOKEN_PATTERN.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class TacticClassifier:
+    """Multinomial naive Bayes over unigram/bigram counts, vectorized with NumPy"""
+
+    def __init__(self, training_data: List[Tuple[str, List[str]]] = None, alpha: float = 0.5,
+                 informative_lift: float = 2.0, evidence_for_full_confidence: int = 3):
+        self.evidence_for_full_confidence = evidence_for_full_confidence
+        training_data = training_data or TRAINING_DATA
+        self.labels = list(TACTICS.keys())
+        label_index = {label: i for i, label in enumerate(self.labels)}
+
+        tokenized = [(_tokenize(text), labels) for text, labels in training_data]
+        self.vocabulary: Dict[str, int] = {}
+        for tokens, _ in tokenized:
+            for token in tokens:
+                self.vocabulary.setdefault(token, len(self.vocabulary))
+
+        counts = np.zeros((len(self.labels), len(self.vocabulary)))
+        docs = np.zeros(len(self.labels))
+        for tokens, labels in tokenized:
+            vector = self._vectorize(tokens)
+            for label in labels:
+                counts[label_index[label]] += vector
+                docs[label_index[label]] += 1
+
+        smoothed = counts + alpha
+        self._log_likelihood = np.log(smoothed / smoothed.sum(axis=1, keepdims=True))
+        self._log_prior = np.log((docs + 1) / (docs + 1).sum())
+
+        # Tokens that are much likelier under one tactic than on average carry the
+        # evidence; messages with few of them get a low confidence
+        likelihood = np.exp(self._log_likelihood)
+        lift = likelihood.max(axis=0) / likelihood.mean(axis=0)
+        self._informative = (lift >= informative_lift).astype(float)
+
+    def _vectorize(self, tokens: List[str]) -> np.ndarray:
+        indices = [self.vocabulary[t] for t in tokens if t in self.vocabulary]
+        return np.bincount(indices, minlength=len(self.vocabulary)).astype(float)
+
+    def predict_proba(self, message: str) -> Tuple[np.ndarray, float]:
+        """Posterior probability of each tactic label and the amount of evidence seen"""
+        vector = self._vectorize(_tokenize(message))
+        scores = self._log_likelihood @ vector + self._log_prior
+        scores = np.exp(scores - scores.max())
+        return scores / scores.sum(), float(self._informative @ vector)
+
+    def classify(self, message: str, pressure_threshold: float = 0.15) -> Dict:
+        """Return an analysis dict shaped like NegotiatorBot._analyze_incoming_message"""
+        probabilities, evidence = self.predict_proba(message)
+        ranked = np.argsort(probabilities)[::-1]
+        tactic = self.labels[ranked[0]]
+        confidence = float(probabilities[ranked[0]]) * min(1.0, evidence / self.evidence_for_full_confidence)
+
+        return {
+            "tactic": tactic,
+            "pressure_points": [TACTICS[self.labels[i]]["pressure_point"]
+                                for i in ranked if probabilities[i] >= pressure_threshold],
+            "information_sought": TACTICS[tactic]["information_sought"],
+            "response_strategy": TACTICS[tactic]["response_strategy"],
+            "confidence": round(confidence, 3),
+            "source": "local"
+        }
+
+
+_default_classifier: Optional[TacticClassifier] = None
+
+
+def get_tactic_classifier() -> TacticClassifier:
+    """Shared classifier instance, trained on first use"""
+    global _default_classifier
+    if _default_classifier is None:
+        _default_classifier = TacticClassifier()
+    return _default_classifier
@@ -0,0 +1,172 @@
+"""
+Request Tracing for Recruiter Bot and Negotiator Bot
+Nested timing spans tagged with the request ID, exported as JSON lines; a no-op unless an exporter is configured
+"""
+
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional
+
+# The trace (request ID) and innermost open span of the current thread or task
+_trace_id: ContextVar[Optional[str]] = ContextVar("trace_id", default=None)
+_current_span: ContextVar[Optional[str]] = ContextVar("trace_span", default=None)
+
+
+def set_request_id(request_id: str):
+    """Make ``request_id`` the trace ID of every span opened from here on in this context"""
+    _trace_id.set(request_id)
+
+
+def current_request_id() -> Optional[str]:
+    return _trace_id.get()
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+class JsonLinesExporter:
+    """Appends one JSON object per finished span to ``path``"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", buffering=1, encoding="utf-8")  # line-buffered
+
+    def export(self, record: Dict):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class Span:
+    """One timed operation; use as a context manager"""
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: Dict):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.span_id = os.urandom(8).hex()
+        self.trace_id = _trace_id.get()
+        self.parent_id = _current_span.get()
+        self._tokens = ()
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def __enter__(self) -> "Span":
+        tokens = [_current_span.set(self.span_id)]
+        if self.trace_id is None:
+            # A span outside any request starts its own trace
+            self.trace_id = new_request_id()
+            tokens.append(_trace_id.set(self.trace_id))
+        self._tokens = tokens
+        self._started_at = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        duration_ms = (time.perf_counter() - self._start) * 1000
+        for token in reversed(self._tokens):
+            try:
+                token.var.reset(token)
+            except ValueError:
+                # Ended in another context, e.g. a generator finished by a different caller
+                pass
+        record = {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self._started_at, 6),
+            "duration_ms": round(duration_ms, 3),
+            "status": "error" if exc is not None else "ok",
+            "attributes": self.attributes
+        }
+        if exc is not None:
+            record["error"] = f"{type(exc).__name__}: {exc}"
+        self.tracer.export(record)
+        return False
+
+
+class _NoopSpan:
+    """Returned while tracing is off, so disabled spans cost one attribute check"""
+
+    def set_attribute(self, key: str, value):
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    def __init__(self, exporter=None):
+        self.exporter = exporter
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def span(self, name: str, **attributes):
+        if self.exporter is None:
+            return NOOP_SPAN
+        return Span(self, name, attributes)
+
+    def export(self, record: Dict):
+        try:
+            self.exporter.export(record)
+        except Exception as e:
+            print(f"Error exporting trace span: {e}")
+
+
+tracer = Tracer()
+
+
+def configure(path: Optional[str]):
+    """Export spans to the JSON-lines file at ``path``, or turn tracing off when it is empty"""
+    previous = tracer.exporter
+    tracer.exporter = JsonLinesExporter(path) if path else None
+    if previous is not None:
+        previous.close()
+
+
+def span(name: str, **attributes):
+    return tracer.span(name, **attributes)
+
+
+def traced(name: str, **attributes) -> Callable:
+    """Decorator running each call of a function or coroutine function inside a span"""
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if tracer.exporter is None:
+                    return await fn(*args, **kwargs)
+                with Span(tracer, name, dict(attributes)):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if tracer.exporter is None:
+                return fn(*args, **kwargs)
+            with Span(tracer, name, dict(attributes)):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator